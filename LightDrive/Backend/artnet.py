@@ -1,35 +1,161 @@
-from stupidArtnet import StupidArtnet
+import numpy as np
+import struct
+import time
+
+ARTNET_PORT = 6454
+ARTNET_ID = b"Art-Net\x00"
+ARTNET_PROTOCOL_VERSION = 14
+OP_DMX = 0x5000
+OP_SYNC = 0x5200
+ARTDMX_HEADER_SIZE = 18
+DEFAULT_KEEPALIVE_MS = 1000  # Nodes may drop a universe that has not been refreshed for 4 seconds
+MIN_KEEPALIVE_MS = 100
+MAX_KEEPALIVE_MS = 4000
+
+def build_artdmx_header(port_address: int, length: int = 512) -> bytes:
+    """
+    Builds the header of an ArtDmx packet
+    :param port_address: The 15 bit port-address (net, sub-net and universe) to output to
+    :param length: The amount of channels in the packet (even, 2 - 512)
+    :return: The 18 byte header (the sequence byte is 0 and is set for every packet)
+    """
+    return ARTNET_ID + struct.pack("<H", OP_DMX) + struct.pack(">HBBBBH", ARTNET_PROTOCOL_VERSION, 0, 0,
+                                                               port_address & 0xFF, (port_address >> 8) & 0x7F, length)
+
+def build_artsync_packet() -> bytes:
+    """
+    Builds an ArtSync packet (tells the nodes to output the ArtDmx packets received since the last sync)
+    :return: The packet
+    """
+    return ARTNET_ID + struct.pack("<H", OP_SYNC) + struct.pack(">HBB", ARTNET_PROTOCOL_VERSION, 0, 0)
+
+ARTSYNC_PACKET = build_artsync_packet()
+
+def clamp_keepalive_ms(keepalive_ms: int) -> int:
+    """
+    Clamps a keepalive interval to the range the universe configuration allows
+    Workspaces can hold any value (e.g. from older versions or edited by hand), 0 or less would send on every frame.
+    :param keepalive_ms: The keepalive interval in milliseconds
+    :return: The interval between MIN_KEEPALIVE_MS and MAX_KEEPALIVE_MS
+    """
+    return min(MAX_KEEPALIVE_MS, max(MIN_KEEPALIVE_MS, int(keepalive_ms)))
 
 class ArtnetOutput:
-    def __init__(self, target_ip: str, artnet_universe: int, hz: int) -> None:
+    def __init__(self, sender, target_ip: str, artnet_universe: int, hz: int, sync: bool = False,
+                 send_on_change: bool = False, keepalive_ms: int = DEFAULT_KEEPALIVE_MS, discovery: bool = False,
+                 patched_channels: int = 512) -> None:
         """
-        Creates the Artnet output class
+        Creates the Artnet output of a universe (the packets are sent by a shared UdpSender)
+        :param sender: The instance of the UdpSender class to send the packets with
         :param target_ip: The ip to output to
-        :param artnet_universe: The artnet_universe to output to
-        :param hz: The refresh rate
+        :param artnet_universe: The artnet_universe (15 bit port-address) to output to
+        :param hz: The refresh rate (the universe is resent at this rate even if it did not change, 0 disables it)
+        :param sync: Whether to send an ArtSync packet after every burst containing this universe
+        :param send_on_change: Whether to only send when the values changed (and as keepalive) instead of at the refresh rate
+        :param keepalive_ms: The interval of the keepalive when sending on change in milliseconds
+        :param discovery: Whether to unicast to the discovered nodes that output the universe (the target ip is used if there are none)
+        :param patched_channels: The highest channel used by the patch (the packets are truncated to it)
         """
+        self.sender = sender
         self.target_ip = target_ip
         self.artnet_universe = artnet_universe
         self.hz = hz
+        self.send_on_change = send_on_change
+        if send_on_change:
+            self.refresh_interval = clamp_keepalive_ms(keepalive_ms) / 1000
+        else:
+            self.refresh_interval = 1 / hz if hz > 0 else float("inf")
+        self.sync = sync
+        self.sync_key = "artnet" if sync else None
+        self.discovery = discovery
+        self.port = ARTNET_PORT
         self.packet_size = 512
+        self.patched_channels = patched_channels
+        self.written_channels = 0  # The highest non-zero channel written beyond the patch (e.g. by the console)
+
+        self.packet = bytearray(build_artdmx_header(artnet_universe) + bytes(512))
+        self.packet_view = memoryview(self.packet)
+        self.sequence = 0
+        self.changed = True
+        self.next_send = 0.0
+        self.update_packet_size()
+        self.sender.add_output(self)
 
-        self.device = StupidArtnet(self.target_ip, self.artnet_universe, self.packet_size, self.hz, True, True)
-        self.device.start()
+    def set_patched_channels(self, patched_channels: int) -> None:
+        """
+        Sets the highest channel used by the patch and truncates the packets to it
+        :param patched_channels: The highest patched channel (0 - 512)
+        :return: None
+        """
+        self.patched_channels = patched_channels
+        written = np.flatnonzero(np.frombuffer(self.packet, dtype=np.uint8, offset=ARTDMX_HEADER_SIZE))
+        self.written_channels = int(written[-1]) + 1 if len(written) else 0
+        self.update_packet_size()
+        self.changed = True
+
+    def update_packet_size(self) -> None:
+        """
+        Sizes the packets to the highest patched or written channel (ArtDmx requires an even length of 2 - 512)
+        :return: None
+        """
+        channels = max(2, self.patched_channels, self.written_channels)
+        self.packet_size = min(512, channels + channels % 2)
+        struct.pack_into(">H", self.packet, 16, self.packet_size)
 
-    def set_values(self, values: list[int]) -> None:
+    def set_values(self, values: np.ndarray) -> None:
         """
-        Sets all channels to a list of values
-        :param values: The list of values (must match the packet size (512)
+        Sets all channels to an array of values (they are sent with the next burst)
+        Non-zero values beyond the packet size grow the packets, so nothing that is output gets cut off.
+        :param values: The array of uint8 values (must have 512 values)
         :return: None
         """
-        self.device.set(values)
-        self.device.show()
+        self.packet[ARTDMX_HEADER_SIZE:] = values.data
+        self.changed = True
+        if self.packet_size < 512:
+            unsent_channels = np.flatnonzero(values[self.packet_size:])
+            if len(unsent_channels):
+                self.written_channels = self.packet_size + int(unsent_channels[-1]) + 1
+                self.update_packet_size()
+
+    def next_packet(self) -> memoryview:
+        """
+        Gets the packet to send and advances the sequence number (1 - 255, 0 would disable reordering on the nodes)
+        :return: The packet (truncated to the packet size)
+        """
+        self.sequence = self.sequence % 255 + 1
+        self.packet[12] = self.sequence
+        return self.packet_view[:ARTDMX_HEADER_SIZE + self.packet_size]
+
+    def get_targets(self) -> tuple:
+        """
+        Gets the ips to send the packets to
+        :return: The discovered nodes of the universe if discovery is used and any were found, otherwise the target ip
+        """
+        if self.discovery and self.sender.discovery:
+            return self.sender.discovery.get_targets(self.artnet_universe) or (self.target_ip,)
+        return (self.target_ip,)
+
+    def get_sync_targets(self, target_ips: tuple) -> tuple:
+        """
+        Gets the ips to send the ArtSync packets to
+        :param target_ips: The ips the last packet was sent to
+        :return: The same ips (ArtSync goes to every node that received a packet)
+        """
+        return target_ips
+
+    def build_sync_packet(self, sequence: int) -> bytes:
+        """
+        Gets the ArtSync packet
+        :param sequence: The sequence of the sync (unused, ArtSync has no sequence)
+        :return: The packet
+        """
+        return ARTSYNC_PACKET
 
     def stop(self) -> None:
         """
-        Gracefully stops the output
+        Gracefully stops the output (sends a blackout)
         :return: None
         """
-        self.device.blackout()
-        self.device.stop()
-        del self.device
+        self.packet[ARTDMX_HEADER_SIZE:] = bytes(512)
+        self.sender.send_output(self, time.perf_counter())
+        self.sender.remove_output(self)
@@ -0,0 +1,159 @@
+from .artnet import ARTNET_ID, ARTNET_PORT, ARTNET_PROTOCOL_VERSION
+import threading
+import socket
+import struct
+import time
+
+OP_POLL = 0x2000
+OP_POLL_REPLY = 0x2100
+POLL_INTERVAL = 3  # Controllers should poll every 2.5 to 3 seconds
+NODE_TIMEOUT = 3 * POLL_INTERVAL
+ARTPOLLREPLY_MIN_SIZE = 207
+
+def build_artpoll_packet() -> bytes:
+    """
+    Builds an ArtPoll packet
+    :return: The packet
+    """
+    return ARTNET_ID + struct.pack("<H", OP_POLL) + struct.pack(">HBB", ARTNET_PROTOCOL_VERSION, 0, 0)
+
+ARTPOLL_PACKET = build_artpoll_packet()
+
+def parse_artpollreply(packet: bytes) -> dict | None:
+    """
+    Parses an ArtPollReply packet
+    :param packet: The received packet
+    :return: The ip, name, bind index and the port-addresses the node outputs (None if the packet is no ArtPollReply)
+    """
+    if len(packet) < ARTPOLLREPLY_MIN_SIZE or packet[:8] != ARTNET_ID:
+        return None
+    if struct.unpack_from("<H", packet, 8)[0] != OP_POLL_REPLY:
+        return None
+    net_switch = packet[18] & 0x7F
+    sub_switch = packet[19] & 0x0F
+    port_count = min(4, struct.unpack_from(">H", packet, 172)[0])
+    port_addresses = []
+    for port_index in range(port_count):
+        if packet[174 + port_index] & 0x80:  # The port can output DMX received over Art-Net
+            port_addresses.append(net_switch << 8 | sub_switch << 4 | packet[190 + port_index] & 0x0F)
+    return {
+        "ip": socket.inet_ntoa(packet[10:14]),
+        "name": packet[26:44].split(b"\x00")[0].decode(errors="replace"),
+        "bind_index": packet[211] if len(packet) > 211 else 0,
+        "port_addresses": port_addresses
+    }
+
+class ArtnetDiscovery:
+    def __init__(self, poll_address: str = "255.255.255.255", poll_port: int = ARTNET_PORT, listen_port: int = ARTNET_PORT) -> None:
+        """
+        Discovers the ArtNet nodes on the network and caches which port-addresses they output
+        A thread broadcasts an ArtPoll every few seconds and collects the ArtPollReplies.
+        Nodes that stop replying are removed from the cache.
+        :param poll_address: The (broadcast) address to send the ArtPolls to
+        :param poll_port: The port to send the ArtPolls to
+        :param listen_port: The port to receive the ArtPollReplies on (nodes reply to port 6454)
+        """
+        self.poll_address = poll_address
+        self.poll_port = poll_port
+        self.nodes = {}  # {(ip, bind_index): {"name": ..., "port_addresses": [...], "last_seen": ...}}
+        self.routes = {}  # {port_address: (ip, ip, ...)}, replaced as a whole, so it can be read without locking
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.error = None  # Why the discovery could not be started (None if it is running)
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        self.socket.settimeout(0.5)
+        self.thread = None
+        try:
+            self.socket.bind(("", listen_port))
+        except OSError as e:
+            self.error = f"ArtNet discovery is disabled, could not listen on port {listen_port} ({e})"
+            self.socket.close()
+            return
+        self.thread = threading.Thread(target=self.run, name="LightDrive ArtNet discovery")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run(self) -> None:
+        """
+        Polls the network and receives the replies until the discovery is stopped
+        :return: None
+        """
+        next_poll = 0.0
+        while not self.stop_event.is_set():
+            now = time.monotonic()
+            if now >= next_poll:
+                try:
+                    self.socket.sendto(ARTPOLL_PACKET, (self.poll_address, self.poll_port))
+                except OSError:
+                    pass  # E.g. no network yet, try again with the next poll
+                self.expire_nodes(now)
+                next_poll = now + POLL_INTERVAL
+            try:
+                packet, _ = self.socket.recvfrom(1024)
+            except socket.timeout:
+                continue
+            except OSError:  # The socket was closed
+                return
+            reply = parse_artpollreply(packet)
+            if reply is not None:
+                self.add_node(reply, time.monotonic())
+
+    def add_node(self, reply: dict, now: float) -> None:
+        """
+        Adds or refreshes a node in the cache
+        :param reply: The parsed ArtPollReply of the node
+        :param now: The current time (time.monotonic())
+        :return: None
+        """
+        with self.lock:
+            node_key = (reply["ip"], reply["bind_index"])
+            known_node = self.nodes.get(node_key)
+            self.nodes[node_key] = {"name": reply["name"], "port_addresses": reply["port_addresses"], "last_seen": now}
+            if known_node is None or known_node["port_addresses"] != reply["port_addresses"]:
+                self.rebuild_routes()
+
+    def expire_nodes(self, now: float) -> None:
+        """
+        Removes the nodes that did not reply for a while
+        :param now: The current time (time.monotonic())
+        :return: None
+        """
+        with self.lock:
+            expired_nodes = [node_key for node_key, node in self.nodes.items() if now - node["last_seen"] > NODE_TIMEOUT]
+            for node_key in expired_nodes:
+                del self.nodes[node_key]
+            if expired_nodes:
+                self.rebuild_routes()
+
+    def rebuild_routes(self) -> None:
+        """
+        Rebuilds the routes from the cached nodes (the lock must be held)
+        :return: None
+        """
+        routes = {}
+        for (ip, _), node in self.nodes.items():
+            for port_address in node["port_addresses"]:
+                if ip not in routes.setdefault(port_address, []):
+                    routes[port_address].append(ip)
+        self.routes = {port_address: tuple(ips) for port_address, ips in routes.items()}
+
+    def get_targets(self, port_address: int) -> tuple:
+        """
+        Gets the ips of the nodes that output a port-address
+        :param port_address: The 15 bit port-address
+        :return: The ips (empty if no node was discovered for it)
+        """
+        return self.routes.get(port_address, ())
+
+    def stop(self) -> None:
+        """
+        Stops the discovery
+        :return: None
+        """
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.socket.close()
@@ -0,0 +1,76 @@
+import traceback
+import threading
+import time
+import os
+
+class OutputClock:
+    def __init__(self, callback, hz: int, metrics=None, report_error=None) -> None:
+        """
+        Creates a clock that calls a function at a fixed rate on its own thread
+        :param callback: The function to call every frame
+        :param hz: The frame rate
+        :param metrics: An instance of the OutputMetrics class to count late and dropped frames in (optional)
+        :param report_error: A function to report failing frames with (optional, it is called on the clock thread)
+        """
+        self.callback = callback
+        self.hz = max(1, hz)
+        self.metrics = metrics
+        self.report_error = report_error
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    def start(self) -> None:
+        """
+        Starts the clock thread
+        :return: None
+        """
+        if self.thread:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name="LightDrive output clock")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def set_rate(self, hz: int) -> None:
+        """
+        Changes the frame rate (applies from the next frame on)
+        :param hz: The new frame rate
+        :return: None
+        """
+        self.hz = max(1, hz)
+
+    def run(self) -> None:
+        """
+        Calls the callback once per frame until the clock is stopped
+        :return: None
+        """
+        next_frame = time.perf_counter()
+        last_error = None
+        while not self.stop_event.is_set():
+            try:
+                self.callback()
+                last_error = None
+            except Exception as error:  # A failing frame must not stop the output, report it and keep ticking
+                if repr(error) != last_error and self.report_error:  # Only report an error once while it repeats every frame
+                    failed_frame = traceback.extract_tb(error.__traceback__)[-1]
+                    self.report_error(f"The output frame failed: {error!r} "
+                                      f"({os.path.basename(failed_frame.filename)}:{failed_frame.lineno})")
+                last_error = repr(error)
+            next_frame += 1 / self.hz
+            delay = next_frame - time.perf_counter()
+            if delay > 0:
+                self.stop_event.wait(delay)
+            else:
+                if self.metrics:
+                    self.metrics.count_late_frame(int(-delay * self.hz))
+                next_frame = time.perf_counter()  # Fell behind, continue from now instead of bursting frames
+
+    def stop(self) -> None:
+        """
+        Stops the clock and waits for the current frame to finish
+        :return: None
+        """
+        self.stop_event.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
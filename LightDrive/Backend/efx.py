@@ -0,0 +1,234 @@
+from .patch import UniversePatch
+import numpy as np
+import functools
+import json
+
+PATH_POINTS = 2048  # Points sampled per pattern (more than the 0 - 255 resolution of a channel along the longest paths)
+CURVE_SAMPLES = 4096  # Samples of the arc length table of the curved patterns
+PATTERNS = ["Circle", "Square", "Triangle", "Line", "Eight", "Lissajous", "Spiral", "Polyline"]
+DEFAULT_PATTERN_PARAMETERS = {
+    "Lissajous": {"x_frequency": 3, "y_frequency": 2, "phase": 90},
+    "Spiral": {"turns": 3},
+    "Polyline": {"points": [[0, 0], [1, 0], [0.5, 1]], "closed": True}
+}
+POLYLINES = {  # The vertices of the straight patterns (relative to the width and height)
+    "Square": [[0, 0], [1, 0], [1, 1], [0, 1], [0, 0]],
+    "Triangle": [[0.5, 0], [1, 1], [0, 1], [0.5, 0]],
+    "Line": [[0, 0], [1, 1]]
+}
+
+def get_pattern_parameters(pattern: str, parameters: dict = None) -> dict:
+    """
+    Gets the parameters of a pattern (missing parameters are filled with the defaults)
+    :param pattern: The pattern
+    :param parameters: The parameters set by the user
+    :return: The parameters
+    """
+    return {**DEFAULT_PATTERN_PARAMETERS.get(pattern, {}), **(parameters or {})}
+
+def curve_points(pattern: str, u: np.ndarray, parameters: dict) -> np.ndarray | None:
+    """
+    Evaluates a curved pattern at curve parameters (these are not evenly spaced along the curve)
+    :param pattern: The pattern ("Circle", "Eight", "Lissajous" or "Spiral")
+    :param u: The curve parameters (0 - 1, one loop of the pattern)
+    :param parameters: The parameters of the pattern
+    :return: The points relative to the width and height (len(u) x 2) or None for other patterns
+    """
+    angle = 2 * np.pi * u
+    if pattern == "Circle":
+        x, y = np.cos(angle), np.sin(angle)
+    elif pattern == "Eight":
+        x, y = np.sin(2 * angle), -np.cos(angle)
+    elif pattern == "Lissajous":
+        x = np.sin(parameters["x_frequency"] * angle + np.radians(parameters["phase"]))
+        y = np.sin(parameters["y_frequency"] * angle)
+    elif pattern == "Spiral":  # Spirals outwards in the first half of the loop and back inwards in the second one
+        radius = 1 - np.abs(1 - 2 * u)
+        x, y = radius * np.cos(2 * parameters["turns"] * angle), radius * np.sin(2 * parameters["turns"] * angle)
+    else:
+        return None
+    return np.column_stack((x, y)) / 2 + 0.5
+
+def pattern_vertices(pattern: str, parameters: dict) -> np.ndarray | None:
+    """
+    Gets the vertices of a straight pattern
+    :param pattern: The pattern ("Square", "Triangle", "Line" or "Polyline")
+    :param parameters: The parameters of the pattern
+    :return: The vertices relative to the width and height (n x 2) or None for other patterns
+    """
+    if pattern in POLYLINES:
+        return np.array(POLYLINES[pattern], dtype=np.float64)
+    if pattern == "Polyline" and parameters["points"]:
+        vertices = np.array(parameters["points"], dtype=np.float64).reshape(-1, 2)
+        return np.vstack((vertices, vertices[:1])) if parameters.get("closed", True) else vertices
+    return None
+
+@functools.lru_cache(maxsize=64)
+def _arc_length_table(pattern: str, width: float, height: float, parameters_key: str) -> tuple | None:
+    """
+    Builds the table that maps the arc length of a pattern to its curve parameter or vertices (cached per geometry)
+    :param pattern: The pattern
+    :param width: The width of the pattern
+    :param height: The height of the pattern
+    :param parameters_key: The parameters of the pattern (as JSON, so they can be cached)
+    :return: The cumulative arc lengths, the curve parameters or vertices at these lengths and the scaled vertices
+             or None for unknown or empty patterns ((lengths, parameters or None, vertices))
+    """
+    parameters = json.loads(parameters_key)
+    scale = np.array([width, height], dtype=np.float64)
+    vertices = pattern_vertices(pattern, parameters)
+    u = None
+    if vertices is None:
+        u = np.linspace(0, 1, CURVE_SAMPLES + 1)
+        vertices = curve_points(pattern, u, parameters)
+        if vertices is None:
+            return None
+    vertices = vertices * scale
+    lengths = np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(vertices, axis=0).T))))
+    if len(lengths) < 2 or lengths[-1] == 0:
+        return None
+    return lengths, u, vertices
+
+def evaluate_pattern(pattern: str, t: np.ndarray, width: float, height: float, x_offset: float, y_offset: float,
+                     parameters: dict = None) -> np.ndarray | None:
+    """
+    Evaluates a 2D EFX pattern at positions evenly spaced along its path (arc length parameterized)
+    Straight patterns are interpolated exactly between their vertices. Curved patterns are evaluated in closed form
+    at the curve parameter of the arc length, which is looked up in a cached table.
+    :param pattern: The pattern (see PATTERNS)
+    :param t: The positions along the path (0 - 1, wraps around)
+    :param width: The width of the pattern
+    :param height: The height of the pattern
+    :param x_offset: The x offset of the pattern
+    :param y_offset: The y offset of the pattern
+    :param parameters: The parameters of the pattern (e.g. the frequencies of a Lissajous figure, see DEFAULT_PATTERN_PARAMETERS)
+    :return: The points in the 512 x 512 movement area (len(t) x 2) or None if the pattern is unknown or empty
+    """
+    parameters = get_pattern_parameters(pattern, parameters)
+    table = _arc_length_table(pattern, float(width), float(height), json.dumps(parameters, sort_keys=True))
+    if table is None:
+        return None
+    lengths, u, vertices = table
+    distances = np.mod(t, 1) * lengths[-1]
+    if u is None:
+        points = np.column_stack((np.interp(distances, lengths, vertices[:, 0]), np.interp(distances, lengths, vertices[:, 1])))
+    else:
+        points = curve_points(pattern, np.interp(distances, lengths, u), parameters) * (width, height)
+    return points + (x_offset, y_offset)
+
+@functools.lru_cache(maxsize=64)
+def _sample_path(pattern: str, width: float, height: float, x_offset: float, y_offset: float, parameters_key: str,
+                 points: int) -> np.ndarray | None:
+    """
+    Samples a 2D EFX pattern into a lookup table of DMX values (cached, see sample_path)
+    :return: The read-only table or None if the pattern is unknown or empty
+    """
+    positions = evaluate_pattern(pattern, np.arange(points) / points, width, height, x_offset, y_offset, json.loads(parameters_key))
+    if positions is None:
+        return None
+    table = np.clip(np.rint(positions / 2), 0, 255).astype(np.uint8)  # The movement area is 512 x 512, a channel 0 - 255
+    table.setflags(write=False)
+    return table
+
+def sample_path(pattern: str, width: float, height: float, x_offset: float, y_offset: float, parameters: dict = None,
+                points: int = PATH_POINTS) -> np.ndarray | None:
+    """
+    Samples a 2D EFX pattern into a lookup table of DMX values (evenly spaced along the path)
+    The tables are cached, so all EFX with the same pattern and geometry share one table and playback is only an index into it.
+    :param pattern: The pattern
+    :param width: The width of the pattern
+    :param height: The height of the pattern
+    :param x_offset: The x offset of the pattern
+    :param y_offset: The y offset of the pattern
+    :param parameters: The parameters of the pattern
+    :param points: The amount of points to sample
+    :return: The read-only table of the X and Y values (points x 2, uint8) or None if the pattern is unknown or empty
+    """
+    return _sample_path(pattern, width, height, x_offset, y_offset, json.dumps(parameters or {}, sort_keys=True), points)
+
+def parse_pattern_parameters(pattern: str, text: str) -> dict:
+    """
+    Parses the parameters of a pattern entered in the editor
+    Lissajous: "x frequency:y frequency:phase" (e.g. "3:2:90"), Spiral: "turns" (e.g. "3"),
+    Polyline: the points relative to the width and height (e.g. "0,0 1,0 0.5,1", a trailing "-" leaves it open)
+    :param pattern: The pattern
+    :param text: The entered text
+    :return: The parameters
+    :raise ValueError: If the text is invalid
+    """
+    text = text.strip()
+    if pattern == "Lissajous":
+        values = [float(value) for value in text.split(":")]
+        if len(values) not in (2, 3) or values[0] <= 0 or values[1] <= 0:
+            raise ValueError("Expected x frequency:y frequency[:phase]")
+        return {"x_frequency": values[0], "y_frequency": values[1], "phase": values[2] if len(values) == 3 else 90}
+    if pattern == "Spiral":
+        turns = float(text)
+        if turns <= 0:
+            raise ValueError("Expected a positive amount of turns")
+        return {"turns": turns}
+    if pattern == "Polyline":
+        closed = not text.endswith("-")
+        points = [[float(value) for value in point.split(",")] for point in text.rstrip("-").split()]
+        if len(points) < 2 or any(len(point) != 2 for point in points):
+            raise ValueError("Expected at least two points (x,y)")
+        return {"points": points, "closed": closed}
+    return {}
+
+def format_pattern_parameters(pattern: str, parameters: dict) -> str:
+    """
+    Formats the parameters of a pattern for the editor (the inverse of parse_pattern_parameters)
+    :param pattern: The pattern
+    :param parameters: The parameters
+    :return: The text ("" for patterns without parameters)
+    """
+    parameters = get_pattern_parameters(pattern, parameters)
+    if pattern == "Lissajous":
+        return ":".join(f"{value:g}" for value in (parameters["x_frequency"], parameters["y_frequency"], parameters["phase"]))
+    if pattern == "Spiral":
+        return f"{parameters['turns']:g}"
+    if pattern == "Polyline":
+        return " ".join(f"{x:g},{y:g}" for x, y in parameters["points"]) + ("" if parameters.get("closed", True) else " -")
+    return ""
+
+class TwoDEfxEngine:
+    def __init__(self, fixture_mappings: dict, available_fixtures: list, phase_spread: float = 0) -> None:
+        """
+        Compiles the fixture mappings of a 2D EFX into index arrays, so all fixtures are evaluated with a few NumPy operations
+        :param fixture_mappings: The mappings of the fixtures ({fixture_uuid: {channel: "X", "Y" or "None"}}, channels are zero based)
+        :param available_fixtures: The patched fixtures of the workspace
+        :param phase_spread: The phase spread over all fixtures in degrees (360 spreads them evenly over the whole path)
+        """
+        fixtures = {fixture["fixture_uuid"]: fixture for fixture in available_fixtures}
+        mapped_fixtures = [fixture_uuid for fixture_uuid in fixture_mappings if fixture_uuid in fixtures]
+        self.phases = np.arange(len(mapped_fixtures)) * (phase_spread / 360 / max(1, len(mapped_fixtures)))
+
+        universe_channels = {}  # {universe_uuid: ([channel], [fixture index], [axis])}
+        for fixture_index, fixture_uuid in enumerate(mapped_fixtures):
+            fixture = fixtures[fixture_uuid]
+            channels, fixture_indices, axes = universe_channels.setdefault(fixture["universe"], ([], [], []))
+            for channel, association in fixture_mappings[fixture_uuid].items():
+                if association in ("X", "Y"):
+                    channels.append(int(channel) + fixture["address"] - 1)
+                    fixture_indices.append(fixture_index)
+                    axes.append(0 if association == "X" else 1)
+
+        self.universes = []  # [(universe_uuid, channels, fixture indices, axes)]
+        for universe_uuid, (channels, fixture_indices, axes) in universe_channels.items():
+            channels = np.array(channels[::-1], dtype=np.intp)  # Reversed, so later fixtures win on shared channels
+            channels, first_index = np.unique(channels, return_index=True)
+            in_range = (channels >= 0) & (channels < 512)
+            if in_range.any():
+                self.universes.append((universe_uuid, channels[in_range], np.array(fixture_indices[::-1], dtype=np.intp)[first_index][in_range],
+                                       np.array(axes[::-1], dtype=np.intp)[first_index][in_range]))
+
+    def build_patches(self, path_table: np.ndarray, position: float) -> dict:
+        """
+        Builds the patches of all fixtures at a position on the path
+        :param path_table: The sampled path (see sample_path)
+        :param position: The position on the path (0 - 1) of the first fixture
+        :return: The patches ({universe_uuid: UniversePatch})
+        """
+        points = path_table[((position + self.phases) * len(path_table)).astype(np.intp) % len(path_table)]
+        return {universe_uuid: UniversePatch(universe_uuid, channels, points[fixture_indices, axes])
+                for universe_uuid, channels, fixture_indices, axes in self.universes}
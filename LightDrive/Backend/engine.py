@@ -0,0 +1,873 @@
+from .artnet import ArtnetOutput, DEFAULT_KEEPALIVE_MS
+from .artnet_discovery import ArtnetDiscovery
+from .sacn import SacnOutput, DEFAULT_SACN_PRIORITY
+from .udp_sender import UdpSender
+from .tcp_socket import TcpSocketOutput, PROTOCOL_BINARY
+from .monitor import MonitorServer, DEFAULT_MONITOR_PORT
+from .clock import OutputClock
+from .merge import MergeEngine
+from .metrics import OutputMetrics, RemoteMetrics
+from .frame_store import UniverseFrameStore, SharedUniverseFrame
+from .patch import FadePatch
+import multiprocessing
+import numpy as np
+import collections
+import threading
+import queue
+import time
+
+METRICS_INTERVAL = 1
+MAX_ENGINE_RESTARTS = 3
+
+class DmxUniverse:
+    def __init__(self, universe_uuid: str, udp_sender: UdpSender, metrics: OutputMetrics = None,
+                 shared_frame: SharedUniverseFrame = None, universe_id: int = 0) -> None:
+        """
+        Creates the runtime of a universe (its frames and backends)
+        :param universe_uuid: The uuid of the universe
+        :param udp_sender: The instance of the UdpSender class shared by all universes
+        :param metrics: An instance of the OutputMetrics class to record the output in (optional)
+        :param shared_frame: The frame in the frame store to output to (optional, the output frame is a view of it)
+        :param universe_id: The numeric id of the universe (used to tag the frames of the TCP socket)
+        """
+        self.uuid = universe_uuid
+        self.universe_id = universe_id
+        self.udp_sender = udp_sender
+        self.metrics = metrics
+        self.shared_frame = shared_frame
+        self.artnet = None
+        self.sacn = None
+        self.tcp_socket = None
+        self.patched_channels = 512
+        self.frame = np.zeros(512, dtype=np.uint8)
+        self.output_frame = shared_frame.frame if shared_frame else np.zeros(512, dtype=np.uint8)
+
+    def configure_artnet(self, active: bool, target_ip: str, artnet_universe: int, hz: int, sync: bool = False,
+                         send_on_change: bool = False, keepalive_ms: int = DEFAULT_KEEPALIVE_MS, discovery: bool = False) -> None:
+        """
+        Configures the ArtNet backend
+        :param active: Whether the backend should be active
+        :param target_ip: The target IP address
+        :param artnet_universe: The ArtNet universe to use
+        :param hz: The refresh rate
+        :param sync: Whether to follow the packets with ArtSync
+        :param send_on_change: Whether to only send changes and keepalives instead of refreshing at the refresh rate
+        :param keepalive_ms: The keepalive interval when sending on change
+        :param discovery: Whether to unicast to the discovered nodes of the universe
+        :return: None
+        """
+        if self.artnet:
+            self.artnet.stop()
+            self.artnet = None
+        if active:
+            self.artnet = ArtnetOutput(self.udp_sender, target_ip, artnet_universe, hz, sync, send_on_change, keepalive_ms, discovery,
+                                       self.patched_channels)
+            self.artnet.set_values(self.output_frame)
+
+    def set_patched_channels(self, patched_channels: int) -> None:
+        """
+        Sets the highest channel used by the patch (the ArtNet packets are truncated to it)
+        :param patched_channels: The highest patched channel (0 - 512)
+        :return: None
+        """
+        self.patched_channels = patched_channels
+        if self.artnet:
+            self.artnet.set_patched_channels(patched_channels)
+
+    def configure_sacn(self, active: bool, sacn_universe: int, hz: int, multicast: bool = True, target_ip: str = "",
+                       priority: int = DEFAULT_SACN_PRIORITY, sync_universe: int = 0) -> None:
+        """
+        Configures the sACN backend
+        :param active: Whether the backend should be active
+        :param sacn_universe: The sACN universe to use
+        :param hz: The refresh rate
+        :param multicast: Whether to send to the multicast group of the universe instead of the target ip
+        :param target_ip: The target IP address for unicast
+        :param priority: The priority of the data
+        :param sync_universe: The universe to send sync packets on (0 disables sync)
+        :return: None
+        """
+        if self.sacn:
+            self.sacn.stop()
+            self.sacn = None
+        if active:
+            self.sacn = SacnOutput(self.udp_sender, sacn_universe, hz, multicast, target_ip, priority, sync_universe)
+            self.sacn.set_values(self.output_frame)
+
+    def configure_tcp_socket(self, active: bool, target_ip: str, port: int, hz: int, protocol: str = PROTOCOL_BINARY) -> None:
+        """
+        Configures the TCP socket backend
+        :param active: Whether the backend should be active
+        :param target_ip: The target IP address
+        :param port: The port to output to
+        :param hz: The refresh rate
+        :param protocol: The protocol of the frames ("binary" or "json")
+        :return: None
+        """
+        if self.tcp_socket:
+            self.tcp_socket.stop()
+            self.tcp_socket = None
+        if active:
+            self.tcp_socket = TcpSocketOutput(target_ip, port, hz, self.metrics, protocol, self.universe_id)
+            self.tcp_socket.set_values(self.output_frame)
+
+    def set_values(self, values: np.ndarray) -> bool:
+        """
+        Outputs the values provided to the backend (skipped if they are identical to the last output)
+        :param values: The values to output (512 uint8 values)
+        :return: Whether the values were sent to the backends
+        """
+        if np.array_equal(values, self.output_frame):
+            return False
+        if self.shared_frame:
+            self.shared_frame.write(values)
+        else:
+            self.output_frame[:] = values
+        if self.artnet:
+            self.artnet.set_values(self.output_frame)
+        if self.sacn:
+            self.sacn.set_values(self.output_frame)
+        if self.tcp_socket:
+            self.tcp_socket.set_values(self.output_frame)
+        if self.metrics:
+            self.metrics.count_universe_send(self.uuid)
+        return True
+
+    def stop(self) -> None:
+        """
+        Gracefully stops the backends
+        :return: None
+        """
+        if self.artnet:
+            self.artnet.stop()
+        if self.sacn:
+            self.sacn.stop()
+        if self.tcp_socket:
+            self.tcp_socket.stop()
+
+class OutputSource:
+    __slots__ = ("priority", "patches", "level", "fade_from", "fade_to", "fade_start", "fade_time", "remove_after_fade")
+
+    def __init__(self, priority: int, patches: dict) -> None:
+        """
+        Creates the engine side of a snippet (only its data)
+        :param priority: The layer of the source
+        :param patches: The patches of the source ({universe_uuid: UniversePatch})
+        """
+        self.priority = priority
+        self.patches = patches
+        self.level = 1.0
+        self.fade_from = 1.0
+        self.fade_to = 1.0
+        self.fade_start = 0.0
+        self.fade_time = 0.0
+        self.remove_after_fade = False
+
+    def start_fade(self, level: float, fade_time: float, now: float) -> None:
+        """
+        Starts fading the source from its current level to a new one
+        :param level: The level to fade to (0 - 1)
+        :param fade_time: The duration of the fade in seconds (0 jumps to the level)
+        :param now: The current time (time.perf_counter())
+        :return: None
+        """
+        if fade_time <= 0:
+            self.level = level
+        self.fade_from = self.level
+        self.fade_to = level
+        self.fade_start = now
+        self.fade_time = fade_time
+
+    def update_level(self, now: float) -> bool:
+        """
+        Updates the level of the source for the current time
+        :param now: The current time (time.perf_counter())
+        :return: Whether the source is still fading
+        """
+        if self.fade_time <= 0:
+            return False
+        progress = min(1.0, (now - self.fade_start) / self.fade_time)
+        self.level = self.fade_from + (self.fade_to - self.fade_from) * progress
+        if progress >= 1:
+            self.fade_time = 0.0
+            return False
+        return True
+
+class OutputEngine:
+    def __init__(self, frame_rate: int = 44, frame_store_prefix: str = None) -> None:
+        """
+        Creates the output engine, which merges the sources and sends the frames once per frame on its own clock thread
+        The engine only works with data (patches, masks and configurations), so it can run in a separate process.
+        The sent frames are published in a shared memory frame store, so other processes can read them.
+        :param frame_rate: The rate at which frames are merged and sent
+        :param frame_store_prefix: The prefix of the frame store segments (defaults to one unique to this process)
+        """
+        self.universes = {}
+        self.sources = {}
+        self.fading_sources = {}
+        self.fading_patches = {}  # {source_id: end of the latest fade} of the sources that have fade patches
+        self.dirty_universes = set()
+        self.patched_channels = None  # {universe_uuid: highest patched channel}, None until the patch is known
+        self.next_universe_id = 1
+        self.monitor = None
+        self.output_lock = threading.Lock()
+        self.merge_engine = MergeEngine()
+        self.metrics = OutputMetrics()
+        self.udp_sender = UdpSender(metrics=self.metrics)
+        self.frame_store = UniverseFrameStore(frame_store_prefix)
+        self.errors = collections.deque()
+        self.clock = OutputClock(self.tick_output, frame_rate, self.metrics, self.report_error)
+
+    def start(self) -> None:
+        """
+        Starts the output clock
+        :return: None
+        """
+        self.clock.start()
+
+    def insert_source(self, source_id: int, priority: int, patches: dict, fade_time: float = 0) -> None:
+        """
+        Adds a source (a source that is still fading out is faded back in from its current level)
+        :param source_id: The id of the source
+        :param priority: The layer of the source
+        :param patches: The patches of the source ({universe_uuid: UniversePatch})
+        :param fade_time: The duration of the fade in seconds (0 cuts in)
+        :return: None
+        """
+        with self.output_lock:
+            source = self.sources.get(source_id)
+            if source is None:
+                source = self.sources[source_id] = OutputSource(priority, patches)
+                source.level = 0.0
+            else:
+                self.dirty_universes.update(source.patches)
+                source.priority = priority
+                source.patches = patches
+            source.remove_after_fade = False
+            self._track_fade_patches(source_id, patches)
+            self._start_fade(source_id, source, 1.0, fade_time)
+
+    def set_source(self, source_id: int, priority: int, patches: dict) -> None:
+        """
+        Replaces the values of a source (a running fade continues)
+        :param source_id: The id of the source
+        :param priority: The layer of the source
+        :param patches: The patches of the source ({universe_uuid: UniversePatch})
+        :return: None
+        """
+        with self.output_lock:
+            source = self.sources.get(source_id)
+            if source is None:
+                return
+            self.dirty_universes.update(source.patches)  # Universes that lost values need to be merged again too
+            source.priority = priority
+            source.patches = patches
+            self._track_fade_patches(source_id, patches)
+            self.dirty_universes.update(patches)
+
+    def remove_source(self, source_id: int, fade_time: float = 0) -> None:
+        """
+        Removes a source
+        :param source_id: The id of the source
+        :param fade_time: The duration of the fade out in seconds (0 cuts out), the source is removed once it finished
+        :return: None
+        """
+        with self.output_lock:
+            source = self.sources.get(source_id)
+            if source is None:
+                return
+            if fade_time > 0:
+                source.remove_after_fade = True
+                self._start_fade(source_id, source, 0.0, fade_time)
+            else:
+                del self.sources[source_id]
+                self.fading_sources.pop(source_id, None)
+                self.fading_patches.pop(source_id, None)
+                self.dirty_universes.update(source.patches)
+
+    def _start_fade(self, source_id: int, source: OutputSource, level: float, fade_time: float) -> None:
+        """
+        Starts a fade of a source (the output lock must be held)
+        :param source_id: The id of the source
+        :param source: The source to fade
+        :param level: The level to fade to
+        :param fade_time: The duration of the fade in seconds
+        :return: None
+        """
+        source.start_fade(level, fade_time, time.perf_counter())
+        if fade_time > 0:
+            self.fading_sources[source_id] = source
+        else:
+            self.fading_sources.pop(source_id, None)
+        self.dirty_universes.update(source.patches)
+
+    def _track_fade_patches(self, source_id: int, patches: dict) -> None:
+        """
+        Keeps the universes of a source dirty until its fade patches finished fading (the output lock must be held)
+        :param source_id: The id of the source
+        :param patches: The new patches of the source ({universe_uuid: UniversePatch})
+        :return: None
+        """
+        fade_end = max((patch.fade_end() for patch in patches.values() if isinstance(patch, FadePatch)), default=0.0)
+        if fade_end > time.perf_counter():
+            self.fading_patches[source_id] = fade_end
+        else:
+            self.fading_patches.pop(source_id, None)
+
+    def set_htp_masks(self, htp_masks: dict) -> None:
+        """
+        Sets the precomputed HTP masks and merges all universes again
+        :param htp_masks: The masks per universe ({universe_uuid: htp_mask})
+        :return: None
+        """
+        with self.output_lock:
+            self.merge_engine.set_htp_masks(htp_masks)
+            self.dirty_universes.update(self.universes)
+
+    def set_patched_channels(self, patched_channels: dict) -> None:
+        """
+        Sets the highest channel used by the patch of every universe (universes without fixtures use 0)
+        :param patched_channels: The highest patched channel per universe ({universe_uuid: channel})
+        :return: None
+        """
+        with self.output_lock:
+            self.patched_channels = patched_channels
+            for universe_uuid, universe in self.universes.items():
+                universe.set_patched_channels(patched_channels.get(universe_uuid, 0))
+
+    def mark_dirty(self, universe_uuids) -> None:
+        """
+        Marks universes as dirty, so they get merged again on the next tick
+        :param universe_uuids: The uuids of the universes that changed
+        :return: None
+        """
+        with self.output_lock:
+            self.dirty_universes.update(universe_uuids)
+
+    def set_frame_rate(self, frame_rate: int) -> None:
+        """
+        Changes the rate of the output clock
+        :param frame_rate: The new frame rate
+        :return: None
+        """
+        self.clock.set_rate(frame_rate)
+
+    def tick_output(self) -> None:
+        """
+        Ticks the output updating values in the backends (only dirty universes are merged again)
+        This is called by the output clock once per frame.
+        :return: None
+        """
+        frame_start = time.perf_counter()
+        merge_time = 0.0
+        with self.output_lock:
+            self._update_fades(frame_start)
+            dirty_universes = self.dirty_universes
+            self.dirty_universes = set()
+            relevant_sources = list(self.sources.values())
+            universes_sent = False
+            for universe_uuid in dirty_universes:
+                universe = self.universes.get(universe_uuid)
+                if universe is None:
+                    continue  # Sources can contain values for universes that do not exist (anymore)
+                merge_start = time.perf_counter()
+                self.merge_engine.merge_universe(universe_uuid, universe.frame, relevant_sources, frame_start)
+                merge_time += time.perf_counter() - merge_start
+                universes_sent |= universe.set_values(universe.frame)
+            self.udp_sender.flush()  # Sends all changed universes in one burst
+            if self.monitor and (universes_sent or self.monitor.needs_frame) and self.monitor.has_clients():
+                self.monitor.publish_frames([(universe.universe_id, universe.output_frame.tobytes())
+                                             for universe in self.universes.values()])
+        if dirty_universes:
+            self.metrics.add_timing("merge", merge_time)
+        self.metrics.add_timing("frame", time.perf_counter() - frame_start)
+        self.metrics.frame_finished(sum(1 for source in relevant_sources if source.patches))
+
+    def _update_fades(self, now: float) -> None:
+        """
+        Updates the levels of all fading sources and marks their universes dirty (the output lock must be held)
+        Sources that finished fading out are removed. The universes of sources with fade patches stay dirty until the
+        patches finished fading.
+        :param now: The current time (time.perf_counter())
+        :return: None
+        """
+        for source_id, source in list(self.fading_sources.items()):
+            self.dirty_universes.update(source.patches)
+            if source.update_level(now):
+                continue
+            del self.fading_sources[source_id]
+            if source.remove_after_fade:
+                del self.sources[source_id]
+                self.fading_patches.pop(source_id, None)
+        for source_id, fade_end in list(self.fading_patches.items()):
+            self.dirty_universes.update(self.sources[source_id].patches)
+            if now >= fade_end:  # Merged once more at the end of the fade
+                del self.fading_patches[source_id]
+
+    def create_universe(self, universe_uuid: str) -> None:
+        """
+        Creates a universe
+        :param universe_uuid: The uuid of the universe
+        :return: None
+        """
+        with self.output_lock:
+            universe = self.universes[universe_uuid] = DmxUniverse(universe_uuid, self.udp_sender, self.metrics,
+                                                                   self.frame_store.create(universe_uuid), self.next_universe_id)
+            self.next_universe_id += 1
+            if self.patched_channels is not None:
+                universe.set_patched_channels(self.patched_channels.get(universe_uuid, 0))
+            self.dirty_universes.add(universe_uuid)
+            self._update_monitor_index()
+
+    def remove_universe(self, universe_uuid: str) -> None:
+        """
+        Removes a universe
+        :param universe_uuid: The uuid of the universe to remove
+        :return: None
+        """
+        detached_discovery = None
+        with self.output_lock:
+            universe = self.universes.pop(universe_uuid, None)
+            if universe is not None:
+                universe.stop()
+                del universe  # Release the view of the shared frame, so the segment can be closed
+                self.frame_store.remove(universe_uuid)
+                self.merge_engine.remove_universe(universe_uuid)
+                detached_discovery = self._update_artnet_discovery()
+                self._update_monitor_index()
+        if detached_discovery is not None:
+            detached_discovery.stop()  # Waits for its thread, so it is stopped after releasing the output lock
+
+    def configure_artnet(self, universe_uuid: str, active: bool, target_ip: str, artnet_universe: int, hz: int, sync: bool = False,
+                         send_on_change: bool = False, keepalive_ms: int = DEFAULT_KEEPALIVE_MS, discovery: bool = False) -> None:
+        """
+        Configures the ArtNet backend of a universe
+        :param universe_uuid: The uuid of the universe to configure
+        :param active: Whether the backend should be active
+        :param target_ip: The target IP address
+        :param artnet_universe: The ArtNet universe to use
+        :param hz: The refresh rate
+        :param sync: Whether to follow the packets with ArtSync
+        :param send_on_change: Whether to only send changes and keepalives instead of refreshing at the refresh rate
+        :param keepalive_ms: The keepalive interval when sending on change
+        :param discovery: Whether to unicast to the discovered nodes of the universe
+        :return: None
+        """
+        detached_discovery = None
+        with self.output_lock:
+            if universe_uuid in self.universes:
+                self.universes[universe_uuid].configure_artnet(active, target_ip, artnet_universe, hz, sync, send_on_change, keepalive_ms, discovery)
+                detached_discovery = self._update_artnet_discovery()
+        if detached_discovery is not None:
+            detached_discovery.stop()  # Waits for its thread, so it is stopped after releasing the output lock
+
+    def _update_artnet_discovery(self) -> ArtnetDiscovery | None:
+        """
+        Starts the ArtNet discovery if any universe uses it and detaches it if none does (the output lock must be held)
+        Stopping the discovery waits for its thread, so the caller stops the detached discovery after releasing the lock.
+        :return: The detached discovery that needs to be stopped (None if it is still used or was not running)
+        """
+        discovery_used = any(isinstance(output, ArtnetOutput) and output.discovery for output in self.udp_sender.outputs)
+        if discovery_used and self.udp_sender.discovery is None:
+            self.udp_sender.discovery = ArtnetDiscovery()
+            if self.udp_sender.discovery.error:
+                self.report_error(self.udp_sender.discovery.error)
+        elif not discovery_used and self.udp_sender.discovery is not None:
+            detached_discovery = self.udp_sender.discovery
+            self.udp_sender.discovery = None
+            return detached_discovery
+        return None
+
+    def configure_sacn(self, universe_uuid: str, active: bool, sacn_universe: int, hz: int, multicast: bool = True,
+                       target_ip: str = "", priority: int = DEFAULT_SACN_PRIORITY, sync_universe: int = 0) -> None:
+        """
+        Configures the sACN backend of a universe
+        :param universe_uuid: The uuid of the universe to configure
+        :param active: Whether the backend should be active
+        :param sacn_universe: The sACN universe to use
+        :param hz: The refresh rate
+        :param multicast: Whether to send to the multicast group of the universe instead of the target ip
+        :param target_ip: The target IP address for unicast
+        :param priority: The priority of the data
+        :param sync_universe: The universe to send sync packets on (0 disables sync)
+        :return: None
+        """
+        with self.output_lock:
+            if universe_uuid in self.universes:
+                self.universes[universe_uuid].configure_sacn(active, sacn_universe, hz, multicast, target_ip, priority, sync_universe)
+
+    def configure_tcp_socket(self, universe_uuid: str, active: bool, target_ip: str, port: int, hz: int,
+                             protocol: str = PROTOCOL_BINARY) -> None:
+        """
+        Configures the TCP socket backend of a universe
+        :param universe_uuid: The uuid of the universe to configure
+        :param active: Whether the backend should be active
+        :param target_ip: The target IP address
+        :param port: The port to output to
+        :param hz: The refresh rate
+        :param protocol: The protocol of the frames ("binary" or "json")
+        :return: None
+        """
+        with self.output_lock:
+            if universe_uuid in self.universes:
+                self.universes[universe_uuid].configure_tcp_socket(active, target_ip, port, hz, protocol)
+
+    def configure_monitor(self, active: bool, target_ip: str = "0.0.0.0", port: int = DEFAULT_MONITOR_PORT, delta: bool = False,
+                          socket_path: str = "") -> None:
+        """
+        Configures the monitoring stream (streams all universes over a single TCP or Unix domain socket connection)
+        :param active: Whether the stream should be active
+        :param target_ip: The ip to listen on
+        :param port: The port to listen on (0 only listens on the socket path)
+        :param delta: Whether to only send the changed channels (with periodic keyframes)
+        :param socket_path: The path of a Unix domain socket to listen on for clients on the same host (optional)
+        :return: None
+        """
+        with self.output_lock:
+            if self.monitor:
+                self.monitor.stop()
+                self.monitor = None
+            if active:
+                self.monitor = MonitorServer(target_ip, port, self.metrics, delta, socket_path=socket_path,
+                                             frame_store_prefix=self.frame_store.prefix)
+                self._update_monitor_index()
+
+    def _update_monitor_index(self) -> None:
+        """
+        Sends the ids of the universes to the clients of the monitoring stream (the output lock must be held)
+        :return: None
+        """
+        if self.monitor:
+            self.monitor.set_universes({universe_uuid: universe.universe_id for universe_uuid, universe in self.universes.items()})
+
+    def get_frame(self, universe_uuid: str) -> np.ndarray | None:
+        """
+        Gets the last frame that was sent to a universe
+        :param universe_uuid: The uuid of the universe
+        :return: A copy of the frame (None if the universe does not exist or its frame is stale)
+        """
+        shared_frame = self.frame_store.frames.get(universe_uuid)
+        return read_shared_frame(shared_frame, universe_uuid, self.report_error) if shared_frame is not None else None
+
+    def report_error(self, message: str) -> None:
+        """
+        Reports an error of the engine, so the GUI can show it (also called by the clock thread for failing frames)
+        :param message: The error message
+        :return: None
+        """
+        self.errors.append(message)
+
+    def take_errors(self) -> list:
+        """
+        Gets the errors reported since the last call
+        :return: The error messages
+        """
+        errors = []
+        while self.errors:
+            errors.append(self.errors.popleft())
+        return errors
+
+    def shutdown(self) -> None:
+        """
+        Gracefully stops the output clock and all backends
+        :return: None
+        """
+        self.clock.stop()
+        with self.output_lock:
+            for universe in self.universes.values():
+                universe.stop()
+            self.universes = {}
+            detached_discovery = self._update_artnet_discovery()
+            if self.monitor:
+                self.monitor.stop()
+                self.monitor = None
+            self.udp_sender.close()
+            self.frame_store.close()
+        if detached_discovery is not None:
+            detached_discovery.stop()
+
+def read_shared_frame(shared_frame: SharedUniverseFrame, universe_uuid: str, report_error) -> np.ndarray | None:
+    """
+    Reads the frame of a universe from the frame store, a frame that became stale is reported once
+    :param shared_frame: The shared frame of the universe
+    :param universe_uuid: The uuid of the universe
+    :param report_error: The function to report the error with
+    :return: A copy of the frame (None if it is stale)
+    """
+    was_stale = shared_frame.stale
+    frame = shared_frame.read()[1]
+    if frame is None and not was_stale:
+        report_error(f"The frame of universe {universe_uuid} is stale, it was not written completely")
+    return frame
+
+def run_engine_process(frame_rate: int, frame_store_prefix: str, command_queue, status_queue) -> None:
+    """
+    Runs an output engine until it receives the shutdown command (the entry point of the engine process)
+    :param frame_rate: The rate at which frames are merged and sent
+    :param frame_store_prefix: The prefix of the frame store segments
+    :param command_queue: The queue to receive the commands from ((method_name, args))
+    :param status_queue: The queue to post the metrics to ((message_type, data))
+    :return: None
+    """
+    engine = OutputEngine(frame_rate, frame_store_prefix)
+    engine.start()
+    last_metrics = time.perf_counter()
+    try:
+        while True:
+            try:
+                method_name, args = command_queue.get(timeout=METRICS_INTERVAL)
+            except queue.Empty:
+                method_name = None
+            if method_name == "shutdown":
+                break
+            if method_name:
+                try:
+                    getattr(engine, method_name)(*args)
+                except Exception as error:  # A failing command must not stop the output, report it to the GUI instead
+                    status_queue.put(("error", f"{method_name} failed: {error}"))
+            for error in engine.take_errors():
+                status_queue.put(("error", error))
+            if time.perf_counter() - last_metrics >= METRICS_INTERVAL:
+                status_queue.put(("metrics", engine.metrics.snapshot()))
+                last_metrics = time.perf_counter()
+    finally:
+        engine.shutdown()  # Also closes the frame store, so no shared memory segment is left behind
+        status_queue.put(("stopped", None))
+
+class EngineProcessClient:
+    def __init__(self, frame_rate: int = 44) -> None:
+        """
+        Runs the output engine in a separate process and forwards all calls to it
+        The metrics of the engine are received on a thread and the frames are read from the shared frame store,
+        so a busy GUI never stalls the output.
+        The calls that define the state of the engine are recorded, so the engine can be restarted with the same state
+        if its process stops unexpectedly.
+        :param frame_rate: The rate at which frames are merged and sent
+        """
+        self.context = multiprocessing.get_context("spawn")  # Forking a running Qt application is not safe
+        self.frame_rate = frame_rate
+        self.metrics = RemoteMetrics()
+        self.frame_store = UniverseFrameStore()
+        self.lock = threading.Lock()
+        self.state = {}  # The recorded calls ({state_key: (method_name, args)}), in the order they need to be replayed
+        self.errors = collections.deque()
+        self.restarts = 0
+        self.stopping = False
+        self.start_process()
+
+        self.receive_thread = threading.Thread(target=self.receive_status, name="LightDrive engine status")
+        self.receive_thread.daemon = True
+        self.receive_thread.start()
+
+    def start_process(self) -> None:
+        """
+        Starts the engine process (with new queues, so no command of a previous process is executed twice)
+        :return: None
+        """
+        self.command_queue = self.context.Queue()
+        self.status_queue = self.context.Queue()
+        self.process = self.context.Process(target=run_engine_process,
+                                            args=(self.frame_rate, self.frame_store.prefix, self.command_queue, self.status_queue),
+                                            name="LightDrive output engine", daemon=True)
+        self.process.start()
+
+    def call(self, method_name: str, *args) -> None:
+        """
+        Calls a method of the engine in the engine process (without waiting for it)
+        :param method_name: The name of the method
+        :param args: The arguments of the method
+        :return: None
+        """
+        with self.lock:
+            self._record_call(method_name, args)
+            self.command_queue.put((method_name, args))
+
+    def _record_call(self, method_name: str, args: tuple) -> None:
+        """
+        Records a call that defines the state of the engine, so it can be replayed after a restart (the lock must be held)
+        :param method_name: The name of the method
+        :param args: The arguments of the method
+        :return: None
+        """
+        match method_name:
+            case "insert_source":
+                self.state[("source", args[0])] = ("insert_source", args[:3])  # Replayed without the fade
+            case "set_source":
+                if ("source", args[0]) in self.state:
+                    self.state[("source", args[0])] = ("insert_source", args)
+            case "remove_source":
+                self.state.pop(("source", args[0]), None)
+            case "create_universe":
+                self.state[("universe", args[0])] = (method_name, args)
+            case "remove_universe":
+                for state_key in [state_key for state_key in self.state if state_key[1:] == (args[0],) and state_key[0] != "source"]:
+                    del self.state[state_key]
+            case "configure_artnet" | "configure_sacn" | "configure_tcp_socket":
+                self.state[(method_name, args[0])] = (method_name, args)
+            case "set_htp_masks" | "set_patched_channels" | "set_frame_rate" | "configure_monitor":
+                self.state[(method_name,)] = (method_name, args)
+
+    def restart(self) -> None:
+        """
+        Starts a new engine process after the previous one stopped unexpectedly and replays the recorded state
+        :return: None
+        """
+        with self.lock:
+            self.restarts += 1
+            universe_uuids = [state_key[1] for state_key in self.state if state_key[0] == "universe"]
+            self.frame_store.close()
+            for universe_uuid in universe_uuids:
+                self.frame_store.unlink(universe_uuid)  # The stopped process could not remove its segments
+            self.start_process()
+            for method_name, args in self.state.values():
+                self.command_queue.put((method_name, args))
+
+    def report_error(self, message: str) -> None:
+        """
+        Reports an error of the engine, so the GUI can show it
+        :param message: The error message
+        :return: None
+        """
+        self.errors.append(message)
+
+    def take_errors(self) -> list:
+        """
+        Gets the errors reported since the last call
+        :return: The error messages
+        """
+        errors = []
+        while self.errors:
+            errors.append(self.errors.popleft())
+        return errors
+
+    def receive_status(self) -> None:
+        """
+        Receives the metrics and errors of the engine until it stopped
+        If the process stops without being shut down, it is restarted (up to MAX_ENGINE_RESTARTS times).
+        :return: None
+        """
+        while True:
+            try:
+                message_type, data = self.status_queue.get(timeout=METRICS_INTERVAL)
+            except queue.Empty:
+                if self.stopping or self.process.is_alive():
+                    continue
+                if self.restarts >= MAX_ENGINE_RESTARTS:
+                    self.report_error(f"The engine process stopped unexpectedly (exit code {self.process.exitcode}) "
+                                      f"and was restarted too often, the output is stopped")
+                    break
+                self.report_error(f"The engine process stopped unexpectedly (exit code {self.process.exitcode}), restarting it")
+                self.restart()
+                continue
+            if message_type == "metrics":
+                self.metrics.update(data)
+            elif message_type == "error":
+                self.report_error(data)
+            elif message_type == "stopped":
+                break
+
+    def insert_source(self, source_id: int, priority: int, patches: dict, fade_time: float = 0) -> None:
+        """
+        Forwarded to OutputEngine.insert_source in the engine process
+        """
+        self.call("insert_source", source_id, priority, patches, fade_time)
+
+    def set_source(self, source_id: int, priority: int, patches: dict) -> None:
+        """
+        Forwarded to OutputEngine.set_source in the engine process
+        """
+        self.call("set_source", source_id, priority, patches)
+
+    def remove_source(self, source_id: int, fade_time: float = 0) -> None:
+        """
+        Forwarded to OutputEngine.remove_source in the engine process
+        """
+        self.call("remove_source", source_id, fade_time)
+
+    def set_htp_masks(self, htp_masks: dict) -> None:
+        """
+        Forwarded to OutputEngine.set_htp_masks in the engine process
+        """
+        self.call("set_htp_masks", htp_masks)
+
+    def set_patched_channels(self, patched_channels: dict) -> None:
+        """
+        Forwarded to OutputEngine.set_patched_channels in the engine process
+        """
+        self.call("set_patched_channels", patched_channels)
+
+    def mark_dirty(self, universe_uuids) -> None:
+        """
+        Forwarded to OutputEngine.mark_dirty in the engine process
+        """
+        self.call("mark_dirty", list(universe_uuids))
+
+    def set_frame_rate(self, frame_rate: int) -> None:
+        """
+        Forwarded to OutputEngine.set_frame_rate in the engine process
+        """
+        self.call("set_frame_rate", frame_rate)
+
+    def create_universe(self, universe_uuid: str) -> None:
+        """
+        Forwarded to OutputEngine.create_universe in the engine process
+        """
+        self.call("create_universe", universe_uuid)
+
+    def remove_universe(self, universe_uuid: str) -> None:
+        """
+        Forwarded to OutputEngine.remove_universe in the engine process
+        """
+        self.frame_store.remove(universe_uuid)
+        self.call("remove_universe", universe_uuid)
+
+    def configure_artnet(self, universe_uuid: str, active: bool, target_ip: str, artnet_universe: int, hz: int, sync: bool = False,
+                         send_on_change: bool = False, keepalive_ms: int = DEFAULT_KEEPALIVE_MS, discovery: bool = False) -> None:
+        """
+        Forwarded to OutputEngine.configure_artnet in the engine process
+        """
+        self.call("configure_artnet", universe_uuid, active, target_ip, artnet_universe, hz, sync, send_on_change, keepalive_ms, discovery)
+
+    def configure_sacn(self, universe_uuid: str, active: bool, sacn_universe: int, hz: int, multicast: bool = True,
+                       target_ip: str = "", priority: int = DEFAULT_SACN_PRIORITY, sync_universe: int = 0) -> None:
+        """
+        Forwarded to OutputEngine.configure_sacn in the engine process
+        """
+        self.call("configure_sacn", universe_uuid, active, sacn_universe, hz, multicast, target_ip, priority, sync_universe)
+
+    def configure_tcp_socket(self, universe_uuid: str, active: bool, target_ip: str, port: int, hz: int,
+                             protocol: str = PROTOCOL_BINARY) -> None:
+        """
+        Forwarded to OutputEngine.configure_tcp_socket in the engine process
+        """
+        self.call("configure_tcp_socket", universe_uuid, active, target_ip, port, hz, protocol)
+
+    def configure_monitor(self, active: bool, target_ip: str = "0.0.0.0", port: int = DEFAULT_MONITOR_PORT, delta: bool = False,
+                          socket_path: str = "") -> None:
+        """
+        Forwarded to OutputEngine.configure_monitor in the engine process
+        """
+        self.call("configure_monitor", active, target_ip, port, delta, socket_path)
+
+    def get_frame(self, universe_uuid: str) -> np.ndarray | None:
+        """
+        Gets the last frame the engine sent to a universe (read from the frame store)
+        :param universe_uuid: The uuid of the universe
+        :return: A copy of the frame (None if the engine did not create the universe yet or its frame is stale)
+        """
+        shared_frame = self.frame_store.attach(universe_uuid)
+        return read_shared_frame(shared_frame, universe_uuid, self.report_error) if shared_frame is not None else None
+
+    def shutdown(self) -> None:
+        """
+        Stops the engine process (it is killed if it does not stop in time)
+        :return: None
+        """
+        self.stopping = True
+        self.call("shutdown")
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.status_queue.put(("stopped", None))
+        self.receive_thread.join(timeout=1)
+        self.frame_store.close()
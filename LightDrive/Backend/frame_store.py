@@ -0,0 +1,174 @@
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+import hashlib
+import sys
+import os
+
+FRAME_SIZE = 512
+SEQUENCE_SIZE = 8
+SEGMENT_SIZE = SEQUENCE_SIZE + FRAME_SIZE
+MAX_READ_ATTEMPTS = 2000  # A write takes microseconds, a counter that stays odd longer means the writer stopped mid-write
+
+def frame_store_name(prefix: str, universe_uuid: str) -> str:
+    """
+    Gets the name of the shared memory segment of a universe
+    The uuid is hashed, since shared memory names are limited to 31 characters on some systems.
+    :param prefix: The prefix of the frame store
+    :param universe_uuid: The uuid of the universe
+    :return: The name of the segment
+    """
+    return f"{prefix}_{hashlib.sha1(universe_uuid.encode()).hexdigest()[:12]}"
+
+def default_frame_store_prefix() -> str:
+    """
+    Gets the prefix of the frame store of this process (unique per running LightDrive instance)
+    :return: The prefix
+    """
+    return f"ld_{os.getpid()}"
+
+class SharedUniverseFrame:
+    def __init__(self, name: str, create: bool = False, track: bool = True) -> None:
+        """
+        Creates or attaches to the shared memory segment of a universe
+        The segment holds a sequence counter (uint64) followed by the 512 values of the frame.
+        The counter is odd while a frame is written, so readers can detect and retry torn reads (a seqlock).
+        :param name: The name of the segment
+        :param create: Whether to create the segment (only the engine does) or to attach to an existing one
+        :param track: Whether the resource tracker of this process may track the segment.
+                      Programs that are not started by LightDrive must attach with False,
+                      otherwise their resource tracker removes the segment when they exit.
+        """
+        self.name = name
+        self.owner = create
+        self.stale = False  # Whether the last read gave up, since no consistent frame could be read
+        if not track and sys.version_info >= (3, 13):
+            self.shared_memory = shared_memory.SharedMemory(name=name, create=create, size=SEGMENT_SIZE, track=False)
+        else:
+            self.shared_memory = shared_memory.SharedMemory(name=name, create=create, size=SEGMENT_SIZE)
+            if not track:
+                resource_tracker.unregister(self.shared_memory._name, "shared_memory")
+        self.sequence = np.ndarray(1, dtype=np.uint64, buffer=self.shared_memory.buf)
+        self.frame = np.ndarray(FRAME_SIZE, dtype=np.uint8, buffer=self.shared_memory.buf, offset=SEQUENCE_SIZE)
+        if create:
+            self.sequence[0] = 0
+            self.frame.fill(0)
+
+    def write(self, values: np.ndarray) -> None:
+        """
+        Writes a frame (only one writer is allowed)
+        :param values: The 512 uint8 values of the frame
+        :return: None
+        """
+        self.sequence[0] += 1
+        self.frame[:] = values
+        self.sequence[0] += 1
+
+    def read(self, out: np.ndarray = None) -> tuple:
+        """
+        Reads a consistent copy of the latest frame
+        Torn reads are retried up to MAX_READ_ATTEMPTS times. If no consistent copy could be read by then (e.g. the writer
+        stopped in the middle of a write), the frame is marked as stale and None is returned instead of the frame.
+        :param out: An array to copy the frame into (a new array is created if not provided)
+        :return: The sequence number of the frame and the frame ((sequence, frame), the frame is None if it is stale)
+        """
+        if out is None:
+            out = np.empty(FRAME_SIZE, dtype=np.uint8)
+        for _ in range(MAX_READ_ATTEMPTS):
+            sequence = int(self.sequence[0])
+            if sequence % 2:
+                continue  # A frame is being written right now
+            out[:] = self.frame
+            if int(self.sequence[0]) == sequence:
+                self.stale = False
+                return sequence // 2, out
+        self.stale = True
+        return int(self.sequence[0]) // 2, None
+
+    def close(self) -> None:
+        """
+        Detaches from the segment (and removes it if this is the engine that created it)
+        :return: None
+        """
+        del self.sequence
+        del self.frame
+        try:
+            self.shared_memory.close()
+        except BufferError:
+            pass  # Someone still holds a view of the frame, the memory is freed once it is gone
+        if self.owner:
+            self.shared_memory.unlink()
+
+class UniverseFrameStore:
+    def __init__(self, prefix: str = None, track: bool = True) -> None:
+        """
+        Creates a store holding the latest output frame of every universe in shared memory
+        Backends and other processes on the same host can read the frames zero-copy by attaching to the segments.
+        :param prefix: The prefix of the segment names (defaults to one unique to this process)
+        :param track: Whether the resource tracker may track the attached segments (False for programs not started by LightDrive)
+        """
+        self.prefix = prefix or default_frame_store_prefix()
+        self.track = track
+        self.frames = {}
+
+    def name(self, universe_uuid: str) -> str:
+        """
+        Gets the name of the segment of a universe
+        :param universe_uuid: The uuid of the universe
+        :return: The name of the segment
+        """
+        return frame_store_name(self.prefix, universe_uuid)
+
+    def create(self, universe_uuid: str) -> SharedUniverseFrame:
+        """
+        Creates the segment of a universe
+        :param universe_uuid: The uuid of the universe
+        :return: The shared frame of the universe
+        """
+        self.remove(universe_uuid)
+        self.frames[universe_uuid] = SharedUniverseFrame(self.name(universe_uuid), create=True)
+        return self.frames[universe_uuid]
+
+    def attach(self, universe_uuid: str) -> SharedUniverseFrame | None:
+        """
+        Attaches to the segment of a universe created by another process
+        :param universe_uuid: The uuid of the universe
+        :return: The shared frame of the universe (None if it does not exist)
+        """
+        if universe_uuid not in self.frames:
+            try:
+                self.frames[universe_uuid] = SharedUniverseFrame(self.name(universe_uuid), track=self.track)
+            except FileNotFoundError:
+                return None
+        return self.frames[universe_uuid]
+
+    def remove(self, universe_uuid: str) -> None:
+        """
+        Closes the segment of a universe
+        :param universe_uuid: The uuid of the universe
+        :return: None
+        """
+        shared_frame = self.frames.pop(universe_uuid, None)
+        if shared_frame is not None:
+            shared_frame.close()
+
+    def unlink(self, universe_uuid: str) -> None:
+        """
+        Removes the segment of a universe that was left behind by an engine that stopped without closing its store
+        :param universe_uuid: The uuid of the universe
+        :return: None
+        """
+        self.remove(universe_uuid)
+        try:
+            shared_frame = SharedUniverseFrame(self.name(universe_uuid), track=self.track)
+        except FileNotFoundError:
+            return
+        shared_frame.owner = True  # Take over the segment, so closing it removes it
+        shared_frame.close()
+
+    def close(self) -> None:
+        """
+        Closes all segments
+        :return: None
+        """
+        for universe_uuid in list(self.frames):
+            self.remove(universe_uuid)
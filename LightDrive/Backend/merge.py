@@ -0,0 +1,223 @@
+from .patch import FadePatch
+from itertools import groupby, accumulate
+import numpy as np
+
+HTP_CHANNEL_TYPES = ("Intensity",)
+
+def build_htp_mask(channel_types: dict) -> np.ndarray:
+    """
+    Builds the HTP mask of a universe
+    :param channel_types: The types of the patched channels ({zero_based_channel: channel_type})
+    :return: A boolean array that is True for every channel that is merged highest takes precedence
+    """
+    htp_mask = np.zeros(512, dtype=bool)
+    for channel, channel_type in channel_types.items():
+        if 0 <= channel < 512 and channel_type in HTP_CHANNEL_TYPES:
+            htp_mask[channel] = True
+    return htp_mask
+
+class MergeEngine:
+    def __init__(self) -> None:
+        """
+        Creates the merge engine
+        Snippets are merged in layers ordered by their priority. A higher layer overrides every channel it writes to.
+        Inside a layer, HTP channels (e.g. intensity) use the highest value and all other channels use the latest value.
+        Sources that are fading are interpolated between the values beneath them and their own values. On LTP channels,
+        fading values written after the latest full level value of a layer are mixed into it weighted by their levels.
+        Fade patches (e.g. the step fades of sequences) are evaluated on every merge and fade per channel the same way.
+        """
+        self.htp_masks = {}
+        self.empty_mask = np.zeros(512, dtype=bool)
+        self.layer_stacks = {}  # The stacked patches of the layers of every universe ({universe_uuid: {priority: stack}})
+        # Scratch buffers of the universe that is merged, one universe is merged at a time so they are reused for all
+        self.layer_values = np.zeros(512, dtype=np.uint8)
+        self.layer_latest = np.zeros(512, dtype=np.intp)
+        self.layer = np.zeros(512, dtype=np.uint8)
+        self.layer_written = np.zeros(512, dtype=bool)
+        self.highest = np.zeros(512, dtype=np.float32)
+        self.latest = np.zeros(512, dtype=np.float32)
+        self.level_sums = np.zeros(512, dtype=np.float32)
+        self.weighted_values = np.zeros(512, dtype=np.float32)
+        self.remaining_levels = np.zeros(512, dtype=np.float32)
+        self.indices = np.arange(512)
+
+    def set_htp_masks(self, htp_masks: dict) -> None:
+        """
+        Sets the precomputed HTP masks
+        :param htp_masks: The masks per universe ({universe_uuid: htp_mask})
+        :return: None
+        """
+        self.htp_masks = htp_masks
+
+    def remove_universe(self, universe_uuid: str) -> None:
+        """
+        Drops the stacked layers of a removed universe
+        :param universe_uuid: The uuid of the universe
+        :return: None
+        """
+        self.layer_stacks.pop(universe_uuid, None)
+
+    def merge_universe(self, universe_uuid: str, frame: np.ndarray, sources: list, now: float) -> None:
+        """
+        Merges the values of all sources into the frame of a universe
+        The patches of a layer are stacked once, so every layer is resolved with the same few vectorized operations,
+        no matter how many patches it contains. Layers without fading values skip the scaled merge.
+        :param universe_uuid: The uuid of the universe to merge
+        :param frame: The frame to write the merged values to
+        :param sources: The sources to merge (anything with a priority, patches and a level, in insertion order)
+        :param now: The time of the frame (time.perf_counter()), fade patches are evaluated for it
+        :return: None
+        """
+        htp_mask = self.htp_masks.get(universe_uuid, self.empty_mask)
+        contributions = []
+        for source in sources:
+            patch = source.patches.get(universe_uuid)
+            if patch is None or source.level <= 0:
+                continue
+            patch_levels = None
+            if isinstance(patch, FadePatch):
+                patch.evaluate(now)
+                if patch.current_levels.min(initial=1) < 1:  # Otherwise only the values of the patch fade
+                    patch_levels = patch.current_levels
+            contributions.append((source.priority, patch, source.level, patch_levels))
+        contributions.sort(key=lambda contribution: contribution[0])  # Stable, so the insertion order is kept inside a layer
+        last_stacks = self.layer_stacks.get(universe_uuid, {})
+        stacks = self.layer_stacks[universe_uuid] = {}  # Layers that are gone are dropped with the stacks of the last merge
+        frame.fill(0)
+        for priority, layer_contributions in groupby(contributions, key=lambda contribution: contribution[0]):
+            layer_contributions = list(layer_contributions)
+            full_level = all(level >= 1 and patch_levels is None for _, _, level, patch_levels in layer_contributions)
+            if len(layer_contributions) == 1 and full_level:  # A single patch, nothing to resolve
+                patch = layer_contributions[0][1]
+                frame[patch.channels] = patch.current_values if isinstance(patch, FadePatch) else patch.values
+                continue
+            stack = stacks[priority] = self._stack_layer(last_stacks.get(priority), layer_contributions)
+            _, offsets, channels, values, patch_indices = stack
+            levels = None
+            if not full_level:
+                if patch_indices is None:  # Only needed once the layer fades
+                    patch_indices = stack[4] = np.repeat(np.arange(len(layer_contributions)), np.diff(offsets))
+                levels = np.array([level for _, _, level, _ in layer_contributions], dtype=np.float32)[patch_indices]
+                fades = False
+                for (_, _, _, patch_levels), start, end in zip(layer_contributions, offsets, offsets[1:]):
+                    if patch_levels is not None:
+                        levels[start:end] *= patch_levels
+                        fades = True
+                if fades and not levels.all():  # Channels a fade patch faded out completely
+                    visible = levels > 0
+                    channels, values, levels = channels[visible], values[visible], levels[visible]
+            self._merge_layer(channels, values, htp_mask, frame, levels)
+
+    @staticmethod
+    def _stack_layer(last_stack: list | None, layer_contributions: list) -> list:
+        """
+        Stacks the patches of a layer
+        The stack of the last merge is reused while the patches of the layer keep their lengths, so patches that changed
+        (and the values of fade patches) are copied into it instead of stacking the whole layer again.
+        :param last_stack: The stack of the layer from the last merge of the universe (None if there is none)
+        :param layer_contributions: The contributions of the layer (priority, patch, level, levels of the fade patch)
+        :return: The stack (patches, offsets of the patches, channels, values, index of the patch of every value or None)
+        """
+        patches = [patch for _, patch, _, _ in layer_contributions]
+        if last_stack is not None and len(last_stack[0]) == len(patches):
+            last_patches, offsets, channels, values, _ = last_stack
+            for last_patch, patch, start, end in zip(last_patches, patches, offsets, offsets[1:]):
+                if patch is not last_patch:
+                    if len(patch) != end - start:
+                        break  # The layer is stacked again below, so the copies up to here do not matter
+                    channels[start:end] = patch.channels
+                if isinstance(patch, FadePatch):
+                    values[start:end] = patch.current_values
+                elif patch is not last_patch:
+                    values[start:end] = patch.values
+            else:
+                last_stack[0] = patches
+                return last_stack
+        offsets = [0, *accumulate(len(patch) for patch in patches)]
+        channels = np.concatenate([patch.channels for patch in patches])
+        values = np.concatenate([patch.current_values if isinstance(patch, FadePatch) else patch.values for patch in patches])
+        return [patches, offsets, channels, values, None]
+
+    def _merge_layer(self, channels: np.ndarray, values: np.ndarray, htp_mask: np.ndarray, frame: np.ndarray,
+                     levels: np.ndarray = None) -> None:
+        """
+        Resolves the stacked patches of one layer and writes them over the frame
+        HTP channels use the highest value and all other channels the value of the latest patch.
+        Fading values are scaled by their levels all at once: HTP channels use them interpolated from the layers beneath.
+        On other channels the fading values written after the latest full value are mixed into it (or into the layers
+        beneath) weighted by their levels, so a crossfade between two sources of a layer passes through their mix.
+        All intermediate results over the universe are written to the scratch buffers of the engine.
+        :param channels: The channels of all patches of the layer (in insertion order)
+        :param values: The values of all patches of the layer (parallel to channels)
+        :param htp_mask: The HTP mask of the universe
+        :param frame: The frame holding the merged layers beneath, to write to
+        :param levels: The level of the source of every value (parallel to channels, None if all are at full level)
+        :return: None
+        """
+        if not len(channels):
+            return
+        if len(channels) > len(self.indices):
+            self.indices = np.arange(2 * len(channels))
+        indices = self.indices[:len(channels)]
+        full = slice(None) if levels is None else levels >= 1
+        any_full = levels is None or full.any()
+        layer_written = self.layer_written
+        if any_full:
+            self.layer_values.fill(0)
+            np.maximum.at(self.layer_values, channels[full], values[full])
+            self.layer_latest.fill(-1)
+            np.maximum.at(self.layer_latest, channels[full], indices[full])  # The index of the latest full value of every channel
+            np.greater_equal(self.layer_latest, 0, out=layer_written)
+            np.take(values, self.layer_latest, out=self.layer)  # Channels that were not written are masked below
+            np.copyto(self.layer, self.layer_values, where=htp_mask)
+        else:  # Every value of the layer is fading, so nothing has to be masked
+            layer_written.fill(False)
+        if levels is None:
+            np.copyto(frame, self.layer, where=layer_written)
+            return
+
+        if any_full:
+            fading = ~full
+            fade_channels, fade_levels, fade_values = channels[fading], levels[fading], values[fading]
+        else:
+            fade_channels, fade_levels, fade_values = channels, levels, values
+        fade_values = fade_values.astype(np.float32)
+        weighted_fade_values = fade_values * fade_levels
+        beneath = frame[fade_channels].astype(np.float32)
+        faded_values = fade_values - beneath
+        faded_values *= fade_levels
+        faded_values += beneath
+        highest = self.highest
+        if any_full:
+            np.copyto(highest, self.layer_values)  # The layer values are 0 where the layer did not write
+        else:
+            highest.fill(0)
+        np.maximum.at(highest, fade_channels, faded_values)
+
+        mixed_channels = fade_channels
+        if any_full:
+            after_full = indices[fading] > self.layer_latest[fade_channels]  # Fading values before a full value are overridden
+            if not after_full.all():
+                mixed_channels, fade_levels, weighted_fade_values = \
+                    fade_channels[after_full], fade_levels[after_full], weighted_fade_values[after_full]
+        level_sums = self.level_sums
+        level_sums.fill(0)
+        np.add.at(level_sums, mixed_channels, fade_levels)
+        weighted_values = self.weighted_values
+        weighted_values.fill(0)
+        np.add.at(weighted_values, mixed_channels, weighted_fade_values)
+        latest = self.latest
+        np.copyto(latest, frame)
+        if any_full:
+            np.copyto(latest, self.layer, where=layer_written)
+        np.minimum(level_sums, 1, out=self.remaining_levels)
+        np.subtract(1, self.remaining_levels, out=self.remaining_levels)
+        latest *= self.remaining_levels
+        np.maximum(level_sums, 1, out=level_sums)
+        weighted_values /= level_sums
+        latest += weighted_values
+
+        layer_written[fade_channels] = True
+        np.copyto(latest, highest, where=htp_mask)
+        np.rint(latest, out=latest)
+        np.copyto(frame, latest, where=layer_written, casting="unsafe")
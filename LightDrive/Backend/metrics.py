@@ -0,0 +1,179 @@
+import threading
+import time
+import json
+
+class TimingHistogram:
+    BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100)
+
+    def __init__(self) -> None:
+        """
+        Creates a histogram of durations with fixed millisecond buckets
+        """
+        self.bucket_counts = [0] * (len(self.BUCKETS_MS) + 1)  # The last bucket counts everything above the highest bound
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        """
+        Adds a duration to the histogram
+        :param seconds: The duration in seconds
+        :return: None
+        """
+        milliseconds = seconds * 1000
+        for bucket_index, bound in enumerate(self.BUCKETS_MS):
+            if milliseconds <= bound:
+                break
+        else:
+            bucket_index = len(self.BUCKETS_MS)
+        self.bucket_counts[bucket_index] += 1
+        self.count += 1
+        self.total += milliseconds
+        self.max = max(self.max, milliseconds)
+
+    def snapshot(self) -> dict:
+        """
+        Gets the current state of the histogram
+        :return: The count, mean, max (both in ms) and the bucket counts
+        """
+        buckets = {f"<={bound}ms": count for bound, count in zip(self.BUCKETS_MS, self.bucket_counts)}
+        buckets[f">{self.BUCKETS_MS[-1]}ms"] = self.bucket_counts[-1]
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count if self.count else 0.0,
+            "max_ms": self.max,
+            "buckets": buckets
+        }
+
+class OutputMetrics:
+    def __init__(self) -> None:
+        """
+        Collects counters and timings of the output pipeline
+        Rates (frames and sends per second) are measured over windows of one second.
+        """
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.timings = {}
+        self.counters = {"frames": 0, "late_frames": 0, "dropped_frames": 0}
+        self.active_snippets = 0
+
+        self.window_start = self.started
+        self.window_frames = 0
+        self.window_universe_sends = {}
+        self.frame_rate = 0.0
+        self.universe_send_rates = {}
+
+    def add_timing(self, timing_name: str, seconds: float) -> None:
+        """
+        Adds a duration to a timing histogram
+        :param timing_name: The name of the timing
+        :param seconds: The duration in seconds
+        :return: None
+        """
+        with self.lock:
+            if timing_name not in self.timings:
+                self.timings[timing_name] = TimingHistogram()
+            self.timings[timing_name].add(seconds)
+
+    def count_universe_send(self, universe_uuid: str) -> None:
+        """
+        Counts a frame that was sent to the backends of a universe
+        :param universe_uuid: The uuid of the universe
+        :return: None
+        """
+        with self.lock:
+            self.window_universe_sends[universe_uuid] = self.window_universe_sends.get(universe_uuid, 0) + 1
+
+    def count_late_frame(self, dropped_frames: int) -> None:
+        """
+        Counts a frame that started late
+        :param dropped_frames: The amount of frames that were skipped because of it
+        :return: None
+        """
+        with self.lock:
+            self.counters["late_frames"] += 1
+            self.counters["dropped_frames"] += dropped_frames
+
+    def frame_finished(self, active_snippets: int) -> None:
+        """
+        Counts a finished frame and updates the rates once per second
+        :param active_snippets: The amount of snippets that were merged in the frame
+        :return: None
+        """
+        now = time.perf_counter()
+        with self.lock:
+            self.counters["frames"] += 1
+            self.active_snippets = active_snippets
+            self.window_frames += 1
+            elapsed = now - self.window_start
+            if elapsed >= 1:
+                self.frame_rate = self.window_frames / elapsed
+                self.universe_send_rates = {universe_uuid: sends / elapsed for universe_uuid, sends in self.window_universe_sends.items()}
+                self.window_start = now
+                self.window_frames = 0
+                self.window_universe_sends = {}
+
+    def snapshot(self) -> dict:
+        """
+        Gets the current state of all metrics
+        :return: The metrics as a JSON serializable dict
+        """
+        with self.lock:
+            return {
+                "uptime_s": time.perf_counter() - self.started,
+                "frame_rate": self.frame_rate,
+                "active_snippets": self.active_snippets,
+                "counters": dict(self.counters),
+                "universe_send_rates": dict(self.universe_send_rates),
+                "timings": {timing_name: histogram.snapshot() for timing_name, histogram in self.timings.items()}
+            }
+
+    def dump_json(self, file_path: str) -> None:
+        """
+        Writes the current state of all metrics to a JSON file
+        :param file_path: The path of the file to write
+        :return: None
+        """
+        with open(file_path, "w") as f:
+            json.dump(self.snapshot(), f, indent=4)
+
+class RemoteMetrics:
+    def __init__(self) -> None:
+        """
+        Holds the metrics received from an output engine running in another process
+        """
+        self.lock = threading.Lock()
+        self.metrics = {
+            "uptime_s": 0.0,
+            "frame_rate": 0.0,
+            "active_snippets": 0,
+            "counters": {"frames": 0, "late_frames": 0, "dropped_frames": 0},
+            "universe_send_rates": {},
+            "timings": {}
+        }
+
+    def update(self, metrics: dict) -> None:
+        """
+        Replaces the metrics with a newer snapshot
+        :param metrics: The snapshot of the OutputMetrics of the engine
+        :return: None
+        """
+        with self.lock:
+            self.metrics = metrics
+
+    def snapshot(self) -> dict:
+        """
+        Gets the last received metrics
+        :return: The metrics as a JSON serializable dict
+        """
+        with self.lock:
+            return self.metrics
+
+    def dump_json(self, file_path: str) -> None:
+        """
+        Writes the last received metrics to a JSON file
+        :param file_path: The path of the file to write
+        :return: None
+        """
+        with open(file_path, "w") as f:
+            json.dump(self.snapshot(), f, indent=4)
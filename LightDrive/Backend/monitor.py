@@ -0,0 +1,348 @@
+from .tcp_socket import TcpFrameServer, TcpClient
+import numpy as np
+import struct
+import json
+
+MONITOR_MAGIC = b"LDMS"
+MESSAGE_HEADER = struct.Struct(">4sBI")  # Magic, message type, payload length (big endian)
+MESSAGE_INDEX = 1  # JSON payload: {"universes": {universe_id: universe_uuid}, "frame_store": prefix of the shared memory segments}
+MESSAGE_FRAME = 2  # Payload: sequence (uint32), universe count (uint16), then per universe: id (uint16), length (uint16), values
+MESSAGE_DELTA = 3  # Payload: sequence (uint32), universe count (uint16), then per universe: id (uint16), run count (uint16),
+                   # then per run: offset (uint16), length (uint16), values
+MESSAGE_SLICES = 4  # Payload: sequence (uint32), universe count (uint16), then per universe: id (uint16), run count (uint16),
+                    # the runs (offset (uint16), length (uint16)) and the values of all runs
+MESSAGE_ERROR = 5  # JSON payload: {"error": description}, sent to a client whose request was invalid
+FRAME_HEADER = struct.Struct(">IH")
+UNIVERSE_HEADER = struct.Struct(">HH")
+RUN_HEADER = struct.Struct(">HH")
+RUN_GAP = RUN_HEADER.size  # Runs closer than the size of a run header are merged, since a new run would cost more
+DEFAULT_MONITOR_PORT = 7600
+KEYFRAME_INTERVAL = 50  # Frames between the keyframes of the delta mode
+MAX_REQUEST_SIZE = 65536  # Clients sending longer requests are disconnected
+
+def build_message(message_type: int, payload: bytes) -> bytes:
+    """
+    Builds a message of the monitor stream
+    :param message_type: The type of the message (one of the MESSAGE_ constants)
+    :param payload: The payload of the message
+    :return: The message (a 9 byte header followed by the payload)
+    """
+    return MESSAGE_HEADER.pack(MONITOR_MAGIC, message_type, len(payload)) + payload
+
+def build_index_message(universe_ids: dict, frame_store_prefix: str = "") -> bytes:
+    """
+    Builds the message that maps the universe ids of the frames to the universe uuids
+    :param universe_ids: The ids of the universes ({universe_uuid: universe_id})
+    :param frame_store_prefix: The prefix of the shared memory frame store (clients on the same host can read it directly)
+    :return: The message
+    """
+    index = {"universes": {str(universe_id): universe_uuid for universe_uuid, universe_id in universe_ids.items()},
+             "frame_store": frame_store_prefix}
+    return build_message(MESSAGE_INDEX, json.dumps(index).encode('utf-8'))
+
+def build_frame_message(sequence: int, frames: list) -> bytes:
+    """
+    Builds the message containing the frames of all universes of one output frame
+    :param sequence: The sequence number of the output frame (wraps at 2^32)
+    :param frames: The frames of the universes ([(universe_id, values), ...])
+    :return: The message
+    """
+    parts = [FRAME_HEADER.pack(sequence & 0xFFFFFFFF, len(frames))]
+    for universe_id, values in frames:
+        parts.append(UNIVERSE_HEADER.pack(universe_id, len(values)))
+        parts.append(values)
+    return build_message(MESSAGE_FRAME, b"".join(parts))
+
+def find_changed_runs(values: np.ndarray, previous_values: np.ndarray) -> list:
+    """
+    Finds the runs of channels that changed between two frames
+    :param values: The new frame
+    :param previous_values: The previous frame (of the same size)
+    :return: The runs ([(offset, length), ...])
+    """
+    changed = np.flatnonzero(values != previous_values)
+    if len(changed) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(changed) > RUN_GAP)
+    starts = np.concatenate(([changed[0]], changed[breaks + 1]))
+    ends = np.concatenate((changed[breaks], [changed[-1]])) + 1
+    return [(int(start), int(end - start)) for start, end in zip(starts, ends)]
+
+def build_delta_message(sequence: int, frames: list, previous_frames: dict) -> bytes:
+    """
+    Builds the message containing the runs of channels that changed in one output frame
+    :param sequence: The sequence number of the output frame (wraps at 2^32)
+    :param frames: The frames of the universes ([(universe_id, values), ...])
+    :param previous_frames: The frames of the previous output frame ({universe_id: values})
+    :return: The message (universes without changes are left out)
+    """
+    parts = []
+    universe_count = 0
+    for universe_id, values in frames:
+        new_values = np.frombuffer(values, dtype=np.uint8)
+        previous_values = previous_frames.get(universe_id)
+        if previous_values is None or len(previous_values) != len(values):
+            runs = [(0, len(values))]  # A new universe is sent completely
+        else:
+            runs = find_changed_runs(new_values, np.frombuffer(previous_values, dtype=np.uint8))
+        if not runs:
+            continue
+        universe_count += 1
+        parts.append(UNIVERSE_HEADER.pack(universe_id, len(runs)))
+        for offset, length in runs:
+            parts.append(RUN_HEADER.pack(offset, length))
+            parts.append(values[offset:offset + length])
+    return build_message(MESSAGE_DELTA, FRAME_HEADER.pack(sequence & 0xFFFFFFFF, universe_count) + b"".join(parts))
+
+def parse_subscription(subscription, universe_ids: dict) -> tuple | None:
+    """
+    Parses the subscription request of a client into the runs it subscribed to
+    The ranges are merged (also of a universe given by its id and its uuid), so subscriptions covering the same channels are equal.
+    :param subscription: The subscription ({universe id or uuid: [[first channel, last channel], ...]} with 1 based,
+                         inclusive channels or None/"all" for everything)
+    :param universe_ids: The ids of the universes ({universe_uuid: universe_id})
+    :return: The subscribed runs (((universe_id, ((offset, length), ...)), ...), sorted) or None for everything
+    """
+    if subscription is None or subscription == "all":
+        return None
+    if not isinstance(subscription, dict):
+        raise ValueError("A subscription must map universes to channel ranges")
+    universe_channels = {}
+    for universe_key, ranges in subscription.items():
+        universe_id = int(universe_key) if str(universe_key).isdigit() else universe_ids.get(universe_key)
+        if universe_id is None:
+            continue  # Unknown uuid
+        channels = universe_channels.setdefault(universe_id, np.zeros(512 + 2, dtype=np.int8))  # Padded, so runs can be found from the edges
+        for first_channel, last_channel in ranges:
+            channels[max(1, int(first_channel)):min(512, int(last_channel)) + 1] = 1
+    subscribed_runs = {}
+    for universe_id, channels in universe_channels.items():
+        edges = np.flatnonzero(np.diff(channels))
+        runs = tuple((int(start), int(end - start)) for start, end in zip(edges[::2], edges[1::2]))
+        if runs:
+            subscribed_runs[universe_id] = runs
+    return tuple(sorted(subscribed_runs.items()))
+
+class SubscriptionGroup:
+    __slots__ = ("universes", "clients")
+
+    def __init__(self, subscribed_runs: tuple) -> None:
+        """
+        Precomputes the serialization of a subscription (shared by all clients with the same subscription)
+        :param subscribed_runs: The subscribed runs (((universe_id, ((offset, length), ...)), ...))
+        """
+        self.universes = []  # [(universe_id, header of the universe, indices of the subscribed channels)]
+        for universe_id, runs in subscribed_runs:
+            header = UNIVERSE_HEADER.pack(universe_id, len(runs)) + b"".join(RUN_HEADER.pack(offset, length) for offset, length in runs)
+            indices = np.concatenate([np.arange(offset, offset + length) for offset, length in runs])
+            self.universes.append((universe_id, header, indices))
+        self.clients = 0
+
+    def build_message(self, sequence: int, frames: dict) -> bytes:
+        """
+        Builds the message containing the subscribed channels of an output frame
+        :param sequence: The sequence number of the output frame
+        :param frames: The frames of the universes ({universe_id: values})
+        :return: The message
+        """
+        parts = []
+        for universe_id, header, indices in self.universes:
+            values = frames.get(universe_id)
+            if values is None or len(values) <= indices[-1]:
+                continue  # The universe does not exist (anymore)
+            parts.append(header)
+            parts.append(np.frombuffer(values, dtype=np.uint8)[indices].tobytes())
+        return build_message(MESSAGE_SLICES, FRAME_HEADER.pack(sequence & 0xFFFFFFFF, len(parts) // 2) + b"".join(parts))
+
+class MonitorFrame:
+    __slots__ = ("sequence", "frames", "delta_message", "keyframe", "keyframe_message", "slices_messages")
+
+    def __init__(self, sequence: int, frames: list, delta_message: bytes | None, keyframe: bool) -> None:
+        """
+        Holds a published output frame (shared by all clients, the messages are built when the first client needs them)
+        :param sequence: The sequence number of the output frame
+        :param frames: The frames of the universes ([(universe_id, values), ...])
+        :param delta_message: The delta message of the frame (None if the delta mode is disabled)
+        :param keyframe: Whether all clients of the delta mode get the full frame
+        """
+        self.sequence = sequence
+        self.frames = frames
+        self.delta_message = delta_message
+        self.keyframe = keyframe
+        self.keyframe_message = None
+        self.slices_messages = {}  # {SubscriptionGroup: message}
+
+    def get_slices_message(self, group: SubscriptionGroup) -> bytes:
+        """
+        Gets the message of a subscription group (built once per group)
+        :param group: The subscription group
+        :return: The message
+        """
+        message = self.slices_messages.get(group)
+        if message is None:
+            message = self.slices_messages[group] = group.build_message(self.sequence, dict(self.frames))
+        return message
+
+    def get_keyframe_message(self) -> bytes:
+        """
+        Gets the full frame message (built once when the first client needs it)
+        :return: The message
+        """
+        if self.keyframe_message is None:
+            self.keyframe_message = build_frame_message(self.sequence, self.frames)
+        return self.keyframe_message
+
+class MonitorServer(TcpFrameServer):
+    def __init__(self, target_ip: str = "0.0.0.0", port: int = DEFAULT_MONITOR_PORT, metrics=None, delta: bool = False,
+                 keyframe_interval: int = KEYFRAME_INTERVAL, socket_path: str = "", frame_store_prefix: str = "") -> None:
+        """
+        Creates the monitoring stream, which sends every universe over a single connection
+        The engine publishes one message with the frames of all universes per output frame in which any universe changed
+        (it is serialized once and shared by all clients). Clients receive the index of the universes when they connect,
+        followed by the frames of the next output frame.
+        Clients can subscribe to channel ranges by sending a JSON line ({"subscribe": {universe: [[first, last], ...]}}),
+        they then only receive those channels. Clients with the same subscription share one serialization.
+        In the delta mode only the runs of channels that changed are sent. Clients get a full frame (keyframe) when they
+        connect, every keyframe_interval frames and whenever they fell behind (instead of dropping a delta).
+        :param target_ip: The ip to listen on
+        :param port: The port to listen on (0 only listens on the socket path)
+        :param metrics: An instance of the OutputMetrics class to record send times in (optional)
+        :param delta: Whether to send the changes instead of the full frames
+        :param keyframe_interval: The amount of frames between the keyframes of the delta mode
+        :param socket_path: The path of a Unix domain socket to listen on as well (for clients on the same host, optional)
+        :param frame_store_prefix: The prefix of the shared memory frame store, sent with the index
+        """
+        self.delta = delta
+        self.keyframe_interval = keyframe_interval
+        self.previous_frames = {}  # {universe_id: values} of the last published frame (used by the delta mode)
+        self.subscription_groups = {}  # {subscribed runs: SubscriptionGroup}, only used by the server thread
+        self.universe_ids = {}
+        self.frame_store_prefix = frame_store_prefix
+        self.index_message = build_index_message({}, frame_store_prefix)
+        self.needs_frame = False  # Set when a client connected, so the engine sends the next frame even if nothing changed
+        self.sequence = 0
+        super().__init__(target_ip, port, 0, metrics, socket_path=socket_path)
+
+    def has_clients(self) -> bool:
+        """
+        Checks whether any client is connected (so the engine can skip serializing frames nobody receives)
+        :return: Whether any client is connected
+        """
+        return bool(self.clients)
+
+    def set_universes(self, universe_ids: dict) -> None:
+        """
+        Sends the index of the universes to all clients (called whenever universes are created or removed)
+        :param universe_ids: The ids of the universes ({universe_uuid: universe_id})
+        :return: None
+        """
+        self.universe_ids = dict(universe_ids)
+        self.index_message = build_index_message(universe_ids, self.frame_store_prefix)
+        self.publish(self.index_message, control=True)
+
+    def publish_frames(self, frames: list) -> None:
+        """
+        Sends the frames of all universes of an output frame to all clients
+        :param frames: The frames of the universes ([(universe_id, values), ...])
+        :return: None
+        """
+        self.needs_frame = False
+        self.sequence += 1
+        delta_message = None
+        if self.delta:
+            delta_message = build_delta_message(self.sequence, frames, self.previous_frames)
+            self.previous_frames = dict(frames)
+        self.publish(MonitorFrame(self.sequence, frames, delta_message, self.sequence % self.keyframe_interval == 0))
+
+    def queue_message(self, client: TcpClient, message, control: bool = False) -> None:
+        """
+        Queues a message for a client, frames are queued as the subscribed channels, as delta or as full frame
+        :param client: The client
+        :param message: The message (or a MonitorFrame)
+        :param control: Whether the message must not be dropped
+        :return: None
+        """
+        if not isinstance(message, MonitorFrame):
+            super().queue_message(client, message, control)
+        elif client.state.get("subscription") is not None:
+            client.queue.append(message.get_slices_message(client.state["subscription"]))
+        elif message.delta_message is None:
+            client.queue.append(message.get_keyframe_message())
+        elif message.keyframe or not client.state.get("synced") or len(client.queue) == client.queue.maxlen:
+            client.queue.clear()  # The queued deltas are replaced by the keyframe, a delta is never dropped
+            client.queue.append(message.get_keyframe_message())
+            client.state["synced"] = True
+        else:
+            client.queue.append(message.delta_message)
+
+    def on_connect(self, client: TcpClient) -> None:
+        """
+        Queues the index for a new client and requests a frame from the engine
+        :param client: The new client
+        :return: None
+        """
+        self.queue_message(client, self.index_message, control=True)
+        self.needs_frame = True
+
+    def on_data(self, client: TcpClient, data: bytes) -> None:
+        """
+        Handles the requests of a client (JSON objects, one per line), invalid requests are answered with an error message
+        :param client: The client
+        :param data: The received data
+        :return: None
+        """
+        buffer = client.state.get("buffer", b"") + data
+        *requests, client.state["buffer"] = buffer.split(b"\n")
+        if len(client.state["buffer"]) > MAX_REQUEST_SIZE:
+            self.close_client(client)
+            return
+        for request in requests:
+            try:
+                request = json.loads(request)
+                if not isinstance(request, dict):
+                    raise ValueError("A request must be a JSON object")
+                if "subscribe" in request:
+                    self.subscribe(client, parse_subscription(request["subscribe"], self.universe_ids))
+            except (ValueError, TypeError, AttributeError, struct.error) as e:  # The request is ignored
+                error = json.dumps({"error": f"Invalid request: {e}"}).encode('utf-8')
+                self.queue_message(client, build_message(MESSAGE_ERROR, error), control=True)
+                self.write_client(client)
+
+    def subscribe(self, client: TcpClient, subscribed_runs: tuple | None) -> None:
+        """
+        Changes the subscription of a client
+        :param client: The client
+        :param subscribed_runs: The subscribed runs (see parse_subscription, None subscribes to everything)
+        :return: None
+        """
+        self.unsubscribe(client)
+        if subscribed_runs is not None:
+            group = self.subscription_groups.get(subscribed_runs)
+            if group is None:
+                group = self.subscription_groups[subscribed_runs] = SubscriptionGroup(subscribed_runs)
+            group.clients += 1
+            client.state["subscription"] = group
+            client.state["subscribed_runs"] = subscribed_runs
+        client.state["synced"] = False  # The client needs a full frame (or its channels) before any delta
+        client.queue.clear()
+        self.needs_frame = True
+
+    def unsubscribe(self, client: TcpClient) -> None:
+        """
+        Removes the subscription of a client (the group is released once no client uses it)
+        :param client: The client
+        :return: None
+        """
+        group = client.state.pop("subscription", None)
+        if group is not None:
+            group.clients -= 1
+            if group.clients == 0:
+                del self.subscription_groups[client.state["subscribed_runs"]]
+
+    def on_disconnect(self, client: TcpClient) -> None:
+        """
+        Releases the subscription of a closed client
+        :param client: The client
+        :return: None
+        """
+        self.unsubscribe(client)
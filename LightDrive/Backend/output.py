@@ -1,19 +1,35 @@
-from .artnet import ArtnetOutput
-from .tcp_socket import TcpSocketOutput
+from .engine import OutputEngine, EngineProcessClient
+from .artnet import DEFAULT_KEEPALIVE_MS, clamp_keepalive_ms
+from .sacn import DEFAULT_SACN_PRIORITY
+from .tcp_socket import PROTOCOL_BINARY, PROTOCOL_JSON
+from .merge import build_htp_mask
+from .patch import build_patches, build_universe_patch
+import numpy as np
+import itertools
+import json
+import time
+import os
+
+CONSOLE_PRIORITY = 100
+_source_ids = itertools.count()
 
 class OutputSnippet:
-    def __init__(self, dmx_output, values: dict) -> None:
+    def __init__(self, dmx_output, values: dict = None, priority: int = 0, *, patches: dict = None) -> None:
         """
         Creates a snippet
-        :param dmx_output: An instance of the DmxOutput class (used to tick the output after updating values)
+        :param dmx_output: An instance of the DmxOutput class (used to post updated values to the output)
         :param values: The values to set.
                        (E.g.:
                        1 universe - {universe_uuid: {channel: value, channel: value}} or
                        multiple universes - {universe_uuid: {channel: value, channel: value}, universe_uuid: {channel: value}}
                        )
+        :param priority: The layer of the snippet (higher layers override the channels of lower ones)
+        :param patches: Already built patches to set instead of the values ({universe_uuid: UniversePatch})
         """
         self.dmx_output = dmx_output
-        self.values = values
+        self.source_id = next(_source_ids)  # Identifies the snippet in the output engine
+        self.priority = priority
+        self.patches = patches if patches is not None else build_patches(values or {})
 
     def update_values(self, values: dict) -> None:
         """
@@ -21,16 +37,32 @@ class OutputSnippet:
         :param values: The values to update
         :return: None
         """
-        self.values = values
-        self.dmx_output.tick_output()
+        self.update_patches(build_patches(values))
+
+    def update_patches(self, patches: dict) -> None:
+        """
+        Updates the values of the snippet with already built patches
+        :param patches: The patches to set ({universe_uuid: UniversePatch})
+        :return: None
+        """
+        self.patches = patches
+        self.dmx_output.update_snippet(self)
+
+    def update_fixtures(self) -> None:
+        """
+        Recompiles everything of the snippet that depends on the patched fixtures (called whenever the fixture patch changed)
+        Only snippets that compile the fixture patch themselves need to implement this.
+        :return: None
+        """
 
 class ConsoleOutputSnippet(OutputSnippet):
     def __init__(self, dmx_output) -> None:
         """
         Creates a custom snippet for the console output
-        :param dmx_output: An instance of the DmxOutput class (used to tick the output after updating values)
+        :param dmx_output: An instance of the DmxOutput class (used to post updated values to the output)
         """
-        super().__init__(dmx_output, {})
+        super().__init__(dmx_output, {}, CONSOLE_PRIORITY)
+        self.values = {}
 
     def update_value(self, universe, channel, value) -> None:
         """
@@ -43,7 +75,7 @@ class ConsoleOutputSnippet(OutputSnippet):
         if universe not in self.values:
             self.values[universe] = {}
         self.values[universe][channel] = value
-        self.dmx_output.tick_output()
+        self._update_universe_patch(universe)
 
     def remove_value(self, universe, channel) -> None:
         """
@@ -57,135 +89,187 @@ class ConsoleOutputSnippet(OutputSnippet):
                 del self.values[universe][channel]
                 if not self.values[universe]:
                     del self.values[universe]
-                self.dmx_output.tick_output()
+                self._update_universe_patch(universe)
 
-class DmxUniverse:
-    def __init__(self, universe_uuid: str = None, universe_name: str = None, configuration: dict = None) -> None:
+    def _update_universe_patch(self, universe) -> None:
         """
-        Creates a universe
-        :param universe_uuid: The uuid of the universe
-        :param universe_name: The name of the universe
-        :param configuration: Full universe configuration (this is used to load a workspace; this disregards the name and uuid parameters)
-        """
-        self.configuration = configuration
-        if not self.configuration:
-            self.configuration = {
-                "uuid": universe_uuid,
-                "name": universe_name,
-                "ArtNet": {
-                    "active": False,
-                    "target_ip": "",
-                    "universe": 0,
-                    "hz": 30
-                },
-                "TcpSocket": {
-                    "active": False,
-                    "target_ip": "127.0.0.1",
-                    "port": 7500,
-                    "hz": 30
-                }
-            }
-        self.artnet = None
-        self.tcp_socket = None
+        Rebuilds the patch of a single universe after it has been changed and posts it to the output
+        :param universe: The universe to rebuild the patch of
+        :return: None
+        """
+        patch = None
+        if universe in self.values:
+            patch = build_universe_patch(universe, self.values[universe])
+        patches = dict(self.patches)  # A new dict, the output may still be merging the old one
+        if patch is None:
+            patches.pop(universe, None)
+        else:
+            patches[universe] = patch
+        self.update_patches(patches)
 
-    def configure_artnet(self, active: bool, target_ip: str, artnet_universe: int, hz: int) -> None:
+class DmxOutput:
+    def __init__(self, window, frame_rate: int = 44, engine_process: bool = False, monitor_port: int = 0,
+                 monitor_delta: bool = False, monitor_socket_path: str = "") -> None:
         """
-        Configures the ArtNet backend
-        :param active: Whether the backend should be active
-        :param target_ip: The target IP address
-        :param artnet_universe: The ArtNet universe to use
-        :param hz: The refresh rate
-        :return: None
+        Creates the output class to output data
+        Snippets only post their values to the output engine, which merges and sends them once per frame on its own thread.
+        :param window: The main window
+        :param frame_rate: The rate at which frames are merged and sent
+        :param engine_process: Whether the output engine should run in a separate process (so GUI stalls never stall the output)
+        :param monitor_port: The port of the monitoring stream, which streams all universes over one connection (0 disables it)
+        :param monitor_delta: Whether the monitoring stream only sends the changed channels (with periodic keyframes)
+        :param monitor_socket_path: The path of a Unix domain socket the monitoring stream listens on for local clients ("" disables it)
         """
-        self.configuration["ArtNet"]["active"] = active
-        self.configuration["ArtNet"]["target_ip"] = target_ip
-        self.configuration["ArtNet"]["universe"] = artnet_universe
-        self.configuration["ArtNet"]["hz"] = hz
-        if active:
-            self.artnet = ArtnetOutput(target_ip, artnet_universe, hz)
+        self.window = window
+        self.universes = {}
+        self.active_snippets = {}
+        self.fading_out_snippets = {}  # {source_id: (snippet, end of the fade out)}, they still post their values until then
+        self.errors = []
+        self.snippet_fade_time = 0.0  # The fade time in seconds used when the GUI starts and stops snippets
+        if engine_process:
+            self.engine = EngineProcessClient(frame_rate)
         else:
-            self.artnet = None
+            self.engine = OutputEngine(frame_rate)
+            self.engine.start()
+        self.metrics = self.engine.metrics
+        if monitor_port or monitor_socket_path:
+            try:  # Errors of the engine process are reported by the process itself
+                self.engine.configure_monitor(True, "0.0.0.0", monitor_port, monitor_delta, monitor_socket_path)
+            except OSError as error:  # E.g. the port is already in use, the output keeps running without the monitor
+                self.report_error(f"The monitoring stream could not be started ({error}), it is disabled")
+        self.console_snippet = ConsoleOutputSnippet(self)
+        self.insert_snippet(self.console_snippet)
 
-    def configure_tcp_socket(self, active: bool, target_ip: str, port: int, hz: int) -> None:
+    def insert_snippet(self, snippet: OutputSnippet, fade_time: float = 0) -> None:
         """
-        Configures the TCP socket backend
-        :param active: Whether the backend should be active
-        :param target_ip: The target IP address
-        :param port: The port to output to
-        :param hz: The refresh rate
+        Inserts a snippet into the output
+        :param snippet: The snippet to insert
+        :param fade_time: The duration of the fade in seconds (0 cuts in)
         :return: None
         """
-        self.configuration["TcpSocket"]["active"] = active
-        self.configuration["TcpSocket"]["target_ip"] = target_ip
-        self.configuration["TcpSocket"]["port"] = port
-        self.configuration["TcpSocket"]["hz"] = hz
-        if active:
-            self.tcp_socket = TcpSocketOutput(target_ip, port, hz)
-        else:
-            self.tcp_socket = None
+        self._drop_faded_out_snippets()
+        self.fading_out_snippets.pop(snippet.source_id, None)  # Faded back in
+        self.active_snippets[snippet.source_id] = snippet
+        self.engine.insert_source(snippet.source_id, snippet.priority, snippet.patches, fade_time)
 
-    def set_values(self, values: list) -> None:
+    def remove_snippet(self, snippet: OutputSnippet, fade_time: float = 0) -> None:
         """
-        Outputs the values provided to the backend
-        :param values: The values to output
+        Removes a snippet from the output
+        A snippet that fades out keeps posting its values (e.g. a running 2D EFX keeps moving) until the fade finished.
+        :param snippet: The snippet to remove
+        :param fade_time: The duration of the fade out in seconds (0 cuts out)
         :return: None
         """
-        if self.artnet:
-            self.artnet.set_values(values)
-        if self.tcp_socket:
-            self.tcp_socket.set_values(values)
+        self._drop_faded_out_snippets()
+        del self.active_snippets[snippet.source_id]
+        if fade_time > 0:
+            self.fading_out_snippets[snippet.source_id] = (snippet, time.perf_counter() + fade_time)
+        self.engine.remove_source(snippet.source_id, fade_time)
 
-    def stop(self) -> None:
+    def _drop_faded_out_snippets(self) -> None:
         """
-        Gracefully stops the backend
+        Forgets the snippets that finished fading out (the engine removed their sources)
         :return: None
         """
-        if self.artnet:
-            self.artnet.stop()
+        now = time.perf_counter()
+        for source_id, (_, fade_end) in list(self.fading_out_snippets.items()):
+            if now >= fade_end:
+                del self.fading_out_snippets[source_id]
 
-class DmxOutput:
-    def __init__(self, window) -> None:
+    def crossfade_snippets(self, old_snippet: OutputSnippet, new_snippet: OutputSnippet, fade_time: float) -> None:
         """
-        Creates the output class to output data
-        :param window: The main window
+        Fades one snippet out while fading another one in
+        :param old_snippet: The snippet to fade out (and remove)
+        :param new_snippet: The snippet to fade in (and insert)
+        :param fade_time: The duration of the crossfade in seconds
+        :return: None
         """
-        self.window = window
-        self.universes = {}
-        self.active_snippets = []
-        self.console_snippet = ConsoleOutputSnippet(self)
+        self.remove_snippet(old_snippet, fade_time)
+        self.insert_snippet(new_snippet, fade_time)
 
-    def insert_snippet(self, snippet: OutputSnippet) -> None:
+    def update_snippet(self, snippet: OutputSnippet) -> None:
         """
-        Inserts a snippet into the output
-        :param snippet: The snippet to insert
+        Posts the changed values of a snippet to the output engine (ignored if the snippet is neither inserted nor fading out)
+        :param snippet: The snippet that changed
         :return: None
         """
-        self.active_snippets.append(snippet)
-        self.tick_output()
+        if snippet.source_id in self.active_snippets:
+            self.engine.set_source(snippet.source_id, snippet.priority, snippet.patches)
+        elif snippet.source_id in self.fading_out_snippets:
+            if time.perf_counter() < self.fading_out_snippets[snippet.source_id][1]:
+                self.engine.set_source(snippet.source_id, snippet.priority, snippet.patches)
+            else:
+                del self.fading_out_snippets[snippet.source_id]
 
-    def remove_snippet(self, snippet: OutputSnippet) -> None:
+    def update_snippet_fixtures(self) -> None:
         """
-        Removes a snippet from the output
-        :param snippet: The snippet to remove
+        Recompiles all running snippets against the current fixture patch (called whenever fixtures are added or removed)
+        :return: None
+        """
+        for snippet in list(self.active_snippets.values()):
+            snippet.update_fixtures()
+
+    def update_channel_masks(self) -> None:
+        """
+        Precomputes the HTP/LTP masks and the highest patched channel of all universes from the patched fixtures
+        This needs to be called whenever fixtures are added or removed (once after adding many fixtures at once).
+        Fixtures without a readable definition are skipped with a warning.
+        :return: None
+        """
+        fixture_dir = os.getenv('XDG_CONFIG_HOME', default=os.path.expanduser('~/.config')) + '/LightDrive/fixtures/'
+        fixture_channels = {}
+        channel_types = {}
+        for fixture in self.window.available_fixtures:
+            if fixture["id"] not in fixture_channels:
+                try:
+                    with open(os.path.join(fixture_dir, fixture["id"] + ".json")) as f:
+                        fixture_channels[fixture["id"]] = json.load(f)["channels"]
+                except (OSError, ValueError, KeyError) as error:
+                    self.report_error(f"The fixture definition {fixture['id']} could not be read ({error!r}), its channels are merged as LTP")
+                    fixture_channels[fixture["id"]] = None  # Only warn once per fixture definition
+            if fixture_channels[fixture["id"]] is None:
+                continue
+            universe_channel_types = channel_types.setdefault(fixture["universe"], {})
+            for channel_number, channel_data in fixture_channels[fixture["id"]].items():
+                universe_channel_types[fixture["address"] + int(channel_number) - 1] = channel_data["type"]
+
+        self.engine.set_htp_masks({universe_uuid: build_htp_mask(types) for universe_uuid, types in channel_types.items()})
+        self.engine.set_patched_channels({universe_uuid: min(512, max(types) + 1)  # The types are keyed by 0-based channel index
+                                          for universe_uuid, types in channel_types.items() if types})
+
+    def report_error(self, message: str) -> None:
+        """
+        Reports an error of the output, so the GUI can show it
+        :param message: The error message
         :return: None
         """
-        self.active_snippets.remove(snippet)
-        self.tick_output()
+        self.errors.append(message)
+
+    def take_errors(self) -> list:
+        """
+        Gets the errors of the output (and of the engine) reported since the last call
+        :return: The error messages
+        """
+        errors = self.errors
+        self.errors = []
+        errors.extend(self.engine.take_errors())
+        return errors
 
-    def tick_output(self) -> None:
+    def set_frame_rate(self, frame_rate: int) -> None:
         """
-        Ticks the output updating values in the backends
+        Changes the rate of the output clock
+        :param frame_rate: The new frame rate
         :return: None
         """
-        for universe in self.universes:
-            universe_values = [0] * 512
-            relevant_snippets = self.active_snippets + [self.console_snippet]  # Always include the console snippet last
-            for snippet in relevant_snippets:
-                for snippet_universe in snippet.values:
-                    if snippet_universe == universe:
-                        for channel in snippet.values[universe]:
-                            universe_values[channel - 1] = snippet.values[universe][channel]
-            self.universes[universe].set_values(universe_values)
+        self.engine.set_frame_rate(frame_rate)
+
+    def get_frame(self, universe_uuid: str) -> np.ndarray | None:
+        """
+        Gets the last frame that was sent to a universe (the universe entries of the workspace display it)
+        :param universe_uuid: The uuid of the universe
+        :return: The 512 uint8 values of the frame (None if nothing was sent yet or the frame is stale)
+        """
+        return self.engine.get_frame(universe_uuid)
 
     def create_universe(self, universe_uuid: str, universe_name: str) -> None:
         """
@@ -194,7 +278,37 @@ class DmxOutput:
         :param universe_name: The name of the universe
         :return: None
         """
-        self.universes[universe_uuid] = DmxUniverse(universe_uuid, universe_name)
+        self.universes[universe_uuid] = {
+            "uuid": universe_uuid,
+            "name": universe_name,
+            "ArtNet": {
+                "active": False,
+                "target_ip": "",
+                "universe": 0,
+                "hz": 30,
+                "sync": False,
+                "send_on_change": False,
+                "keepalive_ms": DEFAULT_KEEPALIVE_MS,
+                "discovery": False
+            },
+            "sACN": {
+                "active": False,
+                "universe": 1,
+                "hz": 30,
+                "multicast": True,
+                "target_ip": "",
+                "priority": DEFAULT_SACN_PRIORITY,
+                "sync_universe": 0
+            },
+            "TcpSocket": {
+                "active": False,
+                "target_ip": "127.0.0.1",
+                "port": 7500,
+                "hz": 30,
+                "protocol": PROTOCOL_BINARY
+            }
+        }
+        self.engine.create_universe(universe_uuid)
 
     def remove_universe(self, universe_uuid: str) -> None:
         """
@@ -202,10 +316,11 @@ class DmxOutput:
         :param universe_uuid: The uuid of the universe to remove
         :return: None
         """
-        self.universes[universe_uuid].stop()
         del self.universes[universe_uuid]
+        self.engine.remove_universe(universe_uuid)
 
-    def configure_artnet(self, universe_uuid: str, active: bool, target_ip: str, artnet_universe: int, hz: int) -> None:
+    def configure_artnet(self, universe_uuid: str, active: bool, target_ip: str, artnet_universe: int, hz: int, sync: bool = False,
+                         send_on_change: bool = False, keepalive_ms: int = DEFAULT_KEEPALIVE_MS, discovery: bool = False) -> None:
         """
         Configures the ArtNet backend for a universe
         :param universe_uuid: The uuid of the universe to configure
@@ -213,14 +328,43 @@ class DmxOutput:
         :param target_ip: The target IP address
         :param artnet_universe: The ArtNet universe to use
         :param hz: The refresh rate
+        :param sync: Whether to follow the packets with ArtSync
+        :param send_on_change: Whether to send immediately when the values changed and otherwise only keepalives
+                               (instead of refreshing at the refresh rate)
+        :param keepalive_ms: The keepalive interval when sending on change in milliseconds
+        :param discovery: Whether to unicast to the nodes discovered with ArtPoll that output the universe
+                          (the target ip is used while none are found)
+        :return: None
+        """
+        if universe_uuid not in self.universes:
+            return
+        self.universes[universe_uuid]["ArtNet"] = {"active": active, "target_ip": target_ip, "universe": artnet_universe, "hz": hz,
+                                                   "sync": sync, "send_on_change": send_on_change, "keepalive_ms": keepalive_ms,
+                                                   "discovery": discovery}
+        self.engine.configure_artnet(universe_uuid, active, target_ip, artnet_universe, hz, sync, send_on_change, keepalive_ms, discovery)
+
+    def configure_sacn(self, universe_uuid: str, active: bool, sacn_universe: int, hz: int, multicast: bool = True,
+                       target_ip: str = "", priority: int = DEFAULT_SACN_PRIORITY, sync_universe: int = 0) -> None:
+        """
+        Configures the sACN (E1.31) backend for a universe
+        :param universe_uuid: The uuid of the universe to configure
+        :param active: Whether the backend should be active
+        :param sacn_universe: The sACN universe to use (1 - 63999)
+        :param hz: The refresh rate
+        :param multicast: Whether to send to the multicast group of the universe (otherwise it is unicast to the target ip)
+        :param target_ip: The target IP address for unicast
+        :param priority: The priority of the data (0 - 200, receivers use the source with the highest priority)
+        :param sync_universe: The universe to send sync packets on after every burst (0 disables sync)
         :return: None
         """
-        universe = self.universes.get(universe_uuid)
-        if universe is None:
+        if universe_uuid not in self.universes:
             return
-        universe.configure_artnet(active, target_ip, artnet_universe, hz)
+        self.universes[universe_uuid]["sACN"] = {"active": active, "universe": sacn_universe, "hz": hz, "multicast": multicast,
+                                                 "target_ip": target_ip, "priority": priority, "sync_universe": sync_universe}
+        self.engine.configure_sacn(universe_uuid, active, sacn_universe, hz, multicast, target_ip, priority, sync_universe)
 
-    def configure_tcp_socket(self, universe_uuid: str, active: bool, target_ip: str, port: int, hz: int) -> None:
+    def configure_tcp_socket(self, universe_uuid: str, active: bool, target_ip: str, port: int, hz: int,
+                             protocol: str = PROTOCOL_BINARY) -> None:
         """
         Configures the TCP socket backend for a universe
         :param universe_uuid: The uuid of the universe to configure
@@ -228,12 +372,14 @@ class DmxOutput:
         :param target_ip: The target IP address
         :param port: The port to output to
         :param hz: The refresh rate
+        :param protocol: The protocol of the frames ("binary" frames with a header or "json" for older visualizers)
         :return: None
         """
-        universe = self.universes.get(universe_uuid)
-        if universe is None:
+        if universe_uuid not in self.universes:
             return
-        universe.configure_tcp_socket(active, target_ip, port, hz)
+        self.universes[universe_uuid]["TcpSocket"] = {"active": active, "target_ip": target_ip, "port": port, "hz": hz,
+                                                      "protocol": protocol}
+        self.engine.configure_tcp_socket(universe_uuid, active, target_ip, port, hz, protocol)
 
     def write_output_configuration(self, configuration: dict) -> None:
         """
@@ -248,13 +394,27 @@ class DmxOutput:
                         universe_data["ArtNet"].get("active", False),
                         universe_data["ArtNet"].get("target_ip", "127.0.0.1"),
                         universe_data["ArtNet"].get("universe", 0),
-                        universe_data["ArtNet"].get("hz", 30))
+                        universe_data["ArtNet"].get("hz", 30),
+                        universe_data["ArtNet"].get("sync", False),
+                        universe_data["ArtNet"].get("send_on_change", False),
+                        clamp_keepalive_ms(universe_data["ArtNet"].get("keepalive_ms", DEFAULT_KEEPALIVE_MS)),
+                        universe_data["ArtNet"].get("discovery", False))
+            if universe_data.get("sACN"):
+                self.configure_sacn(universe_uuid,
+                        universe_data["sACN"].get("active", False),
+                        universe_data["sACN"].get("universe", 1),
+                        universe_data["sACN"].get("hz", 30),
+                        universe_data["sACN"].get("multicast", True),
+                        universe_data["sACN"].get("target_ip", ""),
+                        universe_data["sACN"].get("priority", DEFAULT_SACN_PRIORITY),
+                        universe_data["sACN"].get("sync_universe", 0))
             if universe_data.get("TcpSocket"):
                 self.configure_tcp_socket(universe_uuid,
                         universe_data["TcpSocket"].get("active", False),
                         universe_data["TcpSocket"].get("target_ip", "127.0.0.01"),
                         universe_data["TcpSocket"].get("port", 7500),
-                        universe_data["TcpSocket"].get("hz", 30))
+                        universe_data["TcpSocket"].get("hz", 30),
+                        universe_data["TcpSocket"].get("protocol", PROTOCOL_JSON))  # Workspaces from before the binary protocol
             self.window.io_add_universe_entry(universe_uuid, universe_data["name"])
 
     def get_universe_configuration(self, universe_uuid: str) -> dict:
@@ -263,22 +423,18 @@ class DmxOutput:
         :param universe_uuid: The uuid of the universe to get the configuration of
         :return: The configuration of the universe
         """
-        return self.universes[universe_uuid].configuration
+        return self.universes[universe_uuid]
 
     def get_configuration(self) -> dict:
         """
         Gets the configuration of the output (used to save the workspace)
         :return: The configuration of the output
         """
-        universe_configuration = {}
-        for universe in self.universes:
-            universe_configuration[universe] = self.universes[universe].configuration
-        return universe_configuration
+        return dict(self.universes)
 
     def shutdown_output(self) -> None:
         """
-        Gracefully stops all backends
+        Gracefully stops the output engine and all backends
         :return: None
         """
-        for universe in self.universes:
-            self.universes[universe].stop()
+        self.engine.shutdown()
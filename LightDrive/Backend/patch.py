@@ -0,0 +1,193 @@
+import numpy as np
+
+class UniversePatch:
+    __slots__ = ("universe_uuid", "channels", "values")
+
+    def __init__(self, universe_uuid: str, channels: np.ndarray, values: np.ndarray) -> None:
+        """
+        Creates a patch (the compiled values a snippet outputs to one universe)
+        :param universe_uuid: The uuid of the universe the patch belongs to
+        :param channels: The zero based channel indices (unique)
+        :param values: The uint8 values of the channels (parallel to channels)
+        """
+        self.universe_uuid = universe_uuid
+        self.channels = channels
+        self.values = values
+
+    def __len__(self) -> int:
+        return len(self.channels)
+
+class FadePatch(UniversePatch):
+    __slots__ = ("from_values", "value_deltas", "level_bases", "level_slopes", "fade_start", "fade_time",
+                 "current_values", "current_levels", "interpolated")
+
+    def __init__(self, universe_uuid: str, channels: np.ndarray, values: np.ndarray, from_values: np.ndarray,
+                 value_deltas: np.ndarray, level_bases: np.ndarray, level_slopes: np.ndarray, fade_start, fade_time) -> None:
+        """
+        Creates a patch that fades between two sets of values, it is evaluated by the output engine on every frame
+        Channels set by both sides fade their values, channels only set by one side fade their level instead,
+        so they fade from or to whatever is beneath them.
+        :param universe_uuid: The uuid of the universe the patch belongs to
+        :param channels: The zero based channel indices (unique)
+        :param values: The uint8 values at the end of the fade (parallel to channels)
+        :param from_values: The float32 values at the start of the fade (parallel to channels)
+        :param value_deltas: The float32 changes of the values over the whole fade (parallel to channels)
+        :param level_bases: The float32 levels at the start of the fade (parallel to channels)
+        :param level_slopes: The float32 changes of the levels over the whole fade (parallel to channels)
+        :param fade_start: The time the fade starts at (time.perf_counter(), or an array parallel to channels)
+        :param fade_time: The duration of the fade in seconds (more than 0, or an array parallel to channels)
+        """
+        super().__init__(universe_uuid, channels, values)
+        self.from_values = from_values
+        self.value_deltas = value_deltas
+        self.level_bases = level_bases
+        self.level_slopes = level_slopes
+        self.fade_start = fade_start
+        self.fade_time = fade_time
+        self.current_values = np.empty(len(channels), dtype=np.uint8)  # Written by evaluate, so no frame allocates them
+        self.current_levels = np.empty(len(channels), dtype=np.float32)
+        self.interpolated = np.empty(len(channels), dtype=np.float32)
+
+    def fade_end(self) -> float:
+        """
+        Gets the time the fade ends at
+        :return: The end of the fade (time.perf_counter())
+        """
+        return float(np.max(self.fade_start + self.fade_time))
+
+    def evaluate(self, now: float) -> None:
+        """
+        Updates current_values and current_levels in place for a point in time
+        :param now: The current time (time.perf_counter())
+        :return: None
+        """
+        progress = np.clip((now - self.fade_start) / self.fade_time, 0, 1)
+        np.multiply(self.value_deltas, progress, out=self.interpolated)
+        np.add(self.interpolated, self.from_values, out=self.interpolated)
+        np.rint(self.interpolated, out=self.interpolated)
+        np.copyto(self.current_values, self.interpolated, casting="unsafe")
+        np.multiply(self.level_slopes, progress, out=self.current_levels)
+        np.add(self.current_levels, self.level_bases, out=self.current_levels)
+
+    def hold(self, now: float) -> "FadePatch":
+        """
+        Creates a patch that keeps the fade at a point in time (used while the snippet is paused)
+        :param now: The time to keep the fade at (time.perf_counter())
+        :return: The held patch
+        """
+        self.evaluate(now)
+        no_change = np.zeros(len(self.channels), dtype=np.float32)
+        return FadePatch(self.universe_uuid, self.channels, self.current_values.copy(), self.current_values.astype(np.float32),
+                         no_change, self.current_levels.copy(), no_change, 0.0, 1.0)
+
+def build_universe_patch(universe_uuid: str, universe_values: dict) -> UniversePatch | None:
+    """
+    Builds the patch of one universe
+    :param universe_uuid: The uuid of the universe
+    :param universe_values: The values of the universe ({channel: value, channel: value})
+    :return: The patch (None if no valid channel is set)
+    """
+    channels = np.fromiter(universe_values.keys(), dtype=np.intp, count=len(universe_values)) - 1
+    channel_values = np.fromiter(universe_values.values(), dtype=np.int32, count=len(universe_values))
+    in_range = (channels >= 0) & (channels < 512)
+    if not in_range.any():
+        return None
+    return UniversePatch(universe_uuid, channels[in_range], np.clip(channel_values[in_range], 0, 255).astype(np.uint8))
+
+def build_patches(values: dict) -> dict:
+    """
+    Builds the patches of output values, so they can be merged into the universe frames with vectorized operations
+    :param values: The values to build the patches of ({universe_uuid: {channel: value, channel: value}})
+    :return: The patches ({universe_uuid: UniversePatch})
+    """
+    patches = {}
+    for universe_uuid, universe_values in values.items():
+        patch = build_universe_patch(universe_uuid, universe_values)
+        if patch is not None:
+            patches[universe_uuid] = patch
+    return patches
+
+def combine_patches(patch_dicts: list) -> dict:
+    """
+    Combines the patches of multiple snippets into one patch per universe (later patches win on shared channels)
+    Universes that only have a single patch reuse it without copying.
+    :param patch_dicts: The patches to combine ([{universe_uuid: UniversePatch}, ...])
+    :return: The combined patches ({universe_uuid: UniversePatch})
+    """
+    universe_patches = {}
+    for patches in patch_dicts:
+        for universe_uuid, patch in patches.items():
+            universe_patches.setdefault(universe_uuid, []).append(patch)
+
+    combined_patches = {}
+    for universe_uuid, patches in universe_patches.items():
+        if len(patches) == 1:
+            combined_patches[universe_uuid] = patches[0]
+            continue
+        channels = np.concatenate([patch.channels for patch in reversed(patches)])
+        values = np.concatenate([patch.values for patch in reversed(patches)])
+        channels, first_index = np.unique(channels, return_index=True)  # Reversed, so the first occurrence is the latest patch
+        if any(isinstance(patch, FadePatch) for patch in patches):
+            combined_patches[universe_uuid] = _combine_fade_patches(universe_uuid, list(reversed(patches)), channels,
+                                                                    values[first_index], first_index)
+        else:
+            combined_patches[universe_uuid] = UniversePatch(universe_uuid, channels, values[first_index])
+    return combined_patches
+
+def _combine_fade_patches(universe_uuid: str, patches: list, channels: np.ndarray, values: np.ndarray,
+                          first_index: np.ndarray) -> FadePatch:
+    """
+    Combines patches of which some are fading into one fade patch (every channel keeps the timing of its patch)
+    :param universe_uuid: The uuid of the universe
+    :param patches: The patches to combine (the latest patch first)
+    :param channels: The combined channels
+    :param values: The combined values at the end of the fades (parallel to channels)
+    :param first_index: The index of every combined channel in the concatenated patches
+    :return: The combined fade patch
+    """
+    fade_arrays = []
+    for patch in patches:
+        if isinstance(patch, FadePatch):
+            fade_arrays.append((patch.from_values, patch.value_deltas, patch.level_bases, patch.level_slopes,
+                                np.broadcast_to(np.float64(patch.fade_start), len(patch)),
+                                np.broadcast_to(np.float64(patch.fade_time), len(patch))))
+        else:  # Not fading, it always outputs its values at full level
+            fade_arrays.append((patch.values.astype(np.float32), np.zeros(len(patch), dtype=np.float32),
+                                np.ones(len(patch), dtype=np.float32), np.zeros(len(patch), dtype=np.float32),
+                                np.zeros(len(patch)), np.ones(len(patch))))
+    from_values, value_deltas, level_bases, level_slopes, fade_starts, fade_times = \
+        (np.concatenate(arrays)[first_index] for arrays in zip(*fade_arrays))
+    return FadePatch(universe_uuid, channels, values, from_values, value_deltas, level_bases, level_slopes, fade_starts, fade_times)
+
+def build_fade_patches(from_patches: dict, to_patches: dict, fade_time: float) -> dict:
+    """
+    Precomputes the fade between two sets of patches (the start of the fade is set before the patches are posted)
+    :param from_patches: The patches at the start of the fade ({universe_uuid: UniversePatch})
+    :param to_patches: The patches at the end of the fade ({universe_uuid: UniversePatch})
+    :param fade_time: The duration of the fade in seconds (more than 0)
+    :return: The fade patches ({universe_uuid: FadePatch})
+    """
+    fade_patches = {}
+    for universe_uuid in dict.fromkeys([*from_patches, *to_patches]):
+        from_patch = from_patches.get(universe_uuid)
+        to_patch = to_patches.get(universe_uuid)
+        channels = np.unique(np.concatenate([patch.channels for patch in (from_patch, to_patch) if patch is not None]))
+        from_values = np.zeros(len(channels), dtype=np.float32)
+        to_values = np.zeros(len(channels), dtype=np.float32)
+        in_from = np.zeros(len(channels), dtype=bool)
+        in_to = np.zeros(len(channels), dtype=bool)
+        if from_patch is not None:
+            from_indices = np.searchsorted(channels, from_patch.channels)
+            from_values[from_indices] = from_patch.values
+            in_from[from_indices] = True
+        if to_patch is not None:
+            to_indices = np.searchsorted(channels, to_patch.channels)
+            to_values[to_indices] = to_patch.values
+            in_to[to_indices] = True
+        from_values = np.where(in_from, from_values, to_values)  # Channels only set by one side keep their value
+        to_values = np.where(in_to, to_values, from_values)
+        level_bases = in_from.astype(np.float32)
+        level_slopes = in_to.astype(np.float32) - level_bases
+        fade_patches[universe_uuid] = FadePatch(universe_uuid, channels, to_values.astype(np.uint8), from_values,
+                                                to_values - from_values, level_bases, level_slopes, 0.0, fade_time)
+    return fade_patches
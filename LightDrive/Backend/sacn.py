@@ -0,0 +1,143 @@
+import numpy as np
+import struct
+import time
+import uuid
+
+SACN_PORT = 5568
+ACN_PACKET_IDENTIFIER = b"ASC-E1.17\x00\x00\x00"
+VECTOR_ROOT_E131_DATA = 0x00000004
+VECTOR_ROOT_E131_EXTENDED = 0x00000008
+VECTOR_E131_DATA_PACKET = 0x00000002
+VECTOR_E131_EXTENDED_SYNCHRONIZATION = 0x00000001
+VECTOR_DMP_SET_PROPERTY = 0x02
+OPTION_STREAM_TERMINATED = 0x40
+SACN_HEADER_SIZE = 126  # Root layer, framing layer and DMP layer up to (and including) the start code
+SACN_SYNC_PACKET_SIZE = 49
+SACN_SEQUENCE_OFFSET = 111
+SACN_OPTIONS_OFFSET = 112
+DEFAULT_SACN_PRIORITY = 100
+SOURCE_NAME = "LightDrive"
+SOURCE_CID = uuid.uuid4().bytes  # Identifies this LightDrive instance as a source to the receivers
+
+def multicast_address(sacn_universe: int) -> str:
+    """
+    Gets the multicast group of an sACN universe
+    :param sacn_universe: The sACN universe (1 - 63999)
+    :return: The multicast ip (239.255.x.x)
+    """
+    return f"239.255.{(sacn_universe >> 8) & 0xFF}.{sacn_universe & 0xFF}"
+
+def build_sacn_header(sacn_universe: int, priority: int = DEFAULT_SACN_PRIORITY, sync_universe: int = 0,
+                      length: int = 512) -> bytes:
+    """
+    Builds the header of an E1.31 data packet
+    :param sacn_universe: The sACN universe (1 - 63999)
+    :param priority: The priority of the data (0 - 200, receivers use the source with the highest priority)
+    :param sync_universe: The universe the sync packets are sent on (0 outputs the data immediately)
+    :param length: The amount of channels in the packet (1 - 512)
+    :return: The 126 byte header (the sequence byte is 0 and is set for every packet)
+    """
+    packet_size = SACN_HEADER_SIZE + length
+    root_layer = (struct.pack(">HH", 0x0010, 0x0000) + ACN_PACKET_IDENTIFIER
+                  + struct.pack(">HI", 0x7000 | (packet_size - 16), VECTOR_ROOT_E131_DATA) + SOURCE_CID)
+    framing_layer = (struct.pack(">HI", 0x7000 | (packet_size - 38), VECTOR_E131_DATA_PACKET)
+                     + SOURCE_NAME.encode()[:63].ljust(64, b"\x00")
+                     + struct.pack(">BHBBH", priority, sync_universe, 0, 0, sacn_universe))
+    dmp_layer = struct.pack(">HBBHHHB", 0x7000 | (packet_size - 115), VECTOR_DMP_SET_PROPERTY, 0xA1, 0x0000, 0x0001,
+                            length + 1, 0x00)
+    return root_layer + framing_layer + dmp_layer
+
+def build_sacn_sync_packet(sync_universe: int, sequence: int) -> bytes:
+    """
+    Builds an E1.31 synchronization packet (tells the receivers to output the data received for this sync universe)
+    :param sync_universe: The universe the sync packets are sent on
+    :param sequence: The sequence number of the sync packet (0 - 255)
+    :return: The 49 byte packet
+    """
+    root_layer = (struct.pack(">HH", 0x0010, 0x0000) + ACN_PACKET_IDENTIFIER
+                  + struct.pack(">HI", 0x7000 | (SACN_SYNC_PACKET_SIZE - 16), VECTOR_ROOT_E131_EXTENDED) + SOURCE_CID)
+    framing_layer = struct.pack(">HIBHH", 0x7000 | (SACN_SYNC_PACKET_SIZE - 38), VECTOR_E131_EXTENDED_SYNCHRONIZATION,
+                                sequence, sync_universe, 0)
+    return root_layer + framing_layer
+
+class SacnOutput:
+    def __init__(self, sender, sacn_universe: int, hz: int, multicast: bool = True, target_ip: str = "",
+                 priority: int = DEFAULT_SACN_PRIORITY, sync_universe: int = 0) -> None:
+        """
+        Creates the sACN (E1.31) output of a universe (the packets are sent by a shared UdpSender)
+        :param sender: The instance of the UdpSender class to send the packets with
+        :param sacn_universe: The sACN universe to output to (1 - 63999)
+        :param hz: The refresh rate (the universe is resent at this rate even if it did not change, 0 disables it)
+        :param multicast: Whether to send to the multicast group of the universe (otherwise it is unicast to the target ip)
+        :param target_ip: The ip to unicast to
+        :param priority: The priority of the data (0 - 200)
+        :param sync_universe: The universe to send sync packets on after every burst containing this universe (0 disables sync)
+        """
+        self.sender = sender
+        self.sacn_universe = sacn_universe
+        self.hz = hz
+        self.refresh_interval = 1 / hz if hz > 0 else float("inf")
+        self.multicast = multicast
+        self.target_ip = target_ip
+        self.priority = priority
+        self.sync_universe = sync_universe
+        self.sync_key = ("sacn", sync_universe) if sync_universe else None
+        self.port = SACN_PORT
+        self.target_ips = (multicast_address(sacn_universe),) if multicast else (target_ip,)
+
+        self.packet = bytearray(build_sacn_header(sacn_universe, priority, sync_universe) + bytes(512))
+        self.sequence = 0
+        self.changed = True
+        self.next_send = 0.0
+        self.sender.add_output(self)
+
+    def set_values(self, values: np.ndarray) -> None:
+        """
+        Sets all channels to an array of values (they are sent with the next burst)
+        :param values: The array of uint8 values (must have 512 values)
+        :return: None
+        """
+        self.packet[SACN_HEADER_SIZE:] = values.data
+        self.changed = True
+
+    def next_packet(self) -> bytearray:
+        """
+        Gets the packet to send and advances the sequence number (0 - 255)
+        :return: The packet
+        """
+        self.sequence = (self.sequence + 1) % 256
+        self.packet[SACN_SEQUENCE_OFFSET] = self.sequence
+        return self.packet
+
+    def get_targets(self) -> tuple:
+        """
+        Gets the ips to send the packets to
+        :return: The multicast group of the universe or the target ip
+        """
+        return self.target_ips
+
+    def get_sync_targets(self, target_ips: tuple) -> tuple:
+        """
+        Gets the ips to send the sync packets to
+        :param target_ips: The ips the last packet was sent to
+        :return: The multicast group of the sync universe or the unicast ips
+        """
+        return (multicast_address(self.sync_universe),) if self.multicast else target_ips
+
+    def build_sync_packet(self, sequence: int) -> bytes:
+        """
+        Builds the sync packet of the sync universe
+        :param sequence: The sequence of the sync packet (counted per sync universe by the sender)
+        :return: The packet
+        """
+        return build_sacn_sync_packet(self.sync_universe, sequence)
+
+    def stop(self) -> None:
+        """
+        Gracefully stops the output (sends the stream terminated option three times, so the receivers release the universe)
+        :return: None
+        """
+        self.packet[SACN_OPTIONS_OFFSET] |= OPTION_STREAM_TERMINATED
+        for _ in range(3):
+            self.sender.send_output(self, time.perf_counter())
+        self.sender.remove_output(self)
@@ -1,7 +1,8 @@
 from .output import OutputSnippet
-from PySide6.QtWidgets import QGraphicsView, QGraphicsScene, QGraphicsPathItem, QGraphicsEllipseItem
-from PySide6.QtGui import QPen
-from PySide6.QtCore import QTimer, Qt
+from .patch import combine_patches, build_fade_patches
+from .efx import sample_path, TwoDEfxEngine
+from PySide6.QtCore import QTimer
+import time
 
 class ShowOutputSnippet(OutputSnippet):
     def __init__(self, window, show_uuid: str) -> None:
@@ -16,6 +17,7 @@ class ShowOutputSnippet(OutputSnippet):
         self.frame = 0
         self._paused = False
         self.current_output_snippets = {}
+        self.combined_source_patches = []
 
         self.timer = QTimer()
         self.timer.setInterval(10)
@@ -29,8 +31,8 @@ class ShowOutputSnippet(OutputSnippet):
                 snippet = self.window.snippet_manager.available_snippets[snippet_item_data["snippet_uuid"]]
                 match snippet.type:
                     case "scene":
-                        scene_out_val = self.window.snippet_manager.scene_manager.scene_construct_output_values(snippet.uuid)
-                        new_output_snippet = OutputSnippet(self.window.dmx_output, scene_out_val)
+                        scene_patches = self.window.snippet_manager.scene_manager.scene_construct_output_patches(snippet.uuid)
+                        new_output_snippet = OutputSnippet(self.window.dmx_output, patches=scene_patches)
                     case "two_d_efx":
                         new_output_snippet = TwoDEfxOutputSnippet(self.window, snippet.uuid)
                     case "sequence":
@@ -49,25 +51,26 @@ class ShowOutputSnippet(OutputSnippet):
             if current_snippet_data["end_frame"] < self.frame:
                 del self.current_output_snippets[current_snippet_item_uuid]
 
-        # Get all output values
-        all_outputs = []
-        for snippet_item_uuid, snippet_item_data in self.current_output_snippets.items():
-            all_outputs.append(snippet_item_data["snippet"].values)
-
-        # Construct the combined output values
-        new_values = {}
-        for output_dict in all_outputs:
-            for universe_uuid, universe_data in output_dict.items():
-                if universe_uuid not in new_values:
-                    new_values[universe_uuid] = universe_data
-                else:
-                    new_values[universe_uuid].update(universe_data)
-
-        # Update the output values
-        self.update_values(new_values)
+        # Get the patches of all running snippets
+        source_patches = [snippet_item_data["snippet"].patches for snippet_item_data in self.current_output_snippets.values()]
+
+        # Only combine the patches again if one of the running snippets posted new ones
+        if len(source_patches) != len(self.combined_source_patches) or \
+                any(patches is not combined for patches, combined in zip(source_patches, self.combined_source_patches)):
+            self.combined_source_patches = source_patches
+            self.update_patches(combine_patches(source_patches))
         if not self._paused:
             self.frame += 1
 
+    def update_fixtures(self) -> None:
+        """
+        Recompiles the running snippets of the show against the current fixture patch
+        :return: None
+        """
+        for output_snippet in self.current_output_snippets.values():
+            output_snippet["snippet"].update_fixtures()
+        self.combined_source_patches = []  # Combine the patches again on the next frame
+
     def set_frame(self, frame: int) -> None:
         """
         Sets the frame of the show
@@ -103,6 +106,21 @@ class ShowOutputSnippet(OutputSnippet):
             except AttributeError:  # see above
                 pass
 
+class SequenceStep:
+    __slots__ = ("patches", "duration", "fade", "fade_patches")
+
+    def __init__(self, patches: dict, duration: float, fade: float) -> None:
+        """
+        Creates a precompiled step of a sequence
+        :param patches: The patches of the scene of the step ({universe_uuid: UniversePatch})
+        :param duration: The duration of the step in seconds
+        :param fade: The duration of the fade from the previous step in seconds (0 cuts in)
+        """
+        self.patches = patches
+        self.duration = duration
+        self.fade = fade
+        self.fade_patches = None  # The precomputed fade from the previous step (only if the step fades in)
+
 class SequenceOutputSnippet(OutputSnippet):
     def __init__(self, window, sequence_uuid: str, start_index: int = 0, update_sequence_content_tree: bool = False) -> None:
         """
@@ -115,54 +133,118 @@ class SequenceOutputSnippet(OutputSnippet):
         super().__init__(window.dmx_output, {})
         self.window = window
         self.sequence_snippet = self.window.snippet_manager.available_snippets[sequence_uuid]
-        self.current_index = start_index
+        self.current_index = max(start_index, 0)
         self.update_sequence_content_tree = update_sequence_content_tree
         self._paused = False
+        self._paused_at = 0.0
+        self._fading = False
+
+        self.steps = []
+        self.cycle_duration = 0.0  # The duration of all steps in seconds
+        self.step_start = time.perf_counter()  # The time the current step started at (advanced by the step durations, so it never drifts)
+        self.update_steps()
 
-        self._time_till_next_scene = self.sequence_snippet.scenes[self.current_index].get("duration")
         self.timer = QTimer()
         self.timer.setInterval(10)
-        self.timer.timeout.connect(self.subtract_time)
+        self.timer.timeout.connect(self.next_frame)
         self.timer.start()
 
-    def subtract_time(self) -> None:
+    def update_steps(self) -> None:
         """
-        Subtracts time from the time until the next scene
+        Precompiles the patches and fades of all steps (called when the playback starts and whenever the steps changed)
+        Every scene is only constructed once, even if it is used by multiple steps.
         :return: None
         """
-        if self._paused:
-            return
-        self._time_till_next_scene -= 10
-        if self._time_till_next_scene <= 0:
-            self.next_scene()
+        scene_manager = self.window.snippet_manager.scene_manager
+        scene_patches = {}
+        self.steps = []
+        for scene_config in self.sequence_snippet.scenes:
+            scene_uuid = scene_config["scene_uuid"]
+            if scene_uuid not in scene_patches:
+                scene_patches[scene_uuid] = scene_manager.scene_construct_output_patches(scene_uuid)
+            duration = scene_config.get("duration", 0) / 1000
+            fade = min(scene_config.get("fade", 0) / 1000, duration)  # A fade can not be longer than its step
+            self.steps.append(SequenceStep(scene_patches[scene_uuid], duration, fade))
+        for step_index, step in enumerate(self.steps):
+            if step.fade > 0:
+                step.fade_patches = build_fade_patches(self.steps[step_index - 1].patches, step.patches, step.fade)
+        self.cycle_duration = sum(step.duration for step in self.steps)
 
-    def next_scene(self):
+        if self.current_index >= len(self.steps):
+            self.current_index = 0
+        self._fading = False
+        self.update_patches(self.steps[self.current_index].patches if self.steps else {})
+
+    def update_fixtures(self) -> None:
         """
-        Goes to the next scene in the sequence
+        Recompiles the steps against the current fixture patch
         :return: None
         """
-        self.current_index += 1
-        if self.current_index >= len(self.sequence_snippet.scenes):
-            self.current_index = 0
-        if self.update_sequence_content_tree:
+        self.update_steps()
+
+    def next_frame(self) -> None:
+        """
+        Advances the sequence to the current time and outputs the current step
+        A step that fades in is posted once as fade patches, the output engine runs the fade on its own clock.
+        :return: None
+        """
+        if self._paused or not self.steps:
+            return
+        now = time.perf_counter()
+        step_changed = False
+        if self.cycle_duration > 0 and now - self.step_start >= self.cycle_duration:
+            self.step_start += (now - self.step_start) // self.cycle_duration * self.cycle_duration  # Skip whole cycles
+        while now - self.step_start >= self.steps[self.current_index].duration:
+            self.step_start += self.steps[self.current_index].duration
+            self.current_index = (self.current_index + 1) % len(self.steps)
+            step_changed = True
+            if self.cycle_duration == 0:  # Only steps without a duration, go to the next step every frame
+                self.step_start = now
+                break
+
+        step = self.steps[self.current_index]
+        fading = step.fade_patches is not None and now - self.step_start < step.fade
+        if step_changed and fading:
+            self._post_fade(step)
+        elif step_changed or (self._fading and not fading):
+            self.update_patches(step.patches)  # The fade finished, post the plain patches again
+            self._fading = False
+
+        if step_changed and self.update_sequence_content_tree:
             self.window.ui.sequence_content_tree.setCurrentItem(self.window.ui.sequence_content_tree.topLevelItem(self.current_index))
-        new_values = self.window.snippet_manager.scene_manager.scene_construct_output_values(self.sequence_snippet.scenes[self.current_index].get("scene_uuid"))
-        self.update_values(new_values)
-        self._time_till_next_scene = self.sequence_snippet.scenes[self.current_index].get("duration")
+
+    def _post_fade(self, step: SequenceStep) -> None:
+        """
+        Posts the fade patches of a step, starting the fade at the start of the step
+        :param step: The step that fades in
+        :return: None
+        """
+        for patch in step.fade_patches.values():
+            patch.fade_start = self.step_start
+        self.update_patches(step.fade_patches)
+        self._fading = True
 
     def pause(self) -> None:
         """
-        Pauses the sequence
+        Pauses the sequence (a running fade is held where it is)
         :return: None
         """
+        if not self._paused:
+            self._paused_at = time.perf_counter()
+            if self._fading:
+                self.update_patches({universe_uuid: patch.hold(self._paused_at) for universe_uuid, patch in self.patches.items()})
         self._paused = True
         self.timer.stop()
 
     def unpause(self) -> None:
         """
-        Unpauses the sequence
+        Unpauses the sequence (the current step continues where it was paused)
         :return: None
         """
+        if self._paused:
+            self.step_start += time.perf_counter() - self._paused_at
+            if self._fading:
+                self._post_fade(self.steps[self.current_index])
         self._paused = False
         self.timer.start()
 
@@ -178,35 +260,31 @@ class TwoDEfxOutputSnippet(OutputSnippet):
         self.two_d_efx_snippet = self.window.snippet_manager.available_snippets[two_d_efx_uuid]
         self._paused = False
 
-        self.internal_graphics_view = QGraphicsView()
-        self.scene = QGraphicsScene(window)
-        self.internal_graphics_view.setSceneRect(0, 0, 511, 511)
-        self.internal_graphics_view.setScene(self.scene)
-
-        self.path = None
-        self.tracer_dot = QGraphicsEllipseItem(0, 0, 20, 20)
-        self.tracer_dot.setBrush(Qt.red)
-        self.tracer_dot.setZValue(1)
-        self.scene.addItem(self.tracer_dot)
-
+        self.path_table = None
+        self.efx_engine = None
+        self.position = 0.0  # The position on the path (0 - 1) of the first fixture
         self.timer = QTimer()
         self.timer.timeout.connect(self.next_frame)
-        self.angle = 0
 
+        self.update_fixtures()
         self.update_path()
 
+    def update_fixtures(self) -> None:
+        """
+        Compiles the fixture mappings of the 2d efx (called whenever the mappings or the phase spread changed)
+        :return: None
+        """
+        self.efx_engine = TwoDEfxEngine(self.two_d_efx_snippet.fixture_mappings, self.window.available_fixtures,
+                                        self.two_d_efx_snippet.phase_spread)
+
     def update_path(self) -> None:
         """
-        Updates the path of the 2d efx
+        Updates the path of the 2d efx (looks up the sampled path of the pattern)
         :return: None
         """
-        if self.path:
-            self.scene.removeItem(self.path)
-        painter_path = self.window.snippet_manager.two_d_efx_manager.two_d_efx_calculate_painter_path(self.two_d_efx_snippet.uuid)
-        if painter_path:
-            self.path = QGraphicsPathItem(painter_path)
-            self.path.setPen(QPen(Qt.white, 2))
-            self.scene.addItem(self.path)
+        efx = self.two_d_efx_snippet
+        self.path_table = sample_path(efx.pattern, efx.width, efx.height, efx.x_offset, efx.y_offset, efx.pattern_parameters)
+        if self.path_table is not None:
             self.timer.start(8)
 
     def next_frame(self):
@@ -216,32 +294,13 @@ class TwoDEfxOutputSnippet(OutputSnippet):
         """
         if self._paused:
             return
-        if self.path:
-            length = self.path.path().length()
-            increment = length / (self.two_d_efx_snippet.duration / 8)
+        if self.path_table is not None:
+            patches = self.efx_engine.build_patches(self.path_table, self.position)
+            increment = 8 / self.two_d_efx_snippet.duration
             if self.two_d_efx_snippet.direction == "Backward":
                 increment = -increment
-            point = self.path.path().pointAtPercent((self.angle % length) / length)
-            self.tracer_dot.setPos(point.x() - 10, point.y() - 10)
-            self.angle += increment
-            x_value = min(max(round(point.x() / 2), 0), 255)
-            y_value = min(max(round(point.y() / 2), 0), 255)
-            output = {}
-            for fixture_uuid, mapping in self.two_d_efx_snippet.fixture_mappings.items():
-                fixture = next((f for f in self.window.available_fixtures if f["fixture_uuid"] == fixture_uuid), None)
-                if not fixture_uuid:
-                    continue
-                universe_uuid = fixture["universe"]
-                fixture_address = fixture["address"]
-
-                if not output.get(universe_uuid):
-                    output[universe_uuid] = {}
-                for channel, association in mapping.items():
-                    if association == "X":
-                        output[universe_uuid][int(channel) + fixture_address] = x_value
-                    elif association == "Y":
-                        output[universe_uuid][int(channel) + fixture_address] = y_value
-            self.update_values(output)
+            self.position = (self.position + increment) % 1
+            self.update_patches(patches)
 
     def pause(self) -> None:
         """
@@ -1,71 +1,374 @@
-from PySide6.QtCore import QTimer
+import numpy as np
+import collections
+import selectors
 import threading
 import socket
+import struct
 import json
+import time
+import os
 
-class TcpSocketOutput:
-    def __init__(self, target_ip: str, port: int, hz: int) -> None:
+FRAME_MAGIC = b"LDMX"
+FRAME_HEADER = struct.Struct(">4sHIH")  # Magic, universe id, sequence, length (big endian)
+PROTOCOL_BINARY = "binary"
+PROTOCOL_JSON = "json"
+MAX_QUEUED_FRAMES = 2  # Frames queued per client, older frames are dropped when a client can not keep up
+CLIENT_SEND_BUFFER = 65536  # Limits how many stale frames the kernel buffers for a slow client
+
+def build_frame(universe_id: int, sequence: int, values: bytes) -> bytes:
+    """
+    Builds a frame of the binary protocol
+    A frame is a 12 byte header (the magic "LDMX", the universe id (uint16), the sequence (uint32)
+    and the length (uint16)) followed by the raw values.
+    :param universe_id: The id of the universe
+    :param sequence: The sequence number of the frame (wraps at 2^32)
+    :param values: The raw values of the universe
+    :return: The frame
+    """
+    return FRAME_HEADER.pack(FRAME_MAGIC, universe_id, sequence & 0xFFFFFFFF, len(values)) + values
+
+class TcpClient:
+    __slots__ = ("socket", "queue", "control", "pending", "events", "state")
+
+    def __init__(self, client_socket: socket.socket, max_queued_frames: int) -> None:
         """
-        Creates a TCP socket output class
-        :param target_ip: The ip to output to
-        :param port: The port to output to
-        :param hz: The refresh rate
+        Creates the state of a connected client
+        :param client_socket: The non-blocking socket of the client
+        :param max_queued_frames: The amount of frames to queue before the oldest ones are dropped
+        """
+        self.socket = client_socket
+        self.queue = collections.deque(maxlen=max_queued_frames)
+        self.control = collections.deque()  # Messages that must not be dropped, sent before the queued frames
+        self.pending = None  # The rest of the frame that is being sent (a frame is never dropped halfway)
+        self.events = selectors.EVENT_READ
+        self.state = {}  # Per client state of the subclasses of TcpFrameServer
+
+class TcpFrameServer:
+    def __init__(self, target_ip: str, port: int, hz: int, metrics=None, max_queued_frames: int = MAX_QUEUED_FRAMES,
+                 socket_path: str = "") -> None:
+        """
+        Creates a TCP server that sends a frame to all clients at a fixed rate
+        Accepting, sending and disconnects are handled by a selector on the own thread of the server,
+        so a slow or stalled client never blocks the output or the other clients.
+        Every client has a bounded queue that drops the oldest frames in favor of the newest ones.
+        Subclasses implement build_frame, or frames are pushed with publish (e.g. once per output frame).
+        :param target_ip: The ip to listen on
+        :param port: The port to listen on (0 disables the TCP listener if a socket path is set)
+        :param hz: The rate at which frames are built and sent (0 only sends the published frames)
+        :param metrics: An instance of the OutputMetrics class to record send times in (optional)
+        :param max_queued_frames: The amount of frames queued per client
+        :param socket_path: The path of a Unix domain socket to listen on as well (for clients on the same host, optional)
         """
         self.target_ip = target_ip
         self.port = port
-        self.packet_size = 512
-        self.output_values = [0] * self.packet_size
-        self.connections = []
+        self.hz = hz
+        self.metrics = metrics
+        self.max_queued_frames = max_queued_frames
+        self.socket_path = socket_path
+        self.clients = {}  # {client socket: TcpClient}, only used by the server thread
+        self.outbox = collections.deque()  # Published messages ((message, control)) waiting for the server thread
+        self.listeners = []
 
-        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.socket.bind((self.target_ip, self.port))
-        self.socket.listen()
-        print("Server listening on", self.target_ip, ":", self.port)
+        try:
+            if port or not socket_path:
+                listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                self.listeners.append(listener)
+                listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                listener.bind((self.target_ip, self.port))
+                print("Server listening on", self.target_ip, ":", self.port)
+            if socket_path:
+                if hasattr(socket, "AF_UNIX"):
+                    if os.path.exists(socket_path):
+                        os.remove(socket_path)  # Left behind by an instance that did not shut down
+                    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                    self.listeners.append(listener)
+                    listener.bind(socket_path)
+                    print("Server listening on", socket_path)
+                else:
+                    print("Unix domain sockets are not supported on this system, not listening on", socket_path)
+                    self.socket_path = ""
+            for listener in self.listeners:
+                listener.listen()
+                listener.setblocking(False)
+        except OSError:  # Close the listeners that were already created, so a failed server does not hold its port
+            for listener in self.listeners:
+                listener.close()
+            raise
 
-        self.accept_thread = threading.Thread(target=self.accept_connections)
-        self.accept_thread.daemon = True
-        self.accept_thread.start()
+        self.wake_receiver, self.wake_sender = socket.socketpair()  # Wakes the selector for published messages and to stop
+        self.wake_receiver.setblocking(False)
+        self.wake_sender.setblocking(False)
+        self.selector = selectors.DefaultSelector()
+        for listener in self.listeners:
+            self.selector.register(listener, selectors.EVENT_READ)
+        self.selector.register(self.wake_receiver, selectors.EVENT_READ)
 
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.send_data)
-        self.timer.start(1000 // hz)
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name=f"LightDrive TCP server {self.port}")
+        self.thread.daemon = True
+        self.thread.start()
 
-    def accept_connections(self) -> None:
+    def build_frame(self) -> bytes | None:
         """
-        Accepts incoming connections in a separate thread
+        Builds the frame to send to all clients (implemented by the subclasses)
+        :return: The frame (None skips sending)
+        """
+        return None
+
+    def run(self) -> None:
+        """
+        Runs the event loop of the server until it is stopped
+        :return: None
+        """
+        refresh_interval = 1 / self.hz if self.hz > 0 else None
+        next_send = time.perf_counter()
+        while not self.stop_event.is_set():
+            timeout = max(0.0, next_send - time.perf_counter()) if refresh_interval else None
+            for key, events in self.selector.select(timeout):
+                if key.fileobj in self.listeners:
+                    self.accept_clients(key.fileobj)
+                elif key.fileobj is self.wake_receiver:
+                    self.receive_wakeups()
+                elif key.data.socket in self.clients:  # The client may have been closed by an earlier event
+                    if events & selectors.EVENT_READ:
+                        self.read_client(key.data)
+                    if events & selectors.EVENT_WRITE and key.data.socket in self.clients:
+                        self.write_client(key.data)
+            now = time.perf_counter()
+            if refresh_interval and now >= next_send:
+                next_send = next_send + refresh_interval if now < next_send + refresh_interval else now + refresh_interval
+                self.send_frame()
+        self.close_sockets()
+
+    def publish(self, message: bytes, control: bool = False) -> None:
+        """
+        Sends a message to all clients from any thread
+        :param message: The message to send (subclasses can publish other objects and turn them into messages in queue_message)
+        :param control: Whether the message must not be dropped (e.g. metadata), otherwise it is queued like a frame
+        :return: None
+        """
+        self.outbox.append((message, control))
+        try:
+            self.wake_sender.send(b"\x00")
+        except (BlockingIOError, OSError):
+            pass  # The server is already woken up or stopped
+
+    def receive_wakeups(self) -> None:
+        """
+        Sends the published messages (called by the server thread when it is woken up)
+        :return: None
+        """
+        try:
+            self.wake_receiver.recv(4096)
+        except (BlockingIOError, OSError):
+            pass
+        while self.outbox:
+            message, control = self.outbox.popleft()
+            self.send_message(message, control)
+
+    def on_connect(self, client: TcpClient) -> None:
+        """
+        Called when a client connected (subclasses can queue the messages a new client needs)
+        :param client: The new client
+        :return: None
+        """
+        pass
+
+    def queue_message(self, client: TcpClient, message: bytes, control: bool = False) -> None:
+        """
+        Queues a message for a client (it is sent by write_client)
+        :param client: The client
+        :param message: The message
+        :param control: Whether the message must not be dropped
+        :return: None
+        """
+        if control:
+            client.control.append(message)
+        else:
+            client.queue.append(message)  # Drops the oldest queued frame if the client is behind
+
+    def accept_clients(self, listener: socket.socket) -> None:
+        """
+        Accepts all pending connections of a listening socket
+        :param listener: The listening socket
         :return: None
         """
         while True:
-            conn, addr = self.socket.accept()
-            self.connections.append(conn)
+            try:
+                client_socket, _ = listener.accept()
+            except (BlockingIOError, OSError):
+                return
+            client_socket.setblocking(False)
+            client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, CLIENT_SEND_BUFFER)
+            if listener.family == socket.AF_INET:
+                client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)  # Frames are sent as soon as they are published
+            client = TcpClient(client_socket, self.max_queued_frames)
+            self.clients[client_socket] = client
+            self.selector.register(client_socket, client.events, client)
+            self.on_connect(client)
+            self.write_client(client)
+
+    def read_client(self, client: TcpClient) -> None:
+        """
+        Reads from a client (detects disconnects and passes the received data to on_data)
+        :param client: The client that is readable
+        :return: None
+        """
+        try:
+            data = client.socket.recv(4096)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self.close_client(client)
+        else:
+            self.on_data(client, data)
+
+    def on_data(self, client: TcpClient, data: bytes) -> None:
+        """
+        Called when a client sent data (ignored unless a subclass handles requests of the clients)
+        :param client: The client
+        :param data: The received data
+        :return: None
+        """
+        pass
 
-    def send_data(self) -> None:
+    def on_disconnect(self, client: TcpClient) -> None:
         """
-        Sends the data to all connected clients
+        Called when a client is closed (subclasses can release its state)
+        :param client: The client
         :return: None
         """
-        data = json.dumps(self.output_values).encode('utf-8')
-        for conn in self.connections:
+        pass
+
+    def send_frame(self) -> None:
+        """
+        Queues a new frame for all clients and sends as much as the clients accept without blocking
+        :return: None
+        """
+        frame = self.build_frame()
+        if frame is not None:
+            self.send_message(frame)
+
+    def send_message(self, message: bytes, control: bool = False) -> None:
+        """
+        Queues a message for all clients and sends as much as the clients accept without blocking
+        :param message: The message to send
+        :param control: Whether the message must not be dropped
+        :return: None
+        """
+        start = time.perf_counter()
+        for client in list(self.clients.values()):  # Copied, since broken clients are closed while sending
+            self.queue_message(client, message, control)
+            self.write_client(client)
+        if self.metrics:
+            self.metrics.add_timing("tcp_send", time.perf_counter() - start)
+
+    def write_client(self, client: TcpClient) -> None:
+        """
+        Sends the queued frames of a client until its socket would block
+        :param client: The client to send to
+        :return: None
+        """
+        while True:
+            if client.pending is None:
+                if client.control:
+                    client.pending = memoryview(client.control.popleft())
+                elif client.queue:
+                    client.pending = memoryview(client.queue.popleft())
+                else:
+                    break
             try:
-                conn.sendall(data)
-            except (ConnectionResetError, ConnectionRefusedError, ConnectionAbortedError, ConnectionError):
-                self.connections.remove(conn)
+                sent = client.socket.send(client.pending)
+            except BlockingIOError:
+                break
+            except OSError:
+                self.close_client(client)
+                return
+            client.pending = client.pending[sent:] if sent < len(client.pending) else None
+        events = selectors.EVENT_READ
+        if client.pending is not None or client.control or client.queue:
+            events |= selectors.EVENT_WRITE  # Continue once the client accepts more data
+        if events != client.events:
+            client.events = events
+            self.selector.modify(client.socket, events, client)
 
-    def set_values(self, values: list[int]) -> None:
+    def close_client(self, client: TcpClient) -> None:
         """
-        Sets all channels to a list of values
-        :param values: The list of values (must match the packet size (512)
+        Closes the connection to a client
+        :param client: The client to close
         :return: None
         """
-        self.output_values = values
+        if self.clients.pop(client.socket, None) is None:
+            return
+        self.selector.unregister(client.socket)
+        client.socket.close()
+        self.on_disconnect(client)
+
+    def close_sockets(self) -> None:
+        """
+        Closes all sockets of the server (called by the server thread once it is stopped)
+        :return: None
+        """
+        for client in list(self.clients.values()):
+            self.close_client(client)
+        self.selector.close()
+        for listener in self.listeners:
+            listener.close()
+        if self.socket_path:
+            try:
+                os.remove(self.socket_path)
+            except OSError:
+                pass
+        self.wake_receiver.close()
 
     def stop(self) -> None:
         """
-        Gracefully stops the output
+        Gracefully stops the server
+        :return: None
+        """
+        self.stop_event.set()
+        try:
+            self.wake_sender.send(b"\x00")
+        except OSError:
+            pass
+        self.thread.join()
+        self.wake_sender.close()
+
+class TcpSocketOutput(TcpFrameServer):
+    def __init__(self, target_ip: str, port: int, hz: int, metrics=None, protocol: str = PROTOCOL_BINARY,
+                 universe_id: int = 0) -> None:
+        """
+        Creates a TCP socket output class (sends the frames of one universe)
+        :param target_ip: The ip to output to
+        :param port: The port to output to
+        :param hz: The refresh rate
+        :param metrics: An instance of the OutputMetrics class to record send times in (optional)
+        :param protocol: The protocol to send the frames with ("binary" frames with a header or "json" lists of the values)
+        :param universe_id: The id of the universe sent in the header of the binary frames
+        """
+        self.protocol = protocol
+        self.universe_id = universe_id
+        self.packet_size = 512
+        self.output_values = bytes(self.packet_size)
+        self.sequence = 0
+        super().__init__(target_ip, port, hz, metrics)
+
+    def build_frame(self) -> bytes:
+        """
+        Builds the frame of the current values
+        :return: The frame
+        """
+        if self.protocol == PROTOCOL_JSON:
+            return json.dumps(list(self.output_values)).encode('utf-8')
+        self.sequence += 1
+        return build_frame(self.universe_id, self.sequence, self.output_values)
+
+    def set_values(self, values: np.ndarray) -> None:
+        """
+        Sets all channels to an array of values (they are sent with the next frame)
+        :param values: The array of uint8 values (must match the packet size (512))
         :return: None
         """
-        self.timer.stop()
-        for conn in self.connections:
-            conn.close()
-        self.socket.close()
+        self.output_values = values.tobytes()
@@ -0,0 +1,95 @@
+import socket
+import time
+
+class UdpSender:
+    def __init__(self, metrics=None) -> None:
+        """
+        Creates the sender for the UDP outputs (ArtNet and sACN) of all universes
+        All packets are sent from one UDP socket. The output engine calls flush once per frame,
+        which sends all changed universes (and the ones due for a refresh) in one burst, followed by the sync packets.
+        An output provides the attributes port, changed, next_send, refresh_interval and sync_key (None disables sync)
+        and the methods next_packet, get_targets, get_sync_targets and build_sync_packet.
+        :param metrics: An instance of the OutputMetrics class to record send times in (optional)
+        """
+        self.metrics = metrics
+        self.outputs = []
+        self.sync_sequences = {}  # {sync_key: sequence of the last sync packet}
+        self.discovery = None  # An instance of the ArtnetDiscovery class, set by the engine while any ArtNet output uses it
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)  # Receivers on this host get multicast too
+
+    def add_output(self, output) -> None:
+        """
+        Adds the output of a universe
+        :param output: The output to add
+        :return: None
+        """
+        self.outputs.append(output)
+
+    def remove_output(self, output) -> None:
+        """
+        Removes the output of a universe
+        :param output: The output to remove
+        :return: None
+        """
+        if output in self.outputs:
+            self.outputs.remove(output)
+
+    def send_packet(self, packet, target_ips, port: int) -> None:
+        """
+        Sends a packet to multiple ips
+        :param packet: The packet to send (a bytes-like object)
+        :param target_ips: The ips to send the packet to
+        :param port: The UDP port to send to
+        :return: None
+        """
+        for target_ip in target_ips:
+            try:
+                self.socket.sendto(packet, (target_ip, port))
+            except OSError:
+                pass  # E.g. the network is unreachable or the ip is invalid, the next burst tries again
+
+    def send_output(self, output, now: float) -> tuple:
+        """
+        Sends the current packet of an output
+        :param output: The output to send
+        :param now: The current time (time.perf_counter())
+        :return: The ips the packet was sent to
+        """
+        output.changed = False
+        if output.next_send <= now < output.next_send + output.refresh_interval:
+            output.next_send += output.refresh_interval  # Keeps the refresh rate, even if it does not line up with the frames
+        else:
+            output.next_send = now + output.refresh_interval
+        packet = output.next_packet()
+        target_ips = output.get_targets()
+        self.send_packet(packet, target_ips, output.port)
+        return target_ips
+
+    def flush(self) -> None:
+        """
+        Sends all outputs that changed or are due for a refresh, followed by the sync packets of the outputs that use sync
+        :return: None
+        """
+        start = time.perf_counter()
+        sent = False
+        syncs = {}  # {sync_key: (output, set of sync target ips)}
+        for output in self.outputs:
+            if output.changed or start >= output.next_send:
+                target_ips = self.send_output(output, start)
+                sent = True
+                if output.sync_key is not None:
+                    syncs.setdefault(output.sync_key, (output, set()))[1].update(output.get_sync_targets(target_ips))
+        for sync_key, (output, target_ips) in syncs.items():
+            sequence = self.sync_sequences[sync_key] = (self.sync_sequences.get(sync_key, 0) + 1) % 256
+            self.send_packet(output.build_sync_packet(sequence), target_ips, output.port)
+        if self.metrics and sent:
+            self.metrics.add_timing("udp_send", time.perf_counter() - start)
+
+    def close(self) -> None:
+        """
+        Closes the socket
+        :return: None
+        """
+        self.socket.close()
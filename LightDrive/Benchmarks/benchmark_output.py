@@ -0,0 +1,311 @@
+"""
+Headless benchmarks for the output and effect hot paths
+
+Run from the LightDrive directory:
+    python -m Benchmarks.benchmark_output --universes 48 --fixtures 600 --scenes 20 --output results.json
+Pass --baseline with an earlier results file to fail (exit code 1) when a benchmark got slower than allowed.
+The output ticks (including the one with fading snippets) are also gated on their p99 and on the budget of one frame.
+"""
+import os
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from Backend.output import DmxOutput, OutputSnippet
+from Backend.snippets import SequenceOutputSnippet, TwoDEfxOutputSnippet, ShowOutputSnippet
+from Workspace.Snippets.scene import SceneManager, SceneData
+from Workspace.Snippets.sequence import SequenceManager, SequenceData
+from Workspace.Snippets.two_d_efx import TwoDEfxManager, TwoDEfxData
+from Workspace.Snippets.show import ShowData
+from PySide6.QtWidgets import QApplication
+from PySide6.QtCore import QObject
+import numpy as np
+import argparse
+import platform
+import tempfile
+import random
+import time
+import json
+import sys
+
+BENCHMARK_FIXTURE = {
+    "id": "benchmark_moving_head",
+    "name": "Benchmark Moving Head",
+    "light_type": "Moving Head",
+    "channels": {str(channel_number): {"name": channel_type, "type": channel_type} for channel_number, channel_type in enumerate(
+        ["Intensity", "Pan", "Tilt", "Red", "Green", "Blue", "White", "Amber",
+         "Strobe", "Gobo", "Beam", "Color", "Cyan", "Magenta", "Yellow", "Nothing"])}
+}
+FIXTURE_CHANNELS = len(BENCHMARK_FIXTURE["channels"])
+MIN_COMPARED_MS = 0.05
+FRAME_BENCHMARKS = ("tick_output_all_dirty", "tick_output_fading")  # Run once per output frame
+
+class BenchmarkSnippetManager:
+    def __init__(self, window) -> None:
+        """
+        Creates a snippet manager with only the managers needed by the output runtimes (no editors or audio)
+        :param window: The benchmark workspace
+        """
+        self.window = window
+        self.available_snippets = {}
+        self.current_snippet = None
+        self.current_display_snippet = None
+        self.scene_manager = SceneManager(self)
+        self.sequence_manager = SequenceManager(self)
+        self.two_d_efx_manager = TwoDEfxManager(self)
+
+class BenchmarkWorkspace(QObject):
+    def __init__(self, universe_count: int, fixture_count: int) -> None:
+        """
+        Creates a synthetic workspace without any user interface
+        :param universe_count: The amount of universes to create
+        :param fixture_count: The amount of fixtures to patch (spread over all universes)
+        """
+        super().__init__()
+        self.available_fixtures = []
+        self.dmx_output = DmxOutput(self)
+        self.dmx_output.engine.clock.stop()  # Frames are ticked by the benchmarks themselves
+        self.snippet_manager = BenchmarkSnippetManager(self)
+
+        universe_uuids = [f"universe-{universe_index}" for universe_index in range(universe_count)]
+        for universe_uuid in universe_uuids:
+            self.dmx_output.create_universe(universe_uuid, universe_uuid)
+        fixtures_per_universe = 512 // FIXTURE_CHANNELS
+        for fixture_index in range(min(fixture_count, fixtures_per_universe * universe_count)):
+            self.available_fixtures.append({
+                "id": BENCHMARK_FIXTURE["id"],
+                "name": f"Fixture {fixture_index}",
+                "universe": universe_uuids[fixture_index % universe_count],
+                "address": (fixture_index // universe_count) * FIXTURE_CHANNELS + 1,
+                "fixture_uuid": f"fixture-{fixture_index}"
+            })
+        self.dmx_output.update_channel_masks()
+
+def create_snippets(workspace: BenchmarkWorkspace, scene_count: int, sequence_count: int, efx_count: int, seed: int) -> dict:
+    """
+    Creates random scenes, sequences, 2D EFX and a show containing all of them
+    :param workspace: The benchmark workspace
+    :param scene_count: The amount of scenes
+    :param sequence_count: The amount of sequences
+    :param efx_count: The amount of 2D EFX
+    :param seed: The seed of the random generator
+    :return: The uuids of the created snippets by type
+    """
+    rng = random.Random(seed)
+    available_snippets = workspace.snippet_manager.available_snippets
+    fixture_uuids = [fixture["fixture_uuid"] for fixture in workspace.available_fixtures]
+    snippet_uuids = {"scene": [], "sequence": [], "two_d_efx": [], "show": []}
+
+    for scene_index in range(scene_count):
+        fixture_configs = {}
+        for fixture_uuid in rng.sample(fixture_uuids, max(1, len(fixture_uuids) // 4)):
+            fixture_configs[fixture_uuid] = {str(channel): {"value": rng.randint(0, 255), "checked": True} for channel in range(FIXTURE_CHANNELS)}
+        scene_data = SceneData(f"scene-{scene_index}", f"Scene {scene_index}", fixtures=list(fixture_configs), fixture_configs=fixture_configs)
+        available_snippets[scene_data.uuid] = scene_data
+        snippet_uuids["scene"].append(scene_data.uuid)
+
+    for sequence_index in range(sequence_count):
+        scenes = [{"scene_uuid": rng.choice(snippet_uuids["scene"]), "entry_uuid": f"entry-{sequence_index}-{step}", "duration": 100,
+                   "fade": 50 * (step % 2)} for step in range(8)]
+        sequence_data = SequenceData(f"sequence-{sequence_index}", f"Sequence {sequence_index}", scenes=scenes)
+        available_snippets[sequence_data.uuid] = sequence_data
+        snippet_uuids["sequence"].append(sequence_data.uuid)
+
+    patterns = ["Circle", "Square", "Triangle", "Line", "Eight"]
+    for efx_index in range(efx_count):
+        fixture_mappings = {fixture_uuid: {"1": "X", "2": "Y"} for fixture_uuid in rng.sample(fixture_uuids, max(1, len(fixture_uuids) // 8))}
+        efx_data = TwoDEfxData(f"efx-{efx_index}", f"2D EFX {efx_index}", patterns[efx_index % len(patterns)], 400, 300, 50, 100, fixture_mappings, 4000)
+        available_snippets[efx_data.uuid] = efx_data
+        snippet_uuids["two_d_efx"].append(efx_data.uuid)
+
+    added_snippets = {}
+    for snippet_uuid in snippet_uuids["scene"] + snippet_uuids["sequence"] + snippet_uuids["two_d_efx"]:
+        added_snippets[f"show-item-{snippet_uuid}"] = {"snippet_uuid": snippet_uuid, "frame": 0, "length": 10 ** 9}
+    show_data = ShowData("show-0", "Show 0", added_snippets=added_snippets)
+    available_snippets[show_data.uuid] = show_data
+    snippet_uuids["show"].append(show_data.uuid)
+    return snippet_uuids
+
+def measure(function, iterations: int) -> dict:
+    """
+    Measures the latency and throughput of a function
+    :param function: The function to measure
+    :param iterations: The amount of calls to measure
+    :return: The statistics of the measured calls (in milliseconds)
+    """
+    durations = np.empty(iterations)
+    for iteration in range(iterations):
+        start = time.perf_counter()
+        function()
+        durations[iteration] = time.perf_counter() - start
+    durations *= 1000
+    return {
+        "iterations": iterations,
+        "throughput_per_s": iterations / (durations.sum() / 1000) if durations.sum() else float("inf"),
+        "mean_ms": float(durations.mean()),
+        "p50_ms": float(np.percentile(durations, 50)),
+        "p95_ms": float(np.percentile(durations, 95)),
+        "p99_ms": float(np.percentile(durations, 99)),
+        "max_ms": float(durations.max())
+    }
+
+def run_benchmarks(arguments: argparse.Namespace) -> dict:
+    """
+    Builds the synthetic workspace and runs all benchmarks
+    :param arguments: The parsed command line arguments
+    :return: The results
+    """
+    workspace = BenchmarkWorkspace(arguments.universes, arguments.fixtures)
+    snippet_uuids = create_snippets(workspace, arguments.scenes, arguments.sequences, arguments.efx, arguments.seed)
+    dmx_output = workspace.dmx_output
+    scene_manager = workspace.snippet_manager.scene_manager
+    results = {}
+
+    # Activate everything like a busy desk would
+    scene_snippets = []
+    for scene_uuid in snippet_uuids["scene"]:
+        scene_snippets.append(OutputSnippet(dmx_output, patches=scene_manager.scene_construct_output_patches(scene_uuid)))
+        dmx_output.insert_snippet(scene_snippets[-1])
+    sequence_runtimes = []
+    for sequence_uuid in snippet_uuids["sequence"]:
+        sequence_runtimes.append(SequenceOutputSnippet(workspace, sequence_uuid))
+    runtimes = list(sequence_runtimes)
+    efx_runtimes = []
+    for efx_uuid in snippet_uuids["two_d_efx"]:
+        efx_runtimes.append(TwoDEfxOutputSnippet(workspace, efx_uuid))
+    runtimes.extend(efx_runtimes)
+    for runtime in runtimes:
+        runtime.timer.stop()  # The benchmarks drive the runtimes themselves
+        dmx_output.insert_snippet(runtime)
+    cue_snippets = []
+    cue_fixtures = workspace.available_fixtures[:max(1, len(workspace.available_fixtures) // 10)]
+    for _ in range(arguments.cues):
+        cue_snippets.append(OutputSnippet(dmx_output, {}))
+        dmx_output.insert_snippet(cue_snippets[-1])
+
+    cue_frame = [0]
+    def tick_all_dirty() -> None:
+        cue_frame[0] += 1
+        for cue_snippet in cue_snippets:  # Cues write new values every frame, like a playing timeline
+            cue_values = {}
+            for fixture in cue_fixtures:
+                cue_values.setdefault(fixture["universe"], {})[fixture["address"]] = cue_frame[0] % 256
+            cue_snippet.update_values(cue_values)
+        dmx_output.engine.mark_dirty(dmx_output.universes)
+        dmx_output.engine.tick_output()
+    results["tick_output_all_dirty"] = measure(tick_all_dirty, arguments.iterations)
+    results["tick_output_idle"] = measure(dmx_output.engine.tick_output, arguments.iterations)
+
+    for scene_snippet in scene_snippets:  # Fade every scene out over a time longer than the benchmark
+        dmx_output.remove_snippet(scene_snippet, 3600)
+    results["tick_output_fading"] = measure(dmx_output.engine.tick_output, arguments.iterations)
+
+    scene_cycle = iter(range(10 ** 12))
+    results["scene_construct_output_values"] = measure(
+        lambda: scene_manager.scene_construct_output_values(snippet_uuids["scene"][next(scene_cycle) % len(snippet_uuids["scene"])]),
+        arguments.iterations)
+
+    if sequence_runtimes:
+        sequence_cycle = iter(range(10 ** 12))
+        results["sequence_next_frame"] = measure(lambda: sequence_runtimes[next(sequence_cycle) % len(sequence_runtimes)].next_frame(), arguments.iterations)
+
+    if efx_runtimes:
+        efx_cycle = iter(range(10 ** 12))
+        results["two_d_efx_next_frame"] = measure(lambda: efx_runtimes[next(efx_cycle) % len(efx_runtimes)].next_frame(), arguments.iterations)
+
+    show_runtime = ShowOutputSnippet(workspace, snippet_uuids["show"][0])
+    show_runtime.timer.stop()
+    show_runtime.next_frame()  # Start all snippets of the show
+    for current_snippet_data in show_runtime.current_output_snippets.values():
+        if hasattr(current_snippet_data["snippet"], "timer"):
+            current_snippet_data["snippet"].timer.stop()
+    results["show_next_frame"] = measure(show_runtime.next_frame, arguments.iterations)
+
+    dmx_output.shutdown_output()
+    return results
+
+def compare_to_baseline(results: dict, baseline_path: str, max_regression: float) -> list:
+    """
+    Compares the mean latencies to a baseline results file
+    Benchmarks below MIN_COMPARED_MS are skipped, since their timings are mostly noise. The frame benchmarks also
+    compare their p99 latencies and have to be part of the baseline.
+    :param results: The results of this run
+    :param baseline_path: The path to the baseline results file
+    :param max_regression: The allowed relative slowdown (e.g. 0.25 for 25%)
+    :return: The descriptions of all regressions
+    """
+    with open(baseline_path) as f:
+        baseline_results = json.load(f)["results"]
+    regressions = []
+    for benchmark_name, benchmark_result in results.items():
+        baseline_result = baseline_results.get(benchmark_name)
+        if not baseline_result:
+            if benchmark_name in FRAME_BENCHMARKS:
+                regressions.append(f"{benchmark_name}: missing from the baseline")
+            continue
+        for statistic in ("mean_ms", "p99_ms") if benchmark_name in FRAME_BENCHMARKS else ("mean_ms",):
+            if baseline_result[statistic] < MIN_COMPARED_MS:
+                continue
+            slowdown = benchmark_result[statistic] / baseline_result[statistic] - 1
+            if slowdown > max_regression:
+                regressions.append(f"{benchmark_name} {statistic[:-3]}: {baseline_result[statistic]:.4f} ms -> "
+                                   f"{benchmark_result[statistic]:.4f} ms (+{slowdown:.0%})")
+    return regressions
+
+def check_frame_budget(results: dict, frame_rate: int) -> list:
+    """
+    Checks that the frame benchmarks fit into one frame of the output clock
+    :param results: The results of this run
+    :param frame_rate: The frame rate of the output clock
+    :return: The descriptions of all frame benchmarks whose p99 latency is above the budget
+    """
+    budget_ms = 1000 / frame_rate
+    return [f"{benchmark_name} p99: {results[benchmark_name]['p99_ms']:.4f} ms is above the frame budget of {budget_ms:.1f} ms"
+            for benchmark_name in FRAME_BENCHMARKS if results[benchmark_name]["p99_ms"] > budget_ms]
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Headless benchmarks for the LightDrive output and effect hot paths")
+    parser.add_argument("--universes", type=int, default=48, help="The amount of universes")
+    parser.add_argument("--fixtures", type=int, default=600, help="The amount of fixtures")
+    parser.add_argument("--scenes", type=int, default=20, help="The amount of active scenes")
+    parser.add_argument("--sequences", type=int, default=4, help="The amount of active sequences")
+    parser.add_argument("--efx", type=int, default=4, help="The amount of active 2D EFX")
+    parser.add_argument("--cues", type=int, default=2, help="The amount of active cues")
+    parser.add_argument("--iterations", type=int, default=500, help="The amount of measured calls per benchmark")
+    parser.add_argument("--seed", type=int, default=0, help="The seed of the random generator")
+    parser.add_argument("--output", default="benchmark_results.json", help="The file to write the results to")
+    parser.add_argument("--baseline", help="A results file to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="The allowed relative slowdown compared to the baseline")
+    parser.add_argument("--frame-rate", type=int, default=44, help="The frame rate of the output clock the ticks have to keep up with")
+    arguments = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    with tempfile.TemporaryDirectory() as config_dir:  # The output reads the fixture definitions from the config directory
+        os.environ["XDG_CONFIG_HOME"] = config_dir
+        os.makedirs(os.path.join(config_dir, "LightDrive", "fixtures"))
+        with open(os.path.join(config_dir, "LightDrive", "fixtures", BENCHMARK_FIXTURE["id"] + ".json"), "w") as f:
+            json.dump(BENCHMARK_FIXTURE, f)
+        results = run_benchmarks(arguments)
+    app.processEvents()
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "parameters": {key: value for key, value in vars(arguments).items() if key not in ("output", "baseline", "max_regression", "frame_rate")},
+        "results": results
+    }
+    with open(arguments.output, "w") as f:
+        json.dump(report, f, indent=4)
+    for benchmark_name, benchmark_result in results.items():
+        print(f"{benchmark_name:32} mean {benchmark_result['mean_ms']:8.4f} ms  p99 {benchmark_result['p99_ms']:8.4f} ms  {benchmark_result['throughput_per_s']:10.0f}/s")
+
+    if arguments.baseline:
+        regressions = compare_to_baseline(results, arguments.baseline, arguments.max_regression)
+        regressions.extend(check_frame_budget(results, arguments.frame_rate))
+        for regression in regressions:
+            print("REGRESSION", regression)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
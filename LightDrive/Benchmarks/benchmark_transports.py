@@ -0,0 +1,228 @@
+"""
+Latency benchmarks for the transports that stream the output to monitors and visualizers on the same host
+
+Run from the LightDrive directory:
+    python -m Benchmarks.benchmark_transports --universes 8 --output transport_results.json
+Every benchmark measures the time from publishing a frame until the client decoded it into arrays.
+"""
+from Backend.tcp_socket import TcpFrameServer, build_frame, FRAME_HEADER
+from Backend.monitor import MonitorServer, MESSAGE_HEADER, FRAME_HEADER as MONITOR_FRAME_HEADER, UNIVERSE_HEADER
+from Backend.frame_store import SharedUniverseFrame, frame_store_name, default_frame_store_prefix
+from Benchmarks.benchmark_output import measure
+import numpy as np
+import argparse
+import platform
+import tempfile
+import socket
+import time
+import json
+import sys
+import os
+
+BENCHMARK_PORT = 17700
+
+def receive_exactly(client: socket.socket, length: int) -> bytes:
+    """
+    Receives an exact amount of bytes from a blocking socket
+    :param client: The socket
+    :param length: The amount of bytes
+    :return: The received bytes
+    """
+    data = bytearray()
+    while len(data) < length:
+        chunk = client.recv(length - len(data))
+        if not chunk:
+            raise ConnectionError("The server closed the connection")
+        data += chunk
+    return bytes(data)
+
+def receive_json_frame(client: socket.socket, buffer: bytearray) -> np.ndarray:
+    """
+    Receives a frame of the JSON protocol (a list of the values without a separator)
+    :param client: The socket
+    :param buffer: The data received after the last frame
+    :return: The values
+    """
+    while b"]" not in buffer:
+        buffer += client.recv(65536)
+    end = buffer.index(b"]") + 1
+    values = np.array(json.loads(buffer[:end]), dtype=np.uint8)
+    del buffer[:end]
+    return values
+
+def receive_binary_frame(client: socket.socket) -> np.ndarray:
+    """
+    Receives a frame of the binary protocol
+    :param client: The socket
+    :return: The values
+    """
+    _, _, _, length = FRAME_HEADER.unpack(receive_exactly(client, FRAME_HEADER.size))
+    return np.frombuffer(receive_exactly(client, length), dtype=np.uint8)
+
+def receive_monitor_frame(client: socket.socket) -> list:
+    """
+    Receives the next frame message of the monitor stream (other messages are skipped)
+    :param client: The socket
+    :return: The values of the universes ([(universe_id, values), ...])
+    """
+    while True:
+        _, message_type, length = MESSAGE_HEADER.unpack(receive_exactly(client, MESSAGE_HEADER.size))
+        payload = receive_exactly(client, length)
+        if message_type == 2:
+            break
+    _, universe_count = MONITOR_FRAME_HEADER.unpack_from(payload)
+    offset = MONITOR_FRAME_HEADER.size
+    frames = []
+    for _ in range(universe_count):
+        universe_id, universe_length = UNIVERSE_HEADER.unpack_from(payload, offset)
+        offset += UNIVERSE_HEADER.size
+        frames.append((universe_id, np.frombuffer(payload, dtype=np.uint8, count=universe_length, offset=offset)))
+        offset += universe_length
+    return frames
+
+def connect(address) -> socket.socket:
+    """
+    Connects a blocking client to a server of the benchmark
+    :param address: The TCP address ((ip, port)) or the path of a Unix domain socket
+    :return: The connected socket
+    """
+    client = socket.socket(socket.AF_UNIX if isinstance(address, str) else socket.AF_INET, socket.SOCK_STREAM)
+    client.connect(address)
+    if not isinstance(address, str):
+        client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    client.settimeout(5)
+    time.sleep(0.05)  # Let the server thread accept the client
+    return client
+
+def benchmark_tcp_sockets(frames: np.ndarray, iterations: int, protocol: str) -> dict:
+    """
+    Benchmarks one TCP socket output per universe (like the visualizer connects to every universe)
+    :param frames: The frames of the universes (universes x 512)
+    :param iterations: The amount of measured frames
+    :param protocol: The protocol of the frames ("json" or "binary")
+    :return: The statistics
+    """
+    servers = [TcpFrameServer("127.0.0.1", BENCHMARK_PORT + universe_index, 0) for universe_index in range(len(frames))]
+    clients = [connect(("127.0.0.1", server.port)) for server in servers]
+    buffers = [bytearray() for _ in clients]
+    sequence = [0]
+
+    def send_and_receive() -> None:
+        sequence[0] += 1
+        frames[:, 0] = sequence[0] % 256
+        for universe_index, server in enumerate(servers):
+            if protocol == "json":
+                server.publish(json.dumps(frames[universe_index].tolist()).encode('utf-8'))
+            else:
+                server.publish(build_frame(universe_index, sequence[0], frames[universe_index].tobytes()))
+        for client, buffer in zip(clients, buffers):
+            values = receive_json_frame(client, buffer) if protocol == "json" else receive_binary_frame(client)
+            assert values[0] == sequence[0] % 256
+
+    try:
+        return measure(send_and_receive, iterations)
+    finally:
+        for client in clients:
+            client.close()
+        for server in servers:
+            server.stop()
+
+def benchmark_monitor(frames: np.ndarray, iterations: int, socket_path: str = "") -> dict:
+    """
+    Benchmarks the monitor stream (all universes in one message)
+    :param frames: The frames of the universes (universes x 512)
+    :param iterations: The amount of measured frames
+    :param socket_path: The path of the Unix domain socket to use instead of TCP
+    :return: The statistics
+    """
+    monitor = MonitorServer("127.0.0.1", 0 if socket_path else BENCHMARK_PORT, socket_path=socket_path)
+    client = connect(socket_path or ("127.0.0.1", BENCHMARK_PORT))
+    sequence = [0]
+
+    def send_and_receive() -> None:
+        sequence[0] += 1
+        frames[:, 0] = sequence[0] % 256
+        monitor.publish_frames([(universe_index, frame.tobytes()) for universe_index, frame in enumerate(frames)])
+        received_frames = receive_monitor_frame(client)
+        assert received_frames[0][1][0] == sequence[0] % 256
+
+    try:
+        return measure(send_and_receive, iterations)
+    finally:
+        client.close()
+        monitor.stop()
+
+def benchmark_shared_memory(frames: np.ndarray, iterations: int) -> dict:
+    """
+    Benchmarks the shared memory frame store (the reader polls the sequence counters of the segments)
+    :param frames: The frames of the universes (universes x 512)
+    :param iterations: The amount of measured frames
+    :return: The statistics
+    """
+    prefix = default_frame_store_prefix() + "_benchmark"
+    writers = [SharedUniverseFrame(frame_store_name(prefix, str(universe_index)), create=True) for universe_index in range(len(frames))]
+    readers = [SharedUniverseFrame(writer.name) for writer in writers]
+    last_sequences = [0] * len(readers)
+    out = np.empty(512, dtype=np.uint8)
+    sequence = [0]
+
+    def send_and_receive() -> None:
+        sequence[0] += 1
+        frames[:, 0] = sequence[0] % 256
+        for writer, frame in zip(writers, frames):
+            writer.write(frame)
+        for reader_index, reader in enumerate(readers):
+            frame_sequence, values = reader.read(out)
+            assert frame_sequence != last_sequences[reader_index] and values[0] == sequence[0] % 256
+            last_sequences[reader_index] = frame_sequence
+
+    try:
+        return measure(send_and_receive, iterations)
+    finally:
+        for shared_frame in readers + writers:
+            shared_frame.close()
+
+def run_benchmarks(arguments: argparse.Namespace) -> dict:
+    """
+    Runs the benchmark of every transport
+    :param arguments: The parsed command line arguments
+    :return: The results
+    """
+    rng = np.random.default_rng(arguments.seed)
+    frames = rng.integers(0, 256, (arguments.universes, 512), dtype=np.uint8)
+    results = {
+        "tcp_json": benchmark_tcp_sockets(frames, arguments.iterations, "json"),
+        "tcp_binary": benchmark_tcp_sockets(frames, arguments.iterations, "binary"),
+        "monitor_tcp": benchmark_monitor(frames, arguments.iterations)
+    }
+    if hasattr(socket, "AF_UNIX"):
+        with tempfile.TemporaryDirectory() as socket_dir:
+            results["monitor_unix"] = benchmark_monitor(frames, arguments.iterations, os.path.join(socket_dir, "monitor.sock"))
+    results["shared_memory"] = benchmark_shared_memory(frames, arguments.iterations)
+    return results
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Latency benchmarks for the same-host output transports of LightDrive")
+    parser.add_argument("--universes", type=int, default=8, help="The amount of universes per frame")
+    parser.add_argument("--iterations", type=int, default=2000, help="The amount of measured frames per transport")
+    parser.add_argument("--seed", type=int, default=0, help="The seed of the random generator")
+    parser.add_argument("--output", default="transport_results.json", help="The file to write the results to")
+    arguments = parser.parse_args()
+
+    results = run_benchmarks(arguments)
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "parameters": {key: value for key, value in vars(arguments).items() if key != "output"},
+        "results": results
+    }
+    with open(arguments.output, "w") as f:
+        json.dump(report, f, indent=4)
+    for benchmark_name, benchmark_result in results.items():
+        print(f"{benchmark_name:16} mean {benchmark_result['mean_ms'] * 1000:9.1f} µs  p99 {benchmark_result['p99_ms'] * 1000:9.1f} µs  "
+              f"{benchmark_result['mean_ms'] * 1000 / arguments.universes:7.1f} µs per universe")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -31,6 +31,12 @@ class SettingsDialog(QDialog):
         self.setLayout(layout)
 
         self.load_themes()
+        self.ui.output_frame_rate_spin.setValue(self.config.getint("Settings", "output_frame_rate", fallback=44))
+        self.ui.output_engine_process_check.setChecked(self.config.getboolean("Settings", "output_engine_process", fallback=False))
+        self.ui.monitor_port_spin.setValue(self.config.getint("Settings", "monitor_port", fallback=0))
+        self.ui.monitor_delta_check.setChecked(self.config.getboolean("Settings", "monitor_delta", fallback=False))
+        self.ui.monitor_socket_edit.setText(self.config.get("Settings", "monitor_socket_path", fallback=""))
+        self.ui.snippet_fade_time_spin.setValue(self.config.getint("Settings", "snippet_fade_time", fallback=0))
 
     def accept(self):
         self.save_settings()
@@ -49,6 +55,14 @@ class SettingsDialog(QDialog):
 
     def save_settings(self):
         theme = self.ui.theme_combo.currentText()
-        self.config["Settings"] = {"theme": theme}
+        output_frame_rate = self.ui.output_frame_rate_spin.value()
+        output_engine_process = self.ui.output_engine_process_check.isChecked()
+        monitor_port = self.ui.monitor_port_spin.value()
+        monitor_delta = self.ui.monitor_delta_check.isChecked()
+        monitor_socket_path = self.ui.monitor_socket_edit.text().strip()
+        snippet_fade_time = self.ui.snippet_fade_time_spin.value()
+        self.config["Settings"] = {"theme": theme, "output_frame_rate": output_frame_rate, "output_engine_process": output_engine_process,
+                                   "monitor_port": monitor_port, "monitor_delta": monitor_delta, "monitor_socket_path": monitor_socket_path,
+                                   "snippet_fade_time": snippet_fade_time}
         with open(self.settings_file, "w") as configfile:
             self.config.write(configfile)
@@ -134,6 +134,6 @@ class CueManager:
         :return: None
         """
         if self.sm.window.ui.cue_show_btn.isChecked():
-            self.sm.window.dmx_output.insert_snippet(self.cue_snippet)
+            self.sm.window.dmx_output.insert_snippet(self.cue_snippet, self.sm.window.dmx_output.snippet_fade_time)
         else:
-            self.sm.window.dmx_output.remove_snippet(self.cue_snippet)
+            self.sm.window.dmx_output.remove_snippet(self.cue_snippet, self.sm.window.dmx_output.snippet_fade_time)
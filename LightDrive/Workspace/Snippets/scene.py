@@ -1,4 +1,5 @@
 from Backend.output import OutputSnippet
+from Backend.patch import build_patches
 from Workspace.Dialogs.snippet_dialogs import SnippetAddFixtureDialog
 from Workspace.Widgets.value_slider import SceneSlider
 from PySide6.QtWidgets import QTreeWidgetItem, QListWidgetItem, QWidget, QHBoxLayout, QVBoxLayout, QSpacerItem, \
@@ -212,10 +213,10 @@ class SceneManager:
         """
         output_values = {}
         fixture_configs = self.sm.available_snippets.get(snippet_uuid).fixture_configs
-        available_fixtures = self.sm.window.available_fixtures
+        available_fixtures = {fixture["fixture_uuid"]: fixture for fixture in self.sm.window.available_fixtures}
 
         for fixture_uuid, channels in fixture_configs.items():
-            fixture = next((f for f in available_fixtures if f["fixture_uuid"] == fixture_uuid), None)
+            fixture = available_fixtures.get(fixture_uuid)
             if not fixture:
                 continue
 
@@ -233,18 +234,23 @@ class SceneManager:
 
         return output_values
 
+    def scene_construct_output_patches(self, snippet_uuid: str) -> dict:
+        """
+        Constructs the output patches for a scene with a specific UUID
+        Scenes are static, so the patches can be built once and reused for every frame.
+        :param snippet_uuid: The uuid of the scene
+        :return: The output patches ({universe_uuid: UniversePatch})
+        """
+        return build_patches(self.scene_construct_output_values(snippet_uuid))
+
     def scene_toggle_show(self) -> None:
         """
         Toggles whether the scene is being outputted over dmx or not
         :return: None
         """
-        if self.sm.current_display_snippet is not None:  # Remove the current display snippet if it exists
-            self.sm.window.dmx_output.remove_snippet(self.sm.current_display_snippet)
-            self.sm.current_display_snippet = None
-
-        if self.sm.window.ui.scene_show_btn.isChecked():  # Add the new snippet if necessary
-            output_values = self.scene_construct_output_values(self.sm.current_snippet.uuid)
-            if not output_values:
-                return
-            self.sm.current_display_snippet = OutputSnippet(self.sm.window.dmx_output, output_values)
-            self.sm.window.dmx_output.insert_snippet(self.sm.current_display_snippet)
+        output_snippet = None
+        if self.sm.window.ui.scene_show_btn.isChecked():  # Create the new snippet if necessary
+            output_patches = self.scene_construct_output_patches(self.sm.current_snippet.uuid)
+            if output_patches:
+                output_snippet = OutputSnippet(self.sm.window.dmx_output, patches=output_patches)
+        self.sm.set_display_snippet(output_snippet)  # Crossfades from the current display snippet if it exists
@@ -10,7 +10,7 @@ class SequenceData:
     uuid: str
     name: str
     type: str = field(default="sequence", init=False)
-    scenes: list[dict]  # [{"scene_uuid": "---", "entry_uuid": "---", "duration": 500}, ...]
+    scenes: list[dict]  # [{"scene_uuid": "---", "entry_uuid": "---", "duration": 500, "fade": 0}, ...]
     directory: str = field(default="root")
 
 class SequenceAddSceneDialog(QDialog):
@@ -118,9 +118,12 @@ class SequenceManager:
             scene_entry.entry_uuid = scene_config["entry_uuid"]
             scene_entry.setText(0, str(sequence_snippet.scenes.index(scene_config) + 1))
             scene_entry.setText(1, f"{scene_config['duration']}ms")
+            scene_entry.setText(2, f"{scene_config.get('fade', 0)}ms")
             scene_snippet = self.sm.available_snippets.get(scene_config["scene_uuid"])
-            scene_entry.setText(2, scene_snippet.name)
+            scene_entry.setText(3, scene_snippet.name)
             self.sm.window.ui.sequence_content_tree.addTopLevelItem(scene_entry)
+        if isinstance(self.sm.current_display_snippet, SequenceOutputSnippet):
+            self.sm.current_display_snippet.update_steps()  # Recompile the steps of the playing sequence
 
     def sequence_add_scene(self, sequence_uuid: str = None) -> None:
         """
@@ -136,7 +139,7 @@ class SequenceManager:
 
         sequence_snippet = self.sm.available_snippets.get(sequence_uuid)
         for scene_entry in dlg.selected_scenes:
-            sequence_snippet.scenes.append({"scene_uuid": scene_entry.uuid, "entry_uuid": str(uuid.uuid4()),"duration": 500})
+            sequence_snippet.scenes.append({"scene_uuid": scene_entry.uuid, "entry_uuid": str(uuid.uuid4()),"duration": 500, "fade": 0})
             self._sequence_load_scenes(sequence_snippet.uuid)
 
     def sequence_remove_scene(self, sequence_uuid: str = None, entry_uuid: str = None) -> None:
@@ -157,13 +160,18 @@ class SequenceManager:
                 break
         self._sequence_load_scenes(sequence_snippet.uuid)
 
-    def sequence_edit_entry_duration_wrapper(self) -> None:
+    def sequence_edit_entry_duration_wrapper(self, item: QTreeWidgetItem = None, column: int = 1) -> None:
         """
-        This function just calls sequence_edit_entry_duration
+        This function just calls sequence_edit_entry_duration (or sequence_edit_entry_fade if the fade column was clicked)
         It is needed to discard the default arguments when calling the function from the UI
+        :param item: The clicked item (unused, the current item is edited)
+        :param column: The clicked column
         :return:
         """
-        self.sequence_edit_entry_duration()
+        if column == 2:
+            self.sequence_edit_entry_fade()
+        else:
+            self.sequence_edit_entry_duration()
 
     def sequence_edit_entry_duration(self, sequence_uuid: str = None, entry_uuid: str = None, duration: int = None):
         """
@@ -193,6 +201,36 @@ class SequenceManager:
         # Update the ui
         self._sequence_load_scenes(sequence_snippet.uuid)
 
+    def sequence_edit_entry_fade(self, sequence_uuid: str = None, entry_uuid: str = None, fade: int = None) -> None:
+        """
+        Changes the time an entry fades in from the previous entry of the sequence
+        :param sequence_uuid: The UUID of the sequence to change the entry fade in
+        :param entry_uuid: The UUID of the entry to change the fade of
+        :param fade: The new fade time in ms (0 cuts in, limited to the duration of the entry)
+        :return: None
+        """
+        # Ensure that the sequence_uuid, entry_uuid and fade are set
+        if not sequence_uuid:
+            sequence_uuid = self.sm.current_snippet.uuid
+        if not entry_uuid:
+            if not self.sm.window.ui.sequence_content_tree.currentItem():
+                return None
+            entry_uuid = self.sm.window.ui.sequence_content_tree.currentItem().entry_uuid
+        if fade is None:
+            dlg = QInputDialog()
+            fade, ok = dlg.getInt(self.sm.window, "LightDrive - Edit Entry Fade", "Fade (ms):", 0, 0, 1000000, 1)
+            if not ok:
+                return None
+
+        # Change the fade of the entry
+        sequence_snippet = self.sm.available_snippets.get(sequence_uuid)
+        for scene_config in sequence_snippet.scenes:
+            if scene_config["entry_uuid"] == entry_uuid:
+                scene_config["fade"] = fade
+                break
+        # Update the ui
+        self._sequence_load_scenes(sequence_snippet.uuid)
+
     def _sequence_move_shared(self, sequence_uuid: str = None, entry_uuid: str = None) -> tuple | None:
         """
         Shared code for moving an entry in a sequence
@@ -268,14 +306,11 @@ class SequenceManager:
         Toggles whether the sequence is outputted over DMX
         :return: None
         """
-        if self.sm.current_display_snippet is not None:  # Remove the current display snippet if it exists
-            self.sm.window.dmx_output.remove_snippet(self.sm.current_display_snippet)
-            self.sm.current_display_snippet = None
-
-        if self.sm.window.ui.sequence_show_btn.isChecked():  # Add the new snippet if necessary
+        output_snippet = None
+        if self.sm.window.ui.sequence_show_btn.isChecked():  # Create the new snippet if necessary
             # Select the first item, if none is selected
             if not self.sm.window.ui.sequence_content_tree.currentItem():
                 self.sm.window.ui.sequence_content_tree.setCurrentItem(self.sm.window.ui.sequence_content_tree.topLevelItem(0))
             current_item_index = self.sm.window.ui.sequence_content_tree.indexOfTopLevelItem(self.sm.window.ui.sequence_content_tree.currentItem())
-            self.sm.current_display_snippet = SequenceOutputSnippet(self.sm.window, self.sm.current_snippet.uuid, current_item_index, True)
-            self.sm.window.dmx_output.insert_snippet(self.sm.current_display_snippet)
+            output_snippet = SequenceOutputSnippet(self.sm.window, self.sm.current_snippet.uuid, current_item_index, True)
+        self.sm.set_display_snippet(output_snippet)  # Crossfades from the current display snippet if it exists
@@ -31,6 +31,21 @@ class SnippetManager:
         self.sound_resource_manager = SoundResourceManager(self)
         self.show_manager = ShowManager(self)
 
+    def set_display_snippet(self, output_snippet) -> None:
+        """
+        Replaces the output snippet that outputs the snippet shown in the editor (crossfades with the snippet fade time)
+        :param output_snippet: The new output snippet (None only removes the current one)
+        :return: None
+        """
+        dmx_output = self.window.dmx_output
+        if self.current_display_snippet is not None and output_snippet is not None:
+            dmx_output.crossfade_snippets(self.current_display_snippet, output_snippet, dmx_output.snippet_fade_time)
+        elif self.current_display_snippet is not None:
+            dmx_output.remove_snippet(self.current_display_snippet, dmx_output.snippet_fade_time)
+        elif output_snippet is not None:
+            dmx_output.insert_snippet(output_snippet, dmx_output.snippet_fade_time)
+        self.current_display_snippet = output_snippet
+
     def add_item(self, item: QTreeWidgetItem, parent: QTreeWidgetItem = None) -> None:
         """
         Adds the provided item to the snippet selector tree
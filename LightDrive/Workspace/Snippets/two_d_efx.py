@@ -1,10 +1,12 @@
 from Backend.snippets import TwoDEfxOutputSnippet
+from Backend.efx import evaluate_pattern, parse_pattern_parameters, format_pattern_parameters
 from Functions.ui import clear_field
 from PySide6.QtWidgets import QTreeWidgetItem, QVBoxLayout, QGraphicsView, QGraphicsScene, QGraphicsLineItem, \
     QGraphicsPathItem, QGraphicsEllipseItem, QGraphicsTextItem, QDialog, QDialogButtonBox, QTreeWidget, \
     QListWidgetItem, QFrame, QHBoxLayout, QLabel, QComboBox
-from PySide6.QtGui import QPixmap, QPen, QPainterPath
-from PySide6.QtCore import Qt, QTimer
+from PySide6.QtGui import QPixmap, QPen, QPainterPath, QPolygonF
+from PySide6.QtCore import Qt, QTimer, QPointF
+import numpy as np
 from dataclasses import dataclass, field
 import uuid
 import json
@@ -23,6 +25,8 @@ class TwoDEfxData:
     fixture_mappings: dict = field(default_factory=dict)
     duration: int = field(default=10000)
     direction: str = field(default="Forward")
+    phase_spread: int = field(default=0)
+    pattern_parameters: dict = field(default_factory=dict)
     directory: str = field(default="root")
 
 class TwoDEfxAddFixtureDialog(QDialog):
@@ -155,7 +159,7 @@ class TwoDEfxMovementDisplay(QGraphicsView):
 
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_tracer_dot_position)
-        self.angle = 0
+        self.position = 0.0  # The position on the path (0 - 1)
 
         self.update_path()
 
@@ -175,15 +179,19 @@ class TwoDEfxMovementDisplay(QGraphicsView):
 
     def update_tracer_dot_position(self) -> None:
         if self.path:
-            length = self.path.path().length()
-            increment = length / (self.two_d_efx_snippet.duration / 8)
-            if self.two_d_efx_snippet.direction == "Backward":
+            efx = self.two_d_efx_snippet
+            point = evaluate_pattern(efx.pattern, np.array([self.position]), efx.width, efx.height, efx.x_offset, efx.y_offset,
+                                     efx.pattern_parameters)
+            if point is None:
+                return
+            x, y = point[0]
+            increment = 8 / efx.duration
+            if efx.direction == "Backward":
                 increment = -increment
-            point = self.path.path().pointAtPercent((self.angle % length) / length)
-            self.tracer_dot.setPos(point.x() - 10, point.y() - 10)
-            self.x_pos_text.setPlainText(f"X: {round(point.x())}")
-            self.y_pos_text.setPlainText(f"Y: {round(point.y())}")
-            self.angle += increment
+            self.tracer_dot.setPos(x - 10, y - 10)
+            self.x_pos_text.setPlainText(f"X: {round(x)}")
+            self.y_pos_text.setPlainText(f"Y: {round(y)}")
+            self.position = (self.position + increment) % 1
 
 class TwoDEfxManager:
     def __init__(self, snippet_manager) -> None:
@@ -206,7 +214,9 @@ class TwoDEfxManager:
         self.sm.window.ui.two_d_efx_y_offset_spin.setValue(two_d_efx_snippet.y_offset)
         self.sm.window.ui.two_d_efx_duration_spin.setValue(two_d_efx_snippet.duration)
         self.sm.window.ui.two_d_efx_pattern_combo.setCurrentText(two_d_efx_snippet.pattern)
+        self._two_d_efx_load_pattern_parameters(two_d_efx_uuid)
         self.sm.window.ui.two_d_efx_direction_combo.setCurrentText(two_d_efx_snippet.direction)
+        self.sm.window.ui.two_d_efx_phase_spread_spin.setValue(two_d_efx_snippet.phase_spread)
         self._two_d_efx_load_fixtures(two_d_efx_uuid)
 
     def two_d_efx_create(self, *, parent: QTreeWidgetItem = None, two_d_efx_data: TwoDEfxData = None) -> None:
@@ -284,6 +294,8 @@ class TwoDEfxManager:
         else :
             two_d_efx_snippet.fixtures.append(fixture_uuid)
         self._two_d_efx_load_fixtures()
+        if self.sm.current_display_snippet:
+            self.sm.current_display_snippet.update_fixtures()
 
     def two_d_efx_remove_fixture(self, two_d_efx_uuid: str = None, fixture_uuid: str = None) -> None:
         """
@@ -297,32 +309,23 @@ class TwoDEfxManager:
         two_d_efx_uuid = self.sm.available_snippets.get(two_d_efx_uuid)
         two_d_efx_uuid.fixture_mappings.pop(fixture_uuid)
         self._two_d_efx_load_fixtures()
+        if self.sm.current_display_snippet:
+            self.sm.current_display_snippet.update_fixtures()
 
     def two_d_efx_calculate_painter_path(self, two_d_efx_uuid: str) -> QPainterPath:
-        painter_path = QPainterPath()
+        """
+        Builds the path of a 2d efx for the editor (sampled from the same pattern functions as the output)
+        :param two_d_efx_uuid: The UUID of the 2d efx
+        :return: The path (empty if the pattern is unknown or empty)
+        """
         two_d_efx_snippet = self.sm.available_snippets.get(two_d_efx_uuid)
-        width = two_d_efx_snippet.width
-        height = two_d_efx_snippet.height
-        x_off = two_d_efx_snippet.x_offset
-        y_off = two_d_efx_snippet.y_offset
-        if two_d_efx_snippet.pattern == "Circle":
-            painter_path.addEllipse(x_off, y_off, width, height)
-        elif two_d_efx_snippet.pattern == "Square":
-            painter_path.addRect(x_off, y_off, width, height)
-        elif two_d_efx_snippet.pattern == "Triangle":
-            painter_path.moveTo(width / 2 + x_off, y_off)
-            painter_path.lineTo(width + x_off, height + y_off)
-            painter_path.lineTo(x_off, height + y_off)
-            painter_path.lineTo(width / 2 + x_off, y_off)
-        elif two_d_efx_snippet.pattern == "Line":
-            painter_path.moveTo(x_off, y_off)
-            painter_path.lineTo(width + x_off, height + y_off)
-        elif two_d_efx_snippet.pattern == "Eight":
-            painter_path.moveTo(x_off + width / 2, y_off)
-            painter_path.cubicTo(x_off + width, y_off, x_off + width, y_off + height / 2, x_off + width / 2, y_off + height / 2)
-            painter_path.cubicTo(x_off, y_off + height / 2, x_off, y_off + height, x_off + width / 2, y_off + height)
-            painter_path.cubicTo(x_off + width, y_off + height, x_off + width, y_off + height / 2, x_off + width / 2, y_off + height / 2)
-            painter_path.cubicTo(x_off, y_off + height / 2, x_off, y_off, x_off + width / 2, y_off)
+        painter_path = QPainterPath()
+        positions = np.linspace(0, 1, 513)
+        positions[-1] = np.nextafter(1, 0)  # The end of the path (1 would wrap around to the start)
+        points = evaluate_pattern(two_d_efx_snippet.pattern, positions, two_d_efx_snippet.width, two_d_efx_snippet.height,
+                                  two_d_efx_snippet.x_offset, two_d_efx_snippet.y_offset, two_d_efx_snippet.pattern_parameters)
+        if points is not None:
+            painter_path.addPolygon(QPolygonF([QPointF(x, y) for x, y in points]))
         return painter_path
 
     def two_d_efx_change_pattern(self, pattern: str, two_d_efx_uuid: str = None) -> None:
@@ -334,7 +337,45 @@ class TwoDEfxManager:
         """
         if not two_d_efx_uuid:
             two_d_efx_uuid = self.sm.current_snippet.uuid
-        self.sm.available_snippets[two_d_efx_uuid].pattern = pattern
+        if self.sm.available_snippets[two_d_efx_uuid].pattern != pattern:
+            self.sm.available_snippets[two_d_efx_uuid].pattern = pattern
+            self.sm.available_snippets[two_d_efx_uuid].pattern_parameters = {}  # The parameters of the previous pattern do not apply
+            self._two_d_efx_load_pattern_parameters(two_d_efx_uuid)
+        if self.two_d_efx_movement_display:
+            self.two_d_efx_movement_display.update_path()
+        if self.sm.current_display_snippet:
+            self.sm.current_display_snippet.update_path()
+
+    def _two_d_efx_load_pattern_parameters(self, two_d_efx_uuid: str) -> None:
+        """
+        Shows the parameters of the pattern of a 2d efx in the editor
+        :param two_d_efx_uuid: The UUID of the 2d efx
+        :return: None
+        """
+        two_d_efx_snippet = self.sm.available_snippets.get(two_d_efx_uuid)
+        edit = self.sm.window.ui.two_d_efx_pattern_parameters_edit
+        edit.blockSignals(True)
+        edit.setText(format_pattern_parameters(two_d_efx_snippet.pattern, two_d_efx_snippet.pattern_parameters))
+        edit.blockSignals(False)
+        edit.setEnabled(two_d_efx_snippet.pattern in ("Lissajous", "Spiral", "Polyline"))
+        edit.setPlaceholderText({"Lissajous": "X frequency:Y frequency:Phase (e.g. 3:2:90)", "Spiral": "Turns (e.g. 3)",
+                                 "Polyline": "Points from 0 to 1 (e.g. 0,0 1,0 0.5,1), end with - to leave it open"}.get(two_d_efx_snippet.pattern, ""))
+
+    def two_d_efx_change_pattern_parameters(self, two_d_efx_uuid: str = None) -> None:
+        """
+        Changes the parameters of the pattern (e.g. the frequencies of a Lissajous figure) to the ones entered in the editor
+        :param two_d_efx_uuid: The UUID of the 2d efx to change the parameters of (if None, uses the current snippet)
+        :return: None
+        """
+        if not two_d_efx_uuid:
+            two_d_efx_uuid = self.sm.current_snippet.uuid
+        two_d_efx_snippet = self.sm.available_snippets[two_d_efx_uuid]
+        try:
+            two_d_efx_snippet.pattern_parameters = parse_pattern_parameters(two_d_efx_snippet.pattern,
+                                                                            self.sm.window.ui.two_d_efx_pattern_parameters_edit.text())
+        except ValueError:
+            self._two_d_efx_load_pattern_parameters(two_d_efx_uuid)  # Invalid input, show the current parameters again
+            return
         if self.two_d_efx_movement_display:
             self.two_d_efx_movement_display.update_path()
         if self.sm.current_display_snippet:
@@ -418,6 +459,19 @@ class TwoDEfxManager:
         if self.sm.current_display_snippet:
             self.sm.current_display_snippet.update_path()
 
+    def two_d_efx_change_phase_spread(self, phase_spread: int, two_d_efx_uuid: str = None) -> None:
+        """
+        Changes the phase spread of the 2d efx with the given UUID (how far the fixtures are spread along the path)
+        :param phase_spread: The new phase spread in degrees (360 spreads the fixtures evenly over the whole path)
+        :param two_d_efx_uuid: The UUID of the 2d efx to change the phase spread of (if None, uses the current snippet)
+        :return: None
+        """
+        if not two_d_efx_uuid:
+            two_d_efx_uuid = self.sm.current_snippet.uuid
+        self.sm.available_snippets[two_d_efx_uuid].phase_spread = phase_spread
+        if self.sm.current_display_snippet:
+            self.sm.current_display_snippet.update_fixtures()
+
     def two_d_efx_edit_fixture_mapping_wrapper(self, fixture_entry: QTreeWidgetItem) -> None:
         """
         This function just calls the actual function with the correct arguments
@@ -436,17 +490,16 @@ class TwoDEfxManager:
             return
         for channel_number, mapping in enumerate(dlg.result):
             self.sm.available_snippets[two_d_efx_uuid].fixture_mappings[fixture_uuid][str(channel_number)] = mapping
+        if self.sm.current_display_snippet:
+            self.sm.current_display_snippet.update_fixtures()
 
     def two_d_efx_toggle_show(self) -> None:
         """
         Toggles whether the 2d efx is outputted over DMX
         :return: None
         """
-        if self.sm.current_display_snippet is not None:  # Deactivate
-            self.sm.window.dmx_output.remove_snippet(self.sm.current_display_snippet)
-            self.sm.current_display_snippet = None
-
+        output_snippet = None
         if self.sm.window.ui.two_d_efx_show_btn.isChecked():  # Activate
-            self.two_d_efx_movement_display.angle = 0
-            self.sm.current_display_snippet = TwoDEfxOutputSnippet(self.sm.window, self.sm.current_snippet.uuid)
-            self.sm.window.dmx_output.insert_snippet(self.sm.current_display_snippet)
+            self.two_d_efx_movement_display.position = 0.0
+            output_snippet = TwoDEfxOutputSnippet(self.sm.window, self.sm.current_snippet.uuid)
+        self.sm.set_display_snippet(output_snippet)  # Crossfades from the current display snippet if it exists
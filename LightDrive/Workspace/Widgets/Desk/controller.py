@@ -124,16 +124,16 @@ class DeskController(ExtendedAbstractDeskItem):
         if not linked_snippet:
             return
         if linked_snippet.type == "scene":
-            values = self.desk.window.snippet_manager.scene_manager.scene_construct_output_values(self.linked_snippet_uuid)
-            if values:
-                self.output_snippet = OutputSnippet(self.desk.window.dmx_output, values)
-                self.desk.window.dmx_output.insert_snippet(self.output_snippet)
+            patches = self.desk.window.snippet_manager.scene_manager.scene_construct_output_patches(self.linked_snippet_uuid)
+            if patches:
+                self.output_snippet = OutputSnippet(self.desk.window.dmx_output, patches=patches)
+                self.desk.window.dmx_output.insert_snippet(self.output_snippet, self.desk.window.dmx_output.snippet_fade_time)
         elif linked_snippet.type == "sequence":
             self.output_snippet = SequenceOutputSnippet(self.desk.window, self.linked_snippet_uuid)
-            self.desk.window.dmx_output.insert_snippet(self.output_snippet)
+            self.desk.window.dmx_output.insert_snippet(self.output_snippet, self.desk.window.dmx_output.snippet_fade_time)
         elif linked_snippet.type == "two_d_efx":
             self.output_snippet = TwoDEfxOutputSnippet(self.desk.window, self.linked_snippet_uuid)
-            self.desk.window.dmx_output.insert_snippet(self.output_snippet)
+            self.desk.window.dmx_output.insert_snippet(self.output_snippet, self.desk.window.dmx_output.snippet_fade_time)
 
     def deactivate(self) -> None:
         """
@@ -141,7 +141,7 @@ class DeskController(ExtendedAbstractDeskItem):
         :return: None
         """
         if self.output_snippet:  # Remove the output snippet if it exists (stops output)
-            self.desk.window.dmx_output.remove_snippet(self.output_snippet)
+            self.desk.window.dmx_output.remove_snippet(self.output_snippet, self.desk.window.dmx_output.snippet_fade_time)
             self.output_snippet = None
 
     def paint(self, painter: QPainter, option, widget=None) -> None:
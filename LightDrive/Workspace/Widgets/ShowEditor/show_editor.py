@@ -334,7 +334,7 @@ class ShowEditor(QGraphicsView):
         :return: None
         """
         if status:
-            self.window.dmx_output.insert_snippet(self.output_snippet)
+            self.window.dmx_output.insert_snippet(self.output_snippet, self.window.dmx_output.snippet_fade_time)
         else:
-            self.window.dmx_output.remove_snippet(self.output_snippet)
+            self.window.dmx_output.remove_snippet(self.output_snippet, self.window.dmx_output.snippet_fade_time)
 
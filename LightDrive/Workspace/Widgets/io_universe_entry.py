@@ -1,6 +1,6 @@
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel, QDialog
 from PySide6.QtGui import QMouseEvent
-from PySide6.QtCore import Qt, QFile
+from PySide6.QtCore import Qt, QFile, QTimer
 from PySide6.QtUiTools import QUiLoader
 
 class UniverseConfigurationDialog(QDialog):
@@ -27,6 +27,22 @@ class UniverseConfigurationDialog(QDialog):
             self.ui.target_ip_edit.setText(artnet_config.get("target_ip"))
             self.ui.universe_spin.setValue(artnet_config.get("universe"))
             self.ui.hz_spin.setValue(artnet_config.get("hz"))
+            self.ui.artnet_sync_checkbox.setChecked(artnet_config.get("sync", False))
+            self.ui.artnet_send_on_change_checkbox.setChecked(artnet_config.get("send_on_change", False))
+            self.ui.artnet_keepalive_spin.setValue(artnet_config.get("keepalive_ms", 1000))
+            self.ui.artnet_discovery_checkbox.setChecked(artnet_config.get("discovery", False))
+        # Load the sACN configuration
+        sacn_config = universe_data.get("sACN")
+        self.ui.sacn_frame.setDisabled(True)
+        if sacn_config:
+            self.ui.sacn_frame.setDisabled(not sacn_config.get("active"))
+            self.ui.enable_sacn_checkbox.setChecked(sacn_config.get("active"))
+            self.ui.sacn_universe_spin.setValue(sacn_config.get("universe", 1))
+            self.ui.sacn_hz_spin.setValue(sacn_config.get("hz", 30))
+            self.ui.sacn_multicast_checkbox.setChecked(sacn_config.get("multicast", True))
+            self.ui.sacn_target_ip_edit.setText(sacn_config.get("target_ip", ""))
+            self.ui.sacn_priority_spin.setValue(sacn_config.get("priority", 100))
+            self.ui.sacn_sync_universe_spin.setValue(sacn_config.get("sync_universe", 0))
         # Load the TCP socket configuration
         tcp_socket_config = universe_data.get("TcpSocket")
         self.ui.tcp_socket_frame.setDisabled(True)
@@ -36,8 +52,10 @@ class UniverseConfigurationDialog(QDialog):
             self.ui.tcp_socket_target_ip_edit.setText(tcp_socket_config.get("target_ip"))
             self.ui.tcp_socket_port_spin.setValue(tcp_socket_config.get("port"))
             self.ui.tcp_socket_hz_spin.setValue(tcp_socket_config.get("hz"))
+            self.ui.tcp_socket_protocol_combo.setCurrentIndex(1 if tcp_socket_config.get("protocol") == "json" else 0)
 
         self.ui.enable_artnet_checkbox.checkStateChanged.connect(self.switch_artnet_state)
+        self.ui.enable_sacn_checkbox.checkStateChanged.connect(self.switch_sacn_state)
         self.ui.enable_tcp_socket_checkbox.checkStateChanged.connect(self.switch_tcp_socket_state)
         self.ui.apply_btn.clicked.connect(self.apply)
         self.ui.cancel_btn.clicked.connect(self.close)
@@ -55,6 +73,17 @@ class UniverseConfigurationDialog(QDialog):
         else:
             self.ui.artnet_frame.setDisabled(True)
 
+    def switch_sacn_state(self, state) -> None:
+        """
+        Switches the sACN state between activated and deactivated
+        :param state: The new state of the enable_sacn_checkbox.
+        :return: None
+        """
+        if state == state.Checked:
+            self.ui.sacn_frame.setDisabled(False)
+        else:
+            self.ui.sacn_frame.setDisabled(True)
+
     def switch_tcp_socket_state(self, state) -> None:
         """
         Switches the TCP socket state between activated and deactivated
@@ -87,8 +116,32 @@ class UniverseEntry(QWidget):
         label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         layout.addWidget(label)
 
+        self.output_label = QLabel(self)
+        self.output_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.output_label)
+
         self.setLayout(layout)
 
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.update_output)
+        self.timer.start(250)
+        self.update_output()
+
+    def update_output(self) -> None:
+        """
+        Shows a summary of the last frame that was sent to the universe (read from the shared frame store)
+        :return: None
+        """
+        frame = self.workspace_window.dmx_output.get_frame(self.universe_uuid)
+        if frame is None:
+            self.output_label.setText("No output")
+            self.output_label.setToolTip("")
+            return
+        active_channels = frame.nonzero()[0]
+        self.output_label.setText(f"{len(active_channels)} channels active (max {frame.max()})")
+        self.output_label.setToolTip(", ".join(f"{channel + 1}: {frame[channel]}" for channel in active_channels[:64]) +
+                                     (", ..." if len(active_channels) > 64 else ""))
+
     def mouseDoubleClickEvent(self, event: QMouseEvent):  # noqa: N802
         universe_data = self.workspace_window.dmx_output.get_universe_configuration(self.universe_uuid)
         dlg = UniverseConfigurationDialog(universe_data)
@@ -98,10 +151,23 @@ class UniverseEntry(QWidget):
                                                               active = dlg.ui.enable_artnet_checkbox.isChecked(),
                                                               target_ip = dlg.ui.target_ip_edit.text(),
                                                               artnet_universe = dlg.ui.universe_spin.value(),
-                                                              hz = dlg.ui.hz_spin.value())
+                                                              hz = dlg.ui.hz_spin.value(),
+                                                              sync = dlg.ui.artnet_sync_checkbox.isChecked(),
+                                                              send_on_change = dlg.ui.artnet_send_on_change_checkbox.isChecked(),
+                                                              keepalive_ms = dlg.ui.artnet_keepalive_spin.value(),
+                                                              discovery = dlg.ui.artnet_discovery_checkbox.isChecked())
+            self.workspace_window.dmx_output.configure_sacn(universe_uuid = self.universe_uuid,
+                                                            active = dlg.ui.enable_sacn_checkbox.isChecked(),
+                                                            sacn_universe = dlg.ui.sacn_universe_spin.value(),
+                                                            hz = dlg.ui.sacn_hz_spin.value(),
+                                                            multicast = dlg.ui.sacn_multicast_checkbox.isChecked(),
+                                                            target_ip = dlg.ui.sacn_target_ip_edit.text(),
+                                                            priority = dlg.ui.sacn_priority_spin.value(),
+                                                            sync_universe = dlg.ui.sacn_sync_universe_spin.value())
             self.workspace_window.dmx_output.configure_tcp_socket(universe_uuid = self.universe_uuid,
                                                                   active = dlg.ui.enable_tcp_socket_checkbox.isChecked(),
                                                                   target_ip = dlg.ui.tcp_socket_target_ip_edit.text(),
                                                                   port = dlg.ui.tcp_socket_port_spin.value(),
-                                                                  hz = dlg.ui.tcp_socket_hz_spin.value())
+                                                                  hz = dlg.ui.tcp_socket_hz_spin.value(),
+                                                                  protocol = "json" if dlg.ui.tcp_socket_protocol_combo.currentIndex() == 1 else "binary")
         super().mouseDoubleClickEvent(event)
@@ -0,0 +1,78 @@
+from PySide6.QtWidgets import QLabel, QMenu, QFileDialog
+from PySide6.QtGui import QContextMenuEvent
+from PySide6.QtCore import QTimer
+import collections
+import time
+import os
+
+MAX_SHOWN_ERRORS = 10
+
+class OutputStatusWidget(QLabel):
+    def __init__(self, window) -> None:
+        """
+        Creates the status bar widget showing the metrics of the output pipeline
+        :param window: The main window
+        """
+        super().__init__(window)
+        self.workspace_window = window
+        self.errors = collections.deque(maxlen=MAX_SHOWN_ERRORS)  # The latest errors of the output ("time: message")
+        self.error_count = 0  # All errors since they were cleared the last time
+        self.setToolTip("Output metrics (right-click to save them as JSON)")
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.update_status)
+        self.timer.start(1000)
+        self.update_status()
+
+    def update_status(self) -> None:
+        """
+        Updates the displayed metrics and the errors the output reported
+        Errors are counted in the text and listed in the tooltip, so they never interrupt the show with a dialog.
+        :return: None
+        """
+        for error in self.workspace_window.dmx_output.take_errors():
+            self.errors.append(f"{time.strftime('%H:%M:%S')}: {error}")
+            self.error_count += 1
+
+        metrics = self.workspace_window.dmx_output.metrics.snapshot()
+        merge_timing = metrics["timings"].get("merge", {})
+        self.setText(f"Output: {metrics['frame_rate']:.1f} fps | "
+                     f"Merge: {merge_timing.get('mean_ms', 0):.2f} ms (max {merge_timing.get('max_ms', 0):.2f} ms) | "
+                     f"Late: {metrics['counters']['late_frames']} | "
+                     f"Dropped: {metrics['counters']['dropped_frames']} | "
+                     f"Snippets: {metrics['active_snippets']}" +
+                     (f" | Errors: {self.error_count}" if self.errors else ""))
+        self.setStyleSheet("color: red;" if self.errors else "")
+
+        # List the errors, send rates and backend timings in the tooltip
+        universe_configuration = self.workspace_window.dmx_output.get_configuration()
+        tooltip_lines = ["Output metrics (right-click to save them as JSON)"]
+        if self.errors:
+            tooltip_lines.extend(["", "Errors (right-click to clear them):", *self.errors, ""])
+        for universe_uuid, send_rate in metrics["universe_send_rates"].items():
+            universe_name = universe_configuration.get(universe_uuid, {}).get("name", universe_uuid)
+            tooltip_lines.append(f"{universe_name}: {send_rate:.1f} sends/s")
+        for timing_name, timing in metrics["timings"].items():
+            tooltip_lines.append(f"{timing_name}: {timing['mean_ms']:.3f} ms mean, {timing['max_ms']:.3f} ms max")
+        self.setToolTip("\n".join(tooltip_lines))
+
+    def contextMenuEvent(self, event: QContextMenuEvent) -> None:  # noqa: N802
+        """
+        Shows a menu to save the metrics as JSON and to clear the errors
+        :param event: The context menu event
+        :return: None
+        """
+        menu = QMenu(self)
+        save_action = menu.addAction("Save Metrics As JSON")
+        clear_action = menu.addAction("Clear Errors")
+        clear_action.setEnabled(bool(self.errors))
+        action = menu.exec(event.globalPos())
+        if action == clear_action:
+            self.errors.clear()
+            self.error_count = 0
+            self.update_status()
+        elif action == save_action:
+            file_path, _ = QFileDialog.getSaveFileName(self, "LightDrive - Save Output Metrics",
+                                                       os.path.expanduser("~/lightdrive_metrics.json"), "JSON (*.json)")
+            if file_path:
+                self.workspace_window.dmx_output.metrics.dump_json(file_path)
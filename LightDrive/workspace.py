@@ -6,6 +6,7 @@ from Workspace.Dialogs.add_fixture_dialog import AddFixtureDialog
 from Workspace.Widgets.value_slider import ValueSlider
 from Workspace.Widgets.io_universe_entry import UniverseEntry
 from Workspace.Widgets.control_desk import ControlDesk
+from Workspace.Widgets.output_status import OutputStatusWidget
 from PySide6.QtWidgets import QApplication, QMainWindow, QMenuBar, QMenu, QTreeWidgetItem, QSplitter, QMessageBox, \
     QListWidgetItem, QInputDialog
 from PySide6.QtUiTools import QUiLoader
@@ -27,8 +28,17 @@ class Workspace(QMainWindow):
         self.live_mode = False
         super().__init__()
 
+        # Load the settings
+        self.config = configparser.ConfigParser()
+        self.config.read(os.getenv("XDG_CONFIG_HOME", default=os.path.expanduser("~/.config")) + "/LightDrive/settings.ini")
+
         # Setup output
-        self.dmx_output = DmxOutput(self)
+        self.dmx_output = DmxOutput(self, self.config.getint("Settings", "output_frame_rate", fallback=44),
+                                    self.config.getboolean("Settings", "output_engine_process", fallback=False),
+                                    self.config.getint("Settings", "monitor_port", fallback=0),
+                                    self.config.getboolean("Settings", "monitor_delta", fallback=False),
+                                    self.config.get("Settings", "monitor_socket_path", fallback=""))
+        self.dmx_output.snippet_fade_time = self.config.getint("Settings", "snippet_fade_time", fallback=0) / 1000
 
         # Setup snippet manager
         self.snippet_manager = SnippetManager(self)
@@ -62,9 +72,7 @@ class Workspace(QMainWindow):
         # Set the theme
         if os.path.isdir("/usr/lib/qt6/plugins"):
             app.addLibraryPath("/usr/lib/qt6/plugins")
-        config = configparser.ConfigParser()
-        config.read(os.getenv("XDG_CONFIG_HOME", default=os.path.expanduser("~/.config")) + "/LightDrive/settings.ini")
-        app.setStyle(config.get("Settings", "theme", fallback="Breeze"))
+        app.setStyle(self.config.get("Settings", "theme", fallback="Breeze"))
 
         # Load the UI file
         loader = QUiLoader()
@@ -103,6 +111,10 @@ class Workspace(QMainWindow):
         settings_menu.addAction(preferences_action)
         preferences_action.triggered.connect(self.show_settings)
 
+        # Show the output metrics in the status bar
+        self.output_status = OutputStatusWidget(self)
+        self.statusBar().addPermanentWidget(self.output_status)
+
         # Configure buttons
         self.ui.fixture_btn.clicked.connect(lambda: self.show_page(0))
         self.ui.fixture_btn.setIcon(QPixmap("Assets/Icons/fixture_page.svg"))
@@ -151,6 +163,9 @@ class Workspace(QMainWindow):
         """
         settings = SettingsDialog()
         settings.exec()
+        self.config = settings.config
+        self.dmx_output.set_frame_rate(self.config.getint("Settings", "output_frame_rate", fallback=44))
+        self.dmx_output.snippet_fade_time = self.config.getint("Settings", "snippet_fade_time", fallback=0) / 1000
 
     def show_page(self, page_index: int) -> None:
         """
@@ -228,7 +243,7 @@ class Workspace(QMainWindow):
             fixture_item.setText(1, f"{universe_configuration[fixture['universe']]["name"]}>{fixture['address']}-{fixture['address'] + len(fixture_data["channels"]) - 1}")
             fixture_item.uuid = fixture["fixture_uuid"]
 
-    def add_fixture(self, amount: int, fixture_data: dict, universe_uuid: str, address: int, provided_uuid: str = None) -> None:
+    def add_fixture(self, amount: int, fixture_data: dict, universe_uuid: str, address: int, provided_uuid: str = None, update_output: bool = True) -> None:
         """
         Add the fixture
         :param amount: The amount of the fixture
@@ -236,6 +251,7 @@ class Workspace(QMainWindow):
         :param universe_uuid: The universe of the fixture
         :param address: The address of the fixture
         :param provided_uuid: The uuid of the fixture (used when loading workspace; defaults to None, setting a new one)
+        :param update_output: Whether to update the fixture tree and the channel masks (disabled when loading many fixtures)
         :return: None
         """
         for _ in range(amount):
@@ -247,7 +263,10 @@ class Workspace(QMainWindow):
                 "address": address,
                 "fixture_uuid": provided_uuid if provided_uuid else fixture_uuid,
             })
-        self.fixture_display_items()
+        if update_output:
+            self.fixture_display_items()
+            self.dmx_output.update_channel_masks()
+            self.dmx_output.update_snippet_fixtures()
 
     def remove_fixture(self) -> None:
         """
@@ -259,6 +278,8 @@ class Workspace(QMainWindow):
             if current_item.uuid == fixture["fixture_uuid"]:
                 self.available_fixtures.remove(fixture)
         current_item.parent().removeChild(current_item)
+        self.dmx_output.update_channel_masks()
+        self.dmx_output.update_snippet_fixtures()
 
     def setup_console_page(self) -> None:
         """
@@ -423,12 +444,14 @@ class Workspace(QMainWindow):
 
         self.ui.two_d_efx_name_edit.editingFinished.connect(self.snippet_manager.two_d_efx_manager.two_d_efx_rename)
         self.ui.two_d_efx_pattern_combo.currentTextChanged.connect(self.snippet_manager.two_d_efx_manager.two_d_efx_change_pattern)
+        self.ui.two_d_efx_pattern_parameters_edit.editingFinished.connect(self.snippet_manager.two_d_efx_manager.two_d_efx_change_pattern_parameters)
         self.ui.two_d_efx_width_spin.valueChanged.connect(self.snippet_manager.two_d_efx_manager.two_d_efx_change_width)
         self.ui.two_d_efx_height_spin.valueChanged.connect(self.snippet_manager.two_d_efx_manager.two_d_efx_change_height)
         self.ui.two_d_efx_x_offset_spin.valueChanged.connect(self.snippet_manager.two_d_efx_manager.two_d_efx_change_x_offset)
         self.ui.two_d_efx_y_offset_spin.valueChanged.connect(self.snippet_manager.two_d_efx_manager.two_d_efx_change_y_offset)
         self.ui.two_d_efx_duration_spin.valueChanged.connect(self.snippet_manager.two_d_efx_manager.two_d_efx_change_duration)
         self.ui.two_d_efx_direction_combo.currentTextChanged.connect(self.snippet_manager.two_d_efx_manager.two_d_efx_change_direction)
+        self.ui.two_d_efx_phase_spread_spin.valueChanged.connect(self.snippet_manager.two_d_efx_manager.two_d_efx_change_phase_spread)
         self.ui.two_d_efx_fixture_list.itemDoubleClicked.connect(self.snippet_manager.two_d_efx_manager.two_d_efx_edit_fixture_mapping_wrapper)
         self.ui.two_d_efx_add_fixture_btn.clicked.connect(self.snippet_manager.two_d_efx_manager.two_d_efx_add_fixture)
         self.ui.two_d_efx_add_fixture_btn.setIcon(QPixmap("Assets/Icons/add.svg"))
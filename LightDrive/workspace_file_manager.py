@@ -202,7 +202,6 @@ class WorkspaceFileManager:
         self.window.dmx_output.write_output_configuration(dmx_output_configuration)
 
         self.window.console_display_universes()
-        self.window.fixture_display_items()
         # Add the fixtures
         for fixture in fixtures:
             # Read the fixture data
@@ -214,7 +213,12 @@ class WorkspaceFileManager:
                              fixture_data = fixture_data,
                              universe_uuid = fixture["universe"],
                              address = fixture["address"],
-                             provided_uuid = fixture["fixture_uuid"])
+                             provided_uuid = fixture["fixture_uuid"],
+                             update_output = False)
+        # Update the fixture tree and the channel masks once for all fixtures
+        self.window.fixture_display_items()
+        self.window.dmx_output.update_channel_masks()
+        self.window.dmx_output.update_snippet_fixtures()
 
         # Add the snippets
         def _add_snippet(snippet) -> None:
@@ -241,7 +245,7 @@ class WorkspaceFileManager:
                     cue_data = CueData(snippet["uuid"], snippet["name"], fixtures=snippet.get("fixtures", []), keyframes=snippet.get("keyframes", {}), directory=snippet.get("directory", "root"))
                     self.window.snippet_manager.cue_manager.cue_create(parent=parent, cue_data=cue_data)
                 case "two_d_efx":
-                    efx_2d_data = TwoDEfxData(snippet["uuid"], snippet["name"], snippet.get("pattern", "Circle"), snippet.get("width", 512), snippet.get("height", 512), snippet.get("x_offset", 0), snippet.get("y_offset", 0), snippet.get("fixture_mappings", {}), snippet.get("duration", 5000), snippet.get("direction", "Forward"), directory=snippet.get("directory", "root"))
+                    efx_2d_data = TwoDEfxData(snippet["uuid"], snippet["name"], snippet.get("pattern", "Circle"), snippet.get("width", 512), snippet.get("height", 512), snippet.get("x_offset", 0), snippet.get("y_offset", 0), snippet.get("fixture_mappings", {}), snippet.get("duration", 5000), snippet.get("direction", "Forward"), snippet.get("phase_spread", 0), snippet.get("pattern_parameters", {}), directory=snippet.get("directory", "root"))
                     self.window.snippet_manager.two_d_efx_manager.two_d_efx_create(parent=parent, two_d_efx_data=efx_2d_data)
                 case "rgb_matrix":
                     rgb_matrix_data = RgbMatrixData(snippet["uuid"], snippet["name"], directory=snippet.get("directory", "root"))
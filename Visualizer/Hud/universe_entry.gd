@@ -5,6 +5,12 @@ var running_port := 7500
 var client := StreamPeerTCP.new()
 var reconnect_delay := 1.0  # Time in seconds to wait before attempting to reconnect
 var time_since_last_attempt := 0.0
+var buffer := PackedByteArray()  # Received bytes that do not form a complete frame yet
+
+const FRAME_MAGIC := PackedByteArray([76, 68, 77, 88])  # "LDMX"
+const FRAME_HEADER_SIZE := 12  # Magic, universe id (u16), sequence (u32), length (u16), big endian
+const JSON_FRAME_START := 91  # "["
+const JSON_FRAME_END := 93  # "]"
 
 
 func _ready() -> void:
@@ -30,11 +36,13 @@ func _process(delta: float) -> void:
 	client.poll()
 	if client.get_status() == StreamPeerTCP.STATUS_CONNECTED:
 		if client.get_available_bytes() > 0:
-			var data = client.get_utf8_string(client.get_available_bytes())
-			data = JSON.parse_string(data)
-			if data == null:
+			var result := client.get_data(client.get_available_bytes())
+			if result[0] != OK:
 				return
-			get_node("/root/Stage").set_dmx_values(self, data)
+			buffer.append_array(result[1])
+			var values = parse_frames()
+			if values != null:
+				get_node("/root/Stage").set_dmx_values(self, values)
 	elif client.get_status() == StreamPeerTCP.STATUS_CONNECTING:
 		pass
 	else:
@@ -44,11 +52,45 @@ func _process(delta: float) -> void:
 			connect_to_server()
 
 
+func parse_frames():
+	# Parses all complete frames in the buffer and returns the values of the newest one (null if there is none)
+	# Binary frames start with the magic, JSON frames (older LightDrive versions) are lists of the values.
+	var values = null
+	while buffer.size() > 0:
+		if buffer[0] == FRAME_MAGIC[0]:
+			if buffer.size() < FRAME_HEADER_SIZE:
+				break
+			if buffer.slice(0, 4) != FRAME_MAGIC:
+				buffer = buffer.slice(1)  # Not a frame, skip ahead until the stream is in sync again
+				continue
+			var length := (buffer[10] << 8) | buffer[11]
+			if buffer.size() < FRAME_HEADER_SIZE + length:
+				break
+			var frame_values := Array(buffer.slice(FRAME_HEADER_SIZE, FRAME_HEADER_SIZE + length))
+			frame_values.resize(512)  # Truncated frames leave the remaining channels at 0
+			for i in range(length, 512):
+				frame_values[i] = 0
+			values = frame_values
+			buffer = buffer.slice(FRAME_HEADER_SIZE + length)
+		elif buffer[0] == JSON_FRAME_START:
+			var end := buffer.find(JSON_FRAME_END)
+			if end == -1:
+				break
+			var data = JSON.parse_string(buffer.slice(0, end + 1).get_string_from_utf8())
+			if data != null:
+				values = data
+			buffer = buffer.slice(end + 1)
+		else:
+			buffer = buffer.slice(1)
+	return values
+
+
 func connect_to_server() -> void:
 	running_port = $InfoSide/PortHBox/PortSpin.value
 	if running_port == 0:
 		return
 	client = StreamPeerTCP.new()  # Create a new instance of StreamPeerTCP
+	buffer.clear()
 	var err = client.connect_to_host(host, running_port)
 
 
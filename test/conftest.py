@@ -0,0 +1,18 @@
+import socket
+import sys
+import os
+import pytest
+
+# The modules of LightDrive are imported relative to the LightDrive directory (like when running workspace.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "LightDrive"))
+
+@pytest.fixture
+def udp_receiver():
+    """
+    A UDP socket bound to an ephemeral loopback port (the outputs are pointed to it instead of their default port)
+    """
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.settimeout(1)
+    yield receiver
+    receiver.close()
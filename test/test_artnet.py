@@ -0,0 +1,113 @@
+from Backend.artnet import ArtnetOutput, ARTDMX_HEADER_SIZE, build_artdmx_header, build_artsync_packet
+from Backend.udp_sender import UdpSender
+import numpy as np
+import pytest
+import struct
+
+@pytest.fixture
+def sender():
+    sender = UdpSender()
+    yield sender
+    sender.close()
+
+def create_output(sender, receiver, **kwargs) -> ArtnetOutput:
+    output = ArtnetOutput(sender, "127.0.0.1", 0x1234, 44, **kwargs)
+    output.port = receiver.getsockname()[1]
+    return output
+
+def test_artdmx_header():
+    header = build_artdmx_header(0x1234, 512)
+    assert len(header) == ARTDMX_HEADER_SIZE
+    assert header[:8] == b"Art-Net\x00"
+    assert header[8:10] == b"\x00\x50"  # OpDmx, little endian
+    assert header[10:12] == b"\x00\x0e"  # Protocol version 14, big endian
+    assert header[12] == 0  # Sequence
+    assert header[13] == 0  # Physical
+    assert header[14] == 0x34  # SubUni (sub-net and universe)
+    assert header[15] == 0x12  # Net
+    assert header[16:18] == b"\x02\x00"  # Length, big endian
+
+def test_port_address_split():
+    assert build_artdmx_header(0x7FFF)[14:16] == b"\xff\x7f"
+    assert build_artdmx_header(0x0001)[14:16] == b"\x01\x00"
+    assert build_artdmx_header(0x8001)[14:16] == b"\x01\x00"  # Port-addresses only have 15 bits
+
+def test_artsync_packet():
+    assert build_artsync_packet() == b"Art-Net\x00" + b"\x00\x52" + b"\x00\x0e" + b"\x00\x00"
+
+def test_packet_of_known_frame(sender, udp_receiver):
+    output = create_output(sender, udp_receiver)
+    frame = np.arange(512, dtype=np.uint8)
+    output.set_values(frame)
+    sender.flush()
+    packet, _ = udp_receiver.recvfrom(1024)
+    assert len(packet) == ARTDMX_HEADER_SIZE + 512
+    assert packet[:12] == build_artdmx_header(0x1234)[:12]
+    assert packet[12] == 1
+    assert packet[14:18] == b"\x34\x12\x02\x00"
+    assert packet[ARTDMX_HEADER_SIZE:] == frame.tobytes()
+
+def test_sequence_increments(sender, udp_receiver):
+    output = create_output(sender, udp_receiver)
+    sequences = []
+    for value in range(3):
+        output.set_values(np.full(512, value, dtype=np.uint8))
+        sender.flush()
+        sequences.append(udp_receiver.recvfrom(1024)[0][12])
+    assert sequences == [1, 2, 3]
+
+    output.sequence = 254
+    for _ in range(2):
+        output.changed = True
+        sender.flush()
+        sequences.append(udp_receiver.recvfrom(1024)[0][12])
+    assert sequences[3:] == [255, 1]  # 0 is skipped, it would disable reordering on the nodes
+
+def test_unchanged_universe_is_not_resent(sender, udp_receiver):
+    output = create_output(sender, udp_receiver)
+    output.set_values(np.zeros(512, dtype=np.uint8))
+    sender.flush()
+    udp_receiver.recvfrom(1024)
+    sender.flush()  # Not changed and not due for a refresh yet
+    udp_receiver.settimeout(0.05)
+    with pytest.raises(TimeoutError):
+        udp_receiver.recvfrom(1024)
+
+@pytest.mark.parametrize("keepalive_ms, refresh_interval", [(0, 0.1), (-500, 0.1), (250, 0.25), (60000, 4.0)])
+def test_keepalive_is_clamped(sender, udp_receiver, keepalive_ms, refresh_interval):
+    output = create_output(sender, udp_receiver, send_on_change=True, keepalive_ms=keepalive_ms)
+    assert output.refresh_interval == pytest.approx(refresh_interval)
+
+def test_sync_follows_the_burst(sender, udp_receiver):
+    create_output(sender, udp_receiver, sync=True)
+    second_output = create_output(sender, udp_receiver, sync=True)
+    second_output.artnet_universe = 2
+    sender.flush()
+    packets = [udp_receiver.recvfrom(1024)[0] for _ in range(3)]
+    assert [struct.unpack_from("<H", packet, 8)[0] for packet in packets] == [0x5000, 0x5000, 0x5200]
+    assert packets[2] == build_artsync_packet()  # One sync after all universes
+
+def test_packets_are_truncated_to_the_patch(sender, udp_receiver):
+    output = create_output(sender, udp_receiver, patched_channels=3)
+    frame = np.zeros(512, dtype=np.uint8)
+    frame[:3] = (1, 2, 3)
+    output.set_values(frame)
+    sender.flush()
+    packet = udp_receiver.recvfrom(1024)[0]
+    assert struct.unpack_from(">H", packet, 16)[0] == 4  # Rounded up to an even length
+    assert packet[ARTDMX_HEADER_SIZE:] == bytes([1, 2, 3, 0])
+
+    frame[99] = 7  # E.g. set by the console beyond the patch, the packets grow so it is not cut off
+    output.set_values(frame)
+    sender.flush()
+    packet = udp_receiver.recvfrom(1024)[0]
+    assert struct.unpack_from(">H", packet, 16)[0] == 100
+    assert packet[-1] == 7
+
+def test_stop_sends_a_blackout(sender, udp_receiver):
+    output = create_output(sender, udp_receiver)
+    output.set_values(np.full(512, 255, dtype=np.uint8))
+    output.stop()
+    packet = udp_receiver.recvfrom(1024)[0]
+    assert packet[ARTDMX_HEADER_SIZE:] == bytes(512)
+    assert output not in sender.outputs
@@ -0,0 +1,105 @@
+from Backend.artnet_discovery import ArtnetDiscovery, parse_artpollreply, ARTPOLL_PACKET, ARTPOLLREPLY_MIN_SIZE
+from Backend.engine import OutputEngine
+import socket
+import struct
+import time
+
+def build_artpollreply(ip: str = "127.0.0.1", name: bytes = b"Test Node", net_switch: int = 1, sub_switch: int = 2,
+                       port_types: bytes = b"\x80\x80\x40\x00", sw_out: bytes = b"\x03\x04\x05\x06", port_count: int = 4,
+                       bind_index: int = 1, size: int = 239) -> bytes:
+    """
+    Crafts an ArtPollReply like a node would send it
+    """
+    packet = bytearray(size)
+    packet[0:8] = b"Art-Net\x00"
+    struct.pack_into("<H", packet, 8, 0x2100)
+    packet[10:14] = socket.inet_aton(ip)
+    packet[18] = net_switch
+    packet[19] = sub_switch
+    packet[26:26 + len(name)] = name
+    struct.pack_into(">H", packet, 172, port_count)
+    packet[174:178] = port_types
+    packet[190:194] = sw_out
+    if size > 211:
+        packet[211] = bind_index
+    return bytes(packet)
+
+def test_parse_output_ports():
+    reply = parse_artpollreply(build_artpollreply())
+    assert reply["ip"] == "127.0.0.1"
+    assert reply["name"] == "Test Node"
+    assert reply["bind_index"] == 1
+    # Only the first two ports can output DMX, their port-addresses combine net, sub-net and SwOut
+    assert reply["port_addresses"] == [0x0123, 0x0124]
+
+def test_parse_clamps_the_port_count():
+    assert parse_artpollreply(build_artpollreply(port_types=b"\x80" * 4, port_count=200))["port_addresses"] == [0x0123, 0x0124, 0x0125, 0x0126]
+    assert parse_artpollreply(build_artpollreply(port_count=1))["port_addresses"] == [0x0123]
+    assert parse_artpollreply(build_artpollreply(port_count=0))["port_addresses"] == []
+
+def test_parse_masks_the_switches():
+    reply = parse_artpollreply(build_artpollreply(net_switch=0xFF, sub_switch=0xFF, sw_out=b"\xff\x00\x00\x00"))
+    assert reply["port_addresses"] == [0x7FFF, 0x7FF0]
+
+def test_parse_without_bind_index():
+    reply = parse_artpollreply(build_artpollreply(size=ARTPOLLREPLY_MIN_SIZE))
+    assert reply["bind_index"] == 0
+    assert reply["port_addresses"] == [0x0123, 0x0124]
+
+def test_parse_rejects_other_packets():
+    assert parse_artpollreply(build_artpollreply(size=ARTPOLLREPLY_MIN_SIZE - 1)) is None
+    assert parse_artpollreply(b"") is None
+    assert parse_artpollreply(b"Art-Nex\x00" + build_artpollreply()[8:]) is None
+    assert parse_artpollreply(ARTPOLL_PACKET + bytes(ARTPOLLREPLY_MIN_SIZE)) is None  # An ArtPoll, not a reply
+
+def test_discovery_over_loopback():
+    node = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    node.bind(("127.0.0.1", 0))
+    node.settimeout(1)
+    discovery = ArtnetDiscovery("127.0.0.1", node.getsockname()[1], listen_port=0)
+    try:
+        packet, controller_address = node.recvfrom(1024)
+        assert packet == ARTPOLL_PACKET
+        node.sendto(b"garbage", ("127.0.0.1", controller_address[1]))
+        node.sendto(build_artpollreply(), ("127.0.0.1", controller_address[1]))
+        deadline = time.monotonic() + 1
+        while not discovery.get_targets(0x0123) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert discovery.get_targets(0x0123) == ("127.0.0.1",)
+        assert discovery.get_targets(0x0124) == ("127.0.0.1",)
+        assert discovery.get_targets(0x0125) == ()
+        discovery.expire_nodes(time.monotonic() + 60)
+        assert discovery.get_targets(0x0123) == ()
+    finally:
+        discovery.stop()
+        node.close()
+    assert not discovery.thread.is_alive()
+
+def test_engine_stops_the_discovery_without_holding_the_output_lock(monkeypatch):
+    engine = OutputEngine()
+    engine.create_universe("universe")
+    engine.configure_artnet("universe", True, "127.0.0.1", 0, 44, discovery=True)
+    discovery = engine.udp_sender.discovery
+    assert discovery is not None
+
+    lock_held_while_stopping = []
+    stop = discovery.stop
+    def record_stop():
+        lock_held_while_stopping.append(engine.output_lock.locked())
+        stop()
+    monkeypatch.setattr(discovery, "stop", record_stop)
+    engine.configure_artnet("universe", True, "127.0.0.1", 0, 44, discovery=False)
+    assert engine.udp_sender.discovery is None
+    assert lock_held_while_stopping == [False]
+    engine.shutdown()
+
+def test_discovery_reports_a_port_in_use():
+    blocking_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)  # Bound without SO_REUSEADDR, so the port cannot be shared
+    blocking_socket.bind(("", 0))
+    try:
+        discovery = ArtnetDiscovery("127.0.0.1", listen_port=blocking_socket.getsockname()[1])
+        assert discovery.thread is None
+        assert "could not listen" in discovery.error
+        discovery.stop()
+    finally:
+        blocking_socket.close()
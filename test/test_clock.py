@@ -0,0 +1,22 @@
+from Backend.clock import OutputClock
+import threading
+
+def test_failing_frames_are_reported_once():
+    errors = []
+    frames = [0]
+    two_frames_failed = threading.Event()
+
+    def fail() -> None:
+        frames[0] += 1
+        if frames[0] == 3:
+            two_frames_failed.set()
+        raise ValueError("broken frame")
+
+    clock = OutputClock(fail, 200, report_error=errors.append)
+    clock.start()
+    try:
+        assert two_frames_failed.wait(1)
+    finally:
+        clock.stop()
+    assert len(errors) == 1
+    assert "broken frame" in errors[0] and "test_clock.py" in errors[0]
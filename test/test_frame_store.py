@@ -0,0 +1,41 @@
+from Backend.frame_store import UniverseFrameStore, SharedUniverseFrame, default_frame_store_prefix
+from Backend.engine import OutputEngine
+import numpy as np
+import pytest
+
+@pytest.fixture
+def frame_store():
+    frame_store = UniverseFrameStore(default_frame_store_prefix() + "_test")
+    yield frame_store
+    frame_store.close()
+
+def test_read_returns_the_written_frame(frame_store):
+    shared_frame = frame_store.create("universe")
+    values = np.arange(512, dtype=np.uint8)
+    shared_frame.write(values)
+    sequence, frame = SharedUniverseFrame(shared_frame.name).read()
+    assert sequence == 1
+    assert np.array_equal(frame, values)
+
+def test_read_gives_up_on_a_write_that_never_finishes(frame_store):
+    shared_frame = frame_store.create("universe")
+    shared_frame.sequence[0] += 1  # The writer stopped in the middle of a write
+    sequence, frame = shared_frame.read()
+    assert frame is None
+    assert shared_frame.stale
+
+    shared_frame.sequence[0] += 1  # The next write finished
+    assert shared_frame.read()[1] is not None
+    assert not shared_frame.stale
+
+def test_engine_reports_a_stale_frame_once():
+    engine = OutputEngine(frame_store_prefix=default_frame_store_prefix() + "_test_engine")
+    try:
+        engine.create_universe("universe")
+        engine.frame_store.frames["universe"].sequence[0] += 1
+        assert engine.get_frame("universe") is None
+        assert engine.get_frame("universe") is None
+        errors = engine.take_errors()
+        assert len(errors) == 1 and "stale" in errors[0]
+    finally:
+        engine.shutdown()
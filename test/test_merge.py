@@ -0,0 +1,99 @@
+from Backend.engine import OutputSource
+from Backend.merge import MergeEngine, build_htp_mask
+from Backend.patch import build_patches, build_universe_patch, build_fade_patches, combine_patches
+import numpy as np
+import pytest
+
+UNIVERSE = "universe"
+
+@pytest.fixture
+def merge_engine():
+    merge_engine = MergeEngine()
+    merge_engine.set_htp_masks({UNIVERSE: build_htp_mask({0: "Intensity", 1: "Pan"})})  # Channel 1 is HTP, channel 2 LTP
+    return merge_engine
+
+def create_source(values: dict, priority: int = 0, level: float = 1.0) -> OutputSource:
+    source = OutputSource(priority, build_patches({UNIVERSE: values}))
+    source.level = level
+    return source
+
+def merge(merge_engine, sources, now: float = 0.0) -> np.ndarray:
+    frame = np.full(512, 99, dtype=np.uint8)  # Not cleared by the caller, the merge must overwrite everything
+    merge_engine.merge_universe(UNIVERSE, frame, sources, now)
+    return frame
+
+def test_htp_uses_the_highest_value(merge_engine):
+    frame = merge(merge_engine, [create_source({1: 200}), create_source({1: 100})])
+    assert frame[0] == 200
+
+def test_ltp_uses_the_latest_value(merge_engine):
+    frame = merge(merge_engine, [create_source({2: 200}), create_source({2: 100})])
+    assert frame[1] == 100
+
+def test_unset_channels_are_zero(merge_engine):
+    frame = merge(merge_engine, [create_source({2: 200})])
+    assert frame[0] == 0
+    assert not frame[2:].any()
+
+def test_higher_layer_overrides(merge_engine):
+    frame = merge(merge_engine, [create_source({1: 50, 2: 50}, priority=1), create_source({1: 200, 2: 200, 3: 200})])
+    assert frame[0] == 50  # Even HTP channels, the layers are not merged with each other
+    assert frame[1] == 50
+    assert frame[2] == 200
+
+def test_half_level_gives_half(merge_engine):
+    frame = merge(merge_engine, [create_source({1: 200, 2: 200}, level=0.5)])
+    assert frame[0] == 100
+    assert frame[1] == 100
+
+def test_level_fades_from_the_layer_beneath(merge_engine):
+    frame = merge(merge_engine, [create_source({1: 100, 2: 100}, priority=-1), create_source({1: 200, 2: 0}, level=0.5)])
+    assert frame[0] == 150
+    assert frame[1] == 50
+
+def test_crossfade_inside_a_layer_mixes(merge_engine):
+    frame = merge(merge_engine, [create_source({2: 200}, level=0.25), create_source({2: 40}, level=0.75)])
+    assert frame[1] == 80
+
+def test_level_zero_is_skipped(merge_engine):
+    frame = merge(merge_engine, [create_source({1: 100, 2: 100}), create_source({1: 255, 2: 255}, level=0)])
+    assert frame[0] == 100
+    assert frame[1] == 100
+
+def test_changed_patches_are_merged_again(merge_engine):
+    sources = [create_source({1: 100, 2: 100}), create_source({1: 50, 3: 50}, level=0.5)]
+    merge(merge_engine, sources)
+    sources[0].patches = build_patches({UNIVERSE: {1: 10, 4: 70}})  # Same length, other channels
+    frame = merge(merge_engine, sources)
+    assert list(frame[:4]) == [25, 0, 25, 70]
+    sources.append(create_source({2: 200}))
+    sources[1].patches = build_patches({UNIVERSE: {3: 60}})  # Another length
+    frame = merge(merge_engine, sources)
+    assert list(frame[:4]) == [10, 200, 30, 70]
+
+def test_fade_patch_interpolates(merge_engine):
+    fade_patches = build_fade_patches(build_patches({UNIVERSE: {2: 200, 3: 200}}), build_patches({UNIVERSE: {2: 0, 4: 50}}), 2.0)
+    for fade_patch in fade_patches.values():
+        fade_patch.fade_start = 10.0
+    beneath = create_source({3: 40, 4: 90}, priority=-1)
+    source = OutputSource(0, fade_patches)
+    assert list(merge(merge_engine, [beneath, source], 9.0)[1:4]) == [200, 200, 90]
+    assert list(merge(merge_engine, [beneath, source], 11.0)[1:4]) == [100, 120, 70]  # One sided channels fade to what is beneath
+    assert list(merge(merge_engine, [beneath, source], 12.0)[1:4]) == [0, 40, 50]
+    assert fade_patches[UNIVERSE].fade_end() == 12.0
+
+def test_held_fade_patch_keeps_its_values(merge_engine):
+    fade_patches = build_fade_patches(build_patches({UNIVERSE: {2: 200}}), build_patches({UNIVERSE: {2: 0}}), 2.0)
+    held_patches = {universe_uuid: patch.hold(1.0) for universe_uuid, patch in fade_patches.items()}
+    assert merge(merge_engine, [OutputSource(0, held_patches)], 100.0)[1] == 100
+
+def test_build_universe_patch_clips():
+    patch = build_universe_patch(UNIVERSE, {0: 10, 1: 300, 512: -5, 513: 1})
+    assert list(patch.channels) == [0, 511]
+    assert list(patch.values) == [255, 0]
+    assert build_universe_patch(UNIVERSE, {0: 1}) is None
+
+def test_combine_patches_prefers_later_patches():
+    combined = combine_patches([build_patches({UNIVERSE: {1: 1, 2: 2}}), build_patches({UNIVERSE: {2: 20, 3: 30}})])
+    assert list(combined[UNIVERSE].channels) == [0, 1, 2]
+    assert list(combined[UNIVERSE].values) == [1, 20, 30]
@@ -0,0 +1,196 @@
+from Backend.monitor import MonitorServer, build_delta_message, find_changed_runs, parse_subscription, MESSAGE_HEADER, \
+    MESSAGE_INDEX, MESSAGE_FRAME, MESSAGE_DELTA, MESSAGE_SLICES, MESSAGE_ERROR, FRAME_HEADER, UNIVERSE_HEADER, RUN_HEADER
+import numpy as np
+import pytest
+import socket
+import struct
+import json
+import time
+
+UNIVERSE_UUID = "universe-uuid"
+
+def receive_exactly(client: socket.socket, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = client.recv(size - len(data))
+        assert chunk, "The server closed the connection"
+        data += chunk
+    return data
+
+def receive_message(client: socket.socket) -> tuple:
+    magic, message_type, length = MESSAGE_HEADER.unpack(receive_exactly(client, MESSAGE_HEADER.size))
+    assert magic == b"LDMS"
+    return message_type, receive_exactly(client, length)
+
+def parse_runs_message(payload: bytes, values_after_runs: bool) -> tuple:
+    """
+    Parses a delta (values after every run) or slices message (values after all runs) into {universe_id: [(offset, values)]}
+    """
+    sequence, universe_count = FRAME_HEADER.unpack_from(payload)
+    position = FRAME_HEADER.size
+    universes = {}
+    for _ in range(universe_count):
+        universe_id, run_count = UNIVERSE_HEADER.unpack_from(payload, position)
+        position += UNIVERSE_HEADER.size
+        runs = []
+        for _ in range(run_count):
+            offset, length = RUN_HEADER.unpack_from(payload, position)
+            position += RUN_HEADER.size
+            runs.append([offset, length])
+            if values_after_runs:
+                runs[-1][1] = payload[position:position + length]
+                position += length
+        if not values_after_runs:
+            for run in runs:
+                run[1], position = payload[position:position + run[1]], position + run[1]
+        universes[universe_id] = [tuple(run) for run in runs]
+    assert position == len(payload)
+    return sequence, universes
+
+def parse_frame_message(payload: bytes) -> tuple:
+    sequence, universe_count = FRAME_HEADER.unpack_from(payload)
+    position = FRAME_HEADER.size
+    frames = {}
+    for _ in range(universe_count):
+        universe_id, length = UNIVERSE_HEADER.unpack_from(payload, position)
+        position += UNIVERSE_HEADER.size
+        frames[universe_id] = payload[position:position + length]
+        position += length
+    assert position == len(payload)
+    return sequence, frames
+
+@pytest.fixture
+def connect():
+    servers = []
+    clients = []
+    def connect(**kwargs) -> tuple:
+        server = MonitorServer("127.0.0.1", 0, **kwargs)
+        server.set_universes({UNIVERSE_UUID: 1})
+        servers.append(server)
+        client = socket.create_connection(server.listeners[0].getsockname(), timeout=2)
+        clients.append(client)
+        message_type, payload = receive_message(client)  # The index is sent once the client was accepted
+        assert message_type == MESSAGE_INDEX
+        assert json.loads(payload)["universes"] == {"1": UNIVERSE_UUID}
+        return server, client
+    yield connect
+    for client in clients:
+        client.close()
+    for server in servers:
+        server.stop()
+
+def send_request(server: MonitorServer, client: socket.socket, request) -> None:
+    """
+    Sends a request and waits until the server handled it (handling a subscription requests a new frame)
+    """
+    server.needs_frame = False
+    client.sendall((request if isinstance(request, bytes) else json.dumps(request).encode()) + b"\n")
+    deadline = time.monotonic() + 2
+    while not server.needs_frame and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+def test_frame_round_trip(connect):
+    server, client = connect()
+    values = np.arange(512, dtype=np.uint8).tobytes()
+    server.publish_frames([(1, values), (2, bytes(3))])
+    message_type, payload = receive_message(client)
+    assert message_type == MESSAGE_FRAME
+    assert parse_frame_message(payload) == (1, {1: values, 2: bytes(3)})
+
+def test_delta_round_trip_with_keyframes(connect):
+    server, client = connect(delta=True, keyframe_interval=3)
+    values = bytearray(512)
+    server.publish_frames([(1, bytes(values))])
+    message_type, payload = receive_message(client)
+    assert message_type == MESSAGE_FRAME  # A new client gets a keyframe first
+    state = bytearray(parse_frame_message(payload)[1][1])
+
+    values[4:6] = b"\x05\x06"
+    values[500] = 9
+    server.publish_frames([(1, bytes(values))])
+    message_type, payload = receive_message(client)
+    assert message_type == MESSAGE_DELTA
+    sequence, universes = parse_runs_message(payload, values_after_runs=True)
+    assert sequence == 2
+    assert universes == {1: [(4, b"\x05\x06"), (500, b"\x09")]}
+    for offset, run_values in universes[1]:
+        state[offset:offset + len(run_values)] = run_values
+    assert state == values
+
+    server.publish_frames([(1, bytes(values))])
+    message_type, payload = receive_message(client)
+    assert message_type == MESSAGE_FRAME  # Every third frame is a keyframe
+    assert parse_frame_message(payload) == (3, {1: bytes(values)})
+
+def test_delta_leaves_out_unchanged_universes():
+    message = build_delta_message(1, [(1, bytes(4)), (2, b"\x00\x01\x00\x00")], {1: bytes(4), 2: bytes(4)})
+    sequence, universes = parse_runs_message(message[MESSAGE_HEADER.size:], values_after_runs=True)
+    assert universes == {2: [(1, b"\x01")]}
+
+def test_changed_runs_merge_small_gaps():
+    previous = np.zeros(32, dtype=np.uint8)
+    values = previous.copy()
+    values[[1, 4, 20]] = 1
+    assert find_changed_runs(values, previous) == [(1, 4), (20, 1)]
+    assert find_changed_runs(previous, previous) == []
+
+def test_slices_round_trip(connect):
+    server, client = connect()
+    send_request(server, client, {"subscribe": {UNIVERSE_UUID: [[1, 4]], "1": [[10, 10], [3, 6]]}})
+    values = np.arange(512, dtype=np.uint8).tobytes()
+    server.publish_frames([(1, values), (2, values)])
+    message_type, payload = receive_message(client)
+    assert message_type == MESSAGE_SLICES
+    assert parse_runs_message(payload, values_after_runs=False) == (1, {1: [(0, values[0:6]), (9, values[9:10])]})
+
+    send_request(server, client, {"subscribe": "all"})
+    server.publish_frames([(1, values)])
+    assert receive_message(client)[0] == MESSAGE_FRAME
+
+def test_parse_subscription():
+    assert parse_subscription("all", {}) is None
+    assert parse_subscription(None, {}) is None
+    assert parse_subscription({"1": [[0, 2], [510, 600]], "unknown": [[1, 1]]}, {}) == ((1, ((0, 2), (509, 3))),)
+    with pytest.raises(ValueError):
+        parse_subscription([1, 2], {})
+
+@pytest.mark.parametrize("request_data", [b"not json", b'{"subscribe": [1, 2]}', b'{"subscribe": {"1": [[1]]}}',
+                                          b'{"subscribe": {"1": 5}}', b"[]"])
+def test_invalid_requests_are_answered_with_an_error(connect, request_data):
+    server, client = connect()
+    send_request(server, client, {"subscribe": {"1": [[1, 2]]}})
+    client.sendall(request_data + b"\n")
+    message_type, payload = receive_message(client)
+    assert message_type == MESSAGE_ERROR
+    assert json.loads(payload)["error"].startswith("Invalid request")
+
+    server.publish_frames([(1, bytes(range(4)))])  # The connection and the previous subscription are kept
+    message_type, payload = receive_message(client)
+    assert message_type == MESSAGE_SLICES
+    assert parse_runs_message(payload, values_after_runs=False) == (1, {1: [(0, b"\x00\x01")]})
+
+def test_too_long_requests_disconnect(connect):
+    server, client = connect()
+    try:
+        client.sendall(b"x" * 70000)
+    except OSError:
+        pass  # The server may close the connection while sending
+    with pytest.raises((ConnectionError, AssertionError)):
+        while True:
+            receive_message(client)
+
+def test_unix_socket(tmp_path):
+    if not hasattr(socket, "AF_UNIX"):
+        pytest.skip("Unix domain sockets are not supported")
+    socket_path = str(tmp_path / "monitor.sock")
+    server = MonitorServer("127.0.0.1", 0, socket_path=socket_path)
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(2)
+    try:
+        client.connect(socket_path)
+        assert receive_message(client)[0] == MESSAGE_INDEX
+        server.publish_frames([(1, b"\x07")])
+        assert parse_frame_message(receive_message(client)[1]) == (1, {1: b"\x07"})
+    finally:
+        client.close()
+        server.stop()
@@ -0,0 +1,48 @@
+from Backend.output import DmxOutput, OutputSnippet
+import pytest
+import time
+
+class Window:
+    available_fixtures = []
+
+    def io_add_universe_entry(self, universe_uuid: str, universe_name: str) -> None:
+        pass
+
+@pytest.fixture
+def dmx_output():
+    dmx_output = DmxOutput(Window())
+    dmx_output.create_universe("universe", "Universe")
+    yield dmx_output
+    dmx_output.engine.shutdown()
+
+def test_snippet_fading_out_keeps_posting_its_values(dmx_output):
+    snippet = OutputSnippet(dmx_output, {"universe": {1: 100}})
+    dmx_output.insert_snippet(snippet)
+    dmx_output.remove_snippet(snippet, fade_time=10)
+    snippet.update_values({"universe": {1: 200}})
+    assert dmx_output.engine.sources[snippet.source_id].patches is snippet.patches
+
+    dmx_output.fading_out_snippets[snippet.source_id] = (snippet, time.perf_counter())  # Let the fade end now
+    snippet.update_values({"universe": {1: 50}})  # The fade finished, the values are not posted anymore
+    assert snippet.source_id not in dmx_output.fading_out_snippets
+
+def test_snippet_cut_out_stops_posting(dmx_output):
+    snippet = OutputSnippet(dmx_output, {"universe": {1: 100}})
+    dmx_output.insert_snippet(snippet)
+    dmx_output.remove_snippet(snippet)
+    snippet.update_values({"universe": {1: 200}})
+    assert snippet.source_id not in dmx_output.engine.sources
+    assert snippet.source_id not in dmx_output.fading_out_snippets
+
+def test_snippet_faded_back_in(dmx_output):
+    snippet = OutputSnippet(dmx_output, {"universe": {1: 100}})
+    dmx_output.insert_snippet(snippet)
+    dmx_output.remove_snippet(snippet, fade_time=10)
+    dmx_output.insert_snippet(snippet, fade_time=10)
+    assert snippet.source_id not in dmx_output.fading_out_snippets
+    assert not dmx_output.engine.sources[snippet.source_id].remove_after_fade
+
+def test_loaded_keepalive_is_clamped(dmx_output):
+    dmx_output.write_output_configuration({"loaded": {"name": "Loaded", "ArtNet": {"active": True, "send_on_change": True,
+                                                                                   "keepalive_ms": 0}}})
+    assert dmx_output.get_universe_configuration("loaded")["ArtNet"]["keepalive_ms"] == 100
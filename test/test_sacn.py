@@ -0,0 +1,98 @@
+from Backend.sacn import SacnOutput, build_sacn_header, build_sacn_sync_packet, multicast_address, SOURCE_CID, \
+    SACN_HEADER_SIZE, SACN_SEQUENCE_OFFSET, SACN_OPTIONS_OFFSET, SACN_SYNC_PACKET_SIZE, OPTION_STREAM_TERMINATED
+from Backend.udp_sender import UdpSender
+import numpy as np
+import pytest
+import struct
+
+@pytest.fixture
+def sender():
+    sender = UdpSender()
+    yield sender
+    sender.close()
+
+def create_output(sender, receiver, **kwargs) -> SacnOutput:
+    output = SacnOutput(sender, 0x0102, 44, multicast=False, target_ip="127.0.0.1", **kwargs)
+    output.port = receiver.getsockname()[1]
+    return output
+
+def test_multicast_address():
+    assert multicast_address(1) == "239.255.0.1"
+    assert multicast_address(0x0102) == "239.255.1.2"
+    assert multicast_address(63999) == "239.255.249.255"
+
+def test_data_packet_header():
+    header = build_sacn_header(0x0102, priority=150, sync_universe=7)
+    assert len(header) == SACN_HEADER_SIZE == 126
+    # Root layer
+    assert header[0:4] == b"\x00\x10\x00\x00"
+    assert header[4:16] == b"ASC-E1.17\x00\x00\x00"
+    assert struct.unpack_from(">H", header, 16)[0] == 0x7000 | (638 - 16)
+    assert struct.unpack_from(">I", header, 18)[0] == 0x00000004
+    assert header[22:38] == SOURCE_CID
+    # Framing layer
+    assert struct.unpack_from(">H", header, 38)[0] == 0x7000 | (638 - 38)
+    assert struct.unpack_from(">I", header, 40)[0] == 0x00000002
+    assert header[44:108].rstrip(b"\x00") == b"LightDrive"
+    assert header[108] == 150  # Priority
+    assert struct.unpack_from(">H", header, 109)[0] == 7  # Sync universe
+    assert header[SACN_SEQUENCE_OFFSET] == 0
+    assert header[SACN_OPTIONS_OFFSET] == 0
+    assert struct.unpack_from(">H", header, 113)[0] == 0x0102  # Universe
+    # DMP layer
+    assert struct.unpack_from(">H", header, 115)[0] == 0x7000 | (638 - 115)
+    assert header[117] == 0x02
+    assert header[118] == 0xA1
+    assert struct.unpack_from(">HHH", header, 119) == (0, 1, 513)
+    assert header[125] == 0  # Start code
+
+def test_sync_packet():
+    packet = build_sacn_sync_packet(7, 42)
+    assert len(packet) == SACN_SYNC_PACKET_SIZE == 49
+    assert struct.unpack_from(">H", packet, 16)[0] == 0x7000 | (49 - 16)
+    assert struct.unpack_from(">I", packet, 18)[0] == 0x00000008
+    assert struct.unpack_from(">H", packet, 38)[0] == 0x7000 | (49 - 38)
+    assert struct.unpack_from(">I", packet, 40)[0] == 0x00000001
+    assert packet[44] == 42  # Sequence
+    assert struct.unpack_from(">HH", packet, 45) == (7, 0)
+
+def test_packet_of_known_frame(sender, udp_receiver):
+    output = create_output(sender, udp_receiver)
+    frame = np.arange(512, dtype=np.uint8)[::-1].copy()
+    output.set_values(frame)
+    sender.flush()
+    packet, _ = udp_receiver.recvfrom(1024)
+    assert len(packet) == SACN_HEADER_SIZE + 512
+    assert packet[SACN_SEQUENCE_OFFSET] == 1
+    assert packet[:SACN_SEQUENCE_OFFSET] == build_sacn_header(0x0102)[:SACN_SEQUENCE_OFFSET]
+    assert packet[SACN_HEADER_SIZE:] == frame.tobytes()
+
+def test_sequence_increments_and_wraps(sender, udp_receiver):
+    output = create_output(sender, udp_receiver)
+    output.sequence = 253
+    sequences = []
+    for _ in range(4):
+        output.changed = True
+        sender.flush()
+        sequences.append(udp_receiver.recvfrom(1024)[0][SACN_SEQUENCE_OFFSET])
+    assert sequences == [254, 255, 0, 1]
+
+def test_sync_follows_the_burst(sender, udp_receiver):
+    create_output(sender, udp_receiver, sync_universe=7)
+    sender.flush()
+    data_packet = udp_receiver.recvfrom(1024)[0]
+    sync_packet = udp_receiver.recvfrom(1024)[0]
+    assert struct.unpack_from(">H", data_packet, 109)[0] == 7
+    assert sync_packet == build_sacn_sync_packet(7, 1)
+
+    sender.outputs[0].changed = True
+    sender.flush()
+    udp_receiver.recvfrom(1024)
+    assert udp_receiver.recvfrom(1024)[0][44] == 2  # The sync sequence is counted per sync universe
+
+def test_stop_terminates_the_stream(sender, udp_receiver):
+    output = create_output(sender, udp_receiver)
+    output.stop()
+    packets = [udp_receiver.recvfrom(1024)[0] for _ in range(3)]
+    assert all(packet[SACN_OPTIONS_OFFSET] & OPTION_STREAM_TERMINATED for packet in packets)
+    assert output not in sender.outputs
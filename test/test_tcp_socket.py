@@ -0,0 +1,79 @@
+from Backend.tcp_socket import TcpSocketOutput, build_frame, FRAME_HEADER, PROTOCOL_JSON
+import numpy as np
+import pytest
+import socket
+import json
+import time
+
+def receive_exactly(client: socket.socket, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = client.recv(size - len(data))
+        assert chunk, "The server closed the connection"
+        data += chunk
+    return data
+
+def receive_frame(client: socket.socket) -> tuple:
+    magic, universe_id, sequence, length = FRAME_HEADER.unpack(receive_exactly(client, FRAME_HEADER.size))
+    assert magic == b"LDMX"
+    return universe_id, sequence, receive_exactly(client, length)
+
+@pytest.fixture
+def connect():
+    servers = []
+    clients = []
+    def connect(**kwargs) -> tuple:
+        server = TcpSocketOutput("127.0.0.1", 0, 100, **kwargs)
+        servers.append(server)
+        client = socket.create_connection(server.listeners[0].getsockname(), timeout=2)
+        clients.append(client)
+        return server, client
+    yield connect
+    for client in clients:
+        client.close()
+    for server in servers:
+        server.stop()
+
+def test_build_frame():
+    frame = build_frame(3, 2 ** 32 + 5, b"\x01\x02")
+    assert frame == b"LDMX" + b"\x00\x03" + b"\x00\x00\x00\x05" + b"\x00\x02" + b"\x01\x02"
+
+def test_binary_frames_round_trip(connect):
+    server, client = connect(universe_id=7)
+    values = np.arange(512, dtype=np.uint8)
+    server.set_values(values)
+    previous_sequence = None
+    for _ in range(20):  # Frames built before the values were set may still arrive first
+        universe_id, sequence, received = receive_frame(client)
+        assert universe_id == 7
+        assert previous_sequence is None or sequence > previous_sequence
+        previous_sequence = sequence
+        if received == values.tobytes():
+            break
+    else:
+        pytest.fail("The values were never received")
+
+def test_json_frames(connect):
+    server, client = connect(protocol=PROTOCOL_JSON)
+    server.set_values(np.full(512, 9, dtype=np.uint8))
+    decoder = json.JSONDecoder()
+    buffer = ""
+    while True:
+        buffer += client.recv(65536).decode()
+        try:
+            values, end = decoder.raw_decode(buffer)
+        except ValueError:
+            continue  # Not a complete frame yet
+        buffer = buffer[end:]
+        assert len(values) == 512
+        if values == [9] * 512:
+            break
+
+def test_clients_disconnecting_are_removed(connect):
+    server, client = connect()
+    receive_frame(client)
+    client.close()
+    deadline = time.monotonic() + 2
+    while server.clients and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not server.clients